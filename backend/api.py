@@ -0,0 +1,632 @@
+"""
+Asyncio HTTP + WebSocket control API for the DMX engine.
+A single event loop, in its own thread, serves every client. Route handlers
+run on a small thread pool (DISPATCH_THREADS), so a slow one (saving a show,
+stopping a recording, switching effects) does not hold up other clients or
+the frame stream.
+
+HTTP (JSON bodies and responses):
+    GET  /metrics (Prometheus text format)   GET /api/stats   GET /api/health (supervised threads)
+    POST /api/profiler {"enabled", "deadline_ms"}   GET /api/profiler/trace (Chrome trace / Perfetto JSON)
+    GET  /api/patch                 POST /api/patch {"start_address", "mode_channels", "heads", "groups",
+                                                     "positions": {"0": [x, y]}}
+    GET  /api/frame                 POST /api/channels {"channels": {"1": 255, "2": 0}}
+    GET  /api/dmx                   POST /api/dmx {"break", "adaptive_length", "refresh_hz"}
+    GET  /api/dmx/input (signal, counters and the last received frame)
+    GET  /api/output                POST /api/output {"limits", "invert", "curves"}
+    POST /api/output/master {"level", "group"}
+    POST /api/scenes/recall {"name"}     POST /api/scenes/save {"name"}
+    GET  /api/effects (layer effects and expression definitions)
+    POST /api/effects/define {"name", "attributes": {"dimmer": "255 * tri(t + x)"}, "cycle"}
+    POST /api/effects/start {"name", "quantize"}                    POST /api/effects/stop
+    POST /api/effects/speed {"value"}    POST /api/effects/beats {"beats"}
+    GET  /api/tempo                      POST /api/tempo {"bpm", "beats_per_bar"}
+    POST /api/tempo/tap                  POST /api/tempo/nudge {"seconds"}   POST /api/tempo/resync
+    GET  /api/layers                     POST /api/layers/add {"name", "group", "attributes", "intensity",
+                                                               "priority", "blend", "params"}
+    POST /api/layers/pixelmap {"source" (file in presets/ or "gradient:ff0000,0000ff"), "group", "loop",
+                               "width", "height", "fps", "intensity", "priority", "blend"}
+    POST /api/layers/update {"id", "intensity", "priority", "blend"}
+    POST /api/layers/remove {"id"}       POST /api/layers/clear
+    GET  /api/history                    POST /api/history/undo     POST /api/history/redo
+    GET  /api/cues                       POST /api/cues/record {"number", "fade", "label"}
+    POST /api/cues/go {"fade"}           POST /api/cues/back {"fade"}   POST /api/cues/goto {"number", "fade"}
+    POST /api/cues/delete {"number"}
+    POST /api/sequence/load {"name"}     POST /api/sequence/start {"quantize"}   POST /api/sequence/stop
+    GET  /api/show                       POST /api/show/open {"name"}   POST /api/show/save
+    POST /api/show/import (presets/*.json into the open show)
+    POST /api/show/scene/store {"name"}  POST /api/show/scene/recall {"name"}
+    POST /api/show/sequence/load {"name"}
+    POST /api/recorder/start {"name"}    POST /api/recorder/stop
+    POST /api/playback/start {"name", "speed", "loop"}                 POST /api/playback/stop
+
+WebSocket /ws/frames streams the output as binary messages:
+    header <BI (kind, sequence) followed by
+    kind 0 (keyframe): the full universe
+    kind 1 (delta): packed (<H index, B value) records for the slots that changed
+Each client only holds the newest unsent frame, so a slow client drops
+frames instead of queueing them. Text messages {"path": ..., "body": {...}}
+are dispatched like a POST to the same endpoints.
+
+The API has no authentication: it is off by default and listens on localhost
+unless "api.host" says otherwise. Request bodies larger than MAX_BODY get 413;
+client WebSocket frames must be masked (RFC 6455) and at most MAX_WS_PAYLOAD
+bytes, otherwise the connection is closed with 1002 or 1009.
+"""
+
+import asyncio
+import base64
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import numpy as np
+from backend import metrics, pixelmap
+from backend.supervisor import supervisor
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+KEYFRAME = 0
+DELTA = 1
+DELTA_DTYPE = np.dtype([("index", "<u2"), ("value", "u1")])
+MAX_BODY = 1024 * 1024  # Bytes por petición HTTP
+MAX_WS_PAYLOAD = 64 * 1024  # Bytes por frame WebSocket de cliente
+DISPATCH_THREADS = 4  # Hilos que ejecutan los endpoints fuera del event loop
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+               500: "Internal Server Error"}
+
+
+class WebSocketError(Exception):
+    """Frame de cliente inválido; `code` es el código de cierre que se envía."""
+
+    def __init__(self, code, reason):
+        super().__init__(reason)
+        self.code = code
+
+
+def encode_ws_frame(opcode, payload):
+    """Frame WebSocket de servidor (sin máscara, FIN=1)."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_ws_frame(reader, max_payload=MAX_WS_PAYLOAD):
+    """Lee un frame de cliente; devuelve (opcode, payload). WebSocketError si no lleva máscara o es demasiado
+    grande (antes de leer el payload)."""
+    b1, b2 = await reader.readexactly(2)
+    opcode = b1 & 0x0F
+    length = b2 & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if not b2 & 0x80:
+        raise WebSocketError(1002, "client frames must be masked")
+    if length > max_payload:
+        raise WebSocketError(1009, f"frame larger than {max_payload} bytes")
+    mask = await reader.readexactly(4)
+    payload = await reader.readexactly(length)
+    return opcode, bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+def encode_frame_message(kind, seq, frame, previous=None):
+    """Mensaje binario de frame; devuelve None si no hay cambios respecto a `previous`."""
+    header = struct.pack("<BI", kind, seq & 0xFFFFFFFF)
+    if kind == KEYFRAME:
+        return header + frame.tobytes()
+    changed = np.flatnonzero(frame != previous)
+    if not len(changed):
+        return None
+    records = np.empty(len(changed), dtype=DELTA_DTYPE)
+    records["index"] = changed
+    records["value"] = frame[changed]
+    return header + records.tobytes()
+
+
+class FrameClient:
+    """A WebSocket subscriber with a one-frame mailbox."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.pending = None
+        self.ready = asyncio.Event()
+        self.last = None
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, seq, frame):
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = (seq, frame)
+        self.ready.set()
+
+
+class APIServer:
+    def __init__(self, engine, host="127.0.0.1", port=8080, presets_dir="presets"):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.presets_dir = presets_dir
+        self.loop = None
+        self.executor = None
+        self.task = None
+        self.clients = set()
+        self.seq = 0
+        self._stopped = None
+        self._started = threading.Event()
+        self.routes = {
+            ("GET", "/metrics"): self.get_metrics,
+            ("GET", "/api/stats"): self.get_stats,
+            ("GET", "/api/health"): self.get_health,
+            ("POST", "/api/profiler"): self.set_profiling,
+            ("GET", "/api/profiler/trace"): self.get_trace,
+            ("GET", "/api/patch"): self.get_patch,
+            ("POST", "/api/patch"): self.set_patch,
+            ("GET", "/api/frame"): self.get_frame,
+            ("POST", "/api/channels"): self.set_channels,
+            ("GET", "/api/dmx"): self.get_dmx,
+            ("POST", "/api/dmx"): self.configure_dmx,
+            ("GET", "/api/dmx/input"): self.get_dmx_input,
+            ("GET", "/api/history"): self.get_history,
+            ("POST", "/api/history/undo"): self.undo,
+            ("POST", "/api/history/redo"): self.redo,
+            ("GET", "/api/cues"): self.get_cues,
+            ("POST", "/api/cues/record"): self.record_cue,
+            ("POST", "/api/cues/delete"): self.delete_cue,
+            ("POST", "/api/cues/go"): self.cue_go,
+            ("POST", "/api/cues/back"): self.cue_back,
+            ("POST", "/api/cues/goto"): self.cue_goto,
+            ("GET", "/api/output"): self.get_output,
+            ("POST", "/api/output"): self.configure_output,
+            ("POST", "/api/output/master"): self.set_master,
+            ("POST", "/api/scenes/recall"): self.recall_scene,
+            ("POST", "/api/scenes/save"): self.save_scene,
+            ("GET", "/api/effects"): self.get_effects,
+            ("POST", "/api/effects/define"): self.define_effect,
+            ("POST", "/api/effects/start"): self.start_effect,
+            ("POST", "/api/effects/stop"): self.stop_effect,
+            ("POST", "/api/effects/speed"): self.set_effect_speed,
+            ("POST", "/api/effects/beats"): self.set_effect_beats,
+            ("GET", "/api/tempo"): self.get_tempo,
+            ("POST", "/api/tempo"): self.set_tempo,
+            ("POST", "/api/tempo/tap"): self.tap_tempo,
+            ("POST", "/api/tempo/nudge"): self.nudge_tempo,
+            ("POST", "/api/tempo/resync"): self.resync_tempo,
+            ("GET", "/api/layers"): self.get_layers,
+            ("POST", "/api/layers/add"): self.add_layer,
+            ("POST", "/api/layers/pixelmap"): self.add_pixel_map,
+            ("POST", "/api/layers/update"): self.update_layer,
+            ("POST", "/api/layers/remove"): self.remove_layer,
+            ("POST", "/api/layers/clear"): self.clear_layers,
+            ("POST", "/api/sequence/load"): self.load_sequence,
+            ("POST", "/api/sequence/start"): self.start_sequence,
+            ("POST", "/api/sequence/stop"): self.stop_sequence,
+            ("GET", "/api/show"): self.get_show,
+            ("POST", "/api/show/open"): self.open_show,
+            ("POST", "/api/show/save"): self.save_show,
+            ("POST", "/api/show/import"): self.import_presets,
+            ("POST", "/api/show/scene/store"): self.store_show_scene,
+            ("POST", "/api/show/scene/recall"): self.recall_show_scene,
+            ("POST", "/api/show/sequence/load"): self.load_show_sequence,
+            ("POST", "/api/recorder/start"): self.start_recording,
+            ("POST", "/api/recorder/stop"): self.stop_recording,
+            ("POST", "/api/playback/start"): self.start_playback,
+            ("POST", "/api/playback/stop"): self.stop_playback,
+        }
+
+    # --- Endpoints ---
+
+    def preset_path(self, name, ext=".json"):
+        """Solo se permiten nombres dentro de presets/, nunca rutas arbitrarias."""
+        name = str(name)
+        if not name or os.path.basename(name) != name or name.startswith("."):
+            raise ValueError(f"invalid name: {name!r}")
+        if not name.endswith(ext):
+            name += ext
+        return os.path.join(self.presets_dir, name)
+
+    def get_metrics(self, body):
+        return metrics.prometheus_text()
+
+    def get_stats(self, body):
+        return self.engine.stats()
+
+    def get_health(self, body):
+        return self.engine.health()
+
+    def set_profiling(self, body):
+        self.engine.set_profiling(bool(body["enabled"]), body.get("deadline_ms"))
+        return {"enabled": bool(body["enabled"])}
+
+    def get_trace(self, body):
+        return self.engine.profile_trace()
+
+    def get_patch(self, body):
+        return self.engine.get_patch()
+
+    def set_patch(self, body):
+        self.engine.set_patch(body.get("start_address"), body.get("mode_channels"), body.get("heads"), body.get("groups"),
+                              body.get("positions"))
+        return self.engine.get_patch()
+
+    def get_frame(self, body):
+        return {"channels": list(self.engine.dmx.dmx_data)}
+
+    def set_channels(self, body):
+        channels = {int(addr) - 1: int(value) for addr, value in body["channels"].items()}
+        self.engine.set_channels(channels)
+        return {"written": len(channels)}
+
+    def get_dmx(self, body):
+        return self.engine.get_dmx()
+
+    def configure_dmx(self, body):
+        return self.engine.configure_dmx(body.get("break"), body.get("adaptive_length"), body.get("refresh_hz"))
+
+    def get_dmx_input(self, body):
+        return self.engine.get_dmx_input()
+
+    def get_history(self, body):
+        return self.engine.history.status()
+
+    def undo(self, body):
+        return self.engine.undo()
+
+    def redo(self, body):
+        return self.engine.redo()
+
+    def get_cues(self, body):
+        return self.engine.get_cues()
+
+    def record_cue(self, body):
+        cue = self.engine.record_cue(body["number"], body.get("fade", 0.0), body.get("label", ""))
+        return cue.to_dict()
+
+    def delete_cue(self, body):
+        self.engine.delete_cue(body["number"])
+        return self.engine.cue_player.status()
+
+    def cue_go(self, body):
+        return self.engine.cue_go(body.get("fade"))
+
+    def cue_back(self, body):
+        return self.engine.cue_back(body.get("fade"))
+
+    def cue_goto(self, body):
+        return self.engine.cue_goto(body["number"], body.get("fade"))
+
+    def get_output(self, body):
+        return self.engine.output.to_dict()
+
+    def configure_output(self, body):
+        self.engine.configure_output(body.get("limits"), body.get("invert"), body.get("curves"))
+        return self.engine.output.to_dict()
+
+    def set_master(self, body):
+        self.engine.set_grand_master(body["level"], body.get("group"))
+        return self.engine.output.to_dict()
+
+    def recall_scene(self, body):
+        self.engine.load_scene(self.preset_path(body["name"]))
+        return {"scene": body["name"]}
+
+    def save_scene(self, body):
+        self.engine.save_scene(self.preset_path(body["name"]))
+        return {"scene": body["name"]}
+
+    def get_effects(self, body):
+        return self.engine.get_effects()
+
+    def define_effect(self, body):
+        return self.engine.define_effect(body).definition
+
+    def start_effect(self, body):
+        if not self.engine.run_effect(body["name"], body.get("quantize")):
+            raise ValueError(f"cannot start effect {body['name']!r}")
+        return {"effect": self.engine.current_effect}
+
+    def stop_effect(self, body):
+        self.engine.stop_effect()
+        return {"effect": None}
+
+    def set_effect_speed(self, body):
+        self.engine.set_effect_speed(int(body["value"]))
+        return {"speed": int(body["value"])}
+
+    def set_effect_beats(self, body):
+        self.engine.set_effect_beats(body.get("beats"))
+        return {"beats": self.engine.effect_beats}
+
+    def get_tempo(self, body):
+        return self.engine.get_tempo()
+
+    def set_tempo(self, body):
+        self.engine.set_tempo(body.get("bpm"), body.get("beats_per_bar"))
+        return self.engine.get_tempo()
+
+    def tap_tempo(self, body):
+        self.engine.tap_tempo()
+        return self.engine.get_tempo()
+
+    def nudge_tempo(self, body):
+        self.engine.nudge_tempo(body["seconds"])
+        return self.engine.get_tempo()
+
+    def resync_tempo(self, body):
+        self.engine.resync_tempo()
+        return self.engine.get_tempo()
+
+    def get_layers(self, body):
+        return {"layers": [layer.to_dict() for layer in self.engine.stack.layers]}
+
+    def add_layer(self, body):
+        layer = self.engine.add_layer(
+            body["name"], body.get("group", "all"), body.get("attributes"), body.get("intensity", 1.0),
+            body.get("priority", 0), body.get("blend", "ltp"), **body.get("params", {})
+        )
+        return layer.to_dict()
+
+    def add_pixel_map(self, body):
+        source = str(body["source"])
+        if not source.startswith(pixelmap.GRADIENT):
+            source = self.preset_path(source, "")
+        options = {key: body[key] for key in ("loop", "width", "height", "fps") if key in body}
+        layer = self.engine.add_pixel_map(source, body.get("group", "all"), body.get("intensity", 1.0),
+                                          body.get("priority", 0), body.get("blend", "ltp"), **options)
+        return layer.to_dict()
+
+    def update_layer(self, body):
+        layer = self.engine.stack.update(int(body["id"]), body.get("intensity"), body.get("priority"), body.get("blend"))
+        return layer.to_dict()
+
+    def remove_layer(self, body):
+        return {"removed": self.engine.remove_layer(int(body["id"]))}
+
+    def clear_layers(self, body):
+        self.engine.clear_layers()
+        return {"layers": []}
+
+    def load_sequence(self, body):
+        steps = self.engine.load_sequence(self.preset_path(body["name"]))
+        return {"steps": len(steps)}
+
+    def start_sequence(self, body):
+        return {"running": self.engine.run_sequence(quantize=body.get("quantize"))}
+
+    def stop_sequence(self, body):
+        self.engine.stop_sequence()
+        return {"running": False}
+
+    def get_show(self, body):
+        show = self.engine.show
+        return {"path": show.path if show else None, "contents": show.contents() if show else {}}
+
+    def open_show(self, body):
+        return {"contents": self.engine.open_show(self.preset_path(body["name"], ".show"))}
+
+    def save_show(self, body):
+        return {"contents": self.engine.save_show()}
+
+    def import_presets(self, body):
+        if not self.engine.show:
+            raise ValueError("no show open")
+        imported = self.engine.show.import_presets(self.presets_dir)
+        return {"imported": [{"kind": kind, "name": name} for kind, name in imported]}
+
+    def store_show_scene(self, body):
+        self.engine.store_show_scene(str(body["name"]))
+        return {"scene": body["name"]}
+
+    def recall_show_scene(self, body):
+        self.engine.recall_show_scene(str(body["name"]))
+        return {"scene": body["name"]}
+
+    def load_show_sequence(self, body):
+        return {"steps": len(self.engine.load_show_sequence(str(body["name"])))}
+
+    def start_recording(self, body):
+        self.engine.start_recording(self.preset_path(body["name"], ".dmxr"))
+        return {"recording": body["name"]}
+
+    def stop_recording(self, body):
+        self.engine.stop_recording()
+        return {"recording": None}
+
+    def start_playback(self, body):
+        path = self.preset_path(body["name"], ".dmxr")
+        if not os.path.exists(path):
+            raise ValueError(f"no recording named {body['name']!r}")
+        duration = self.engine.play_recording(path, float(body.get("speed", 1.0)), bool(body.get("loop", False)))
+        return {"playing": body["name"], "duration": duration}
+
+    def stop_playback(self, body):
+        self.engine.stop_playback()
+        return {"playing": None}
+
+    def dispatch(self, method, path, raw_body):
+        """Devuelve (status, payload) para una petición."""
+        handler = self.routes.get((method, path))
+        if handler is None:
+            allowed = any(p == path for _, p in self.routes)
+            return (405, {"error": "method not allowed"}) if allowed else (404, {"error": "not found"})
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                raise ValueError("body must be a JSON object")
+            return 200, handler(body)
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            logging.error(f"API error on {method} {path}: {e}")
+            return 500, {"error": str(e)}
+
+    async def call(self, method, path, raw_body):
+        """dispatch() en el pool de hilos: el event loop sigue atendiendo a los demás clientes."""
+        return await self.loop.run_in_executor(self.executor, self.dispatch, method, path, raw_body)
+
+    # --- HTTP ---
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            if not request_line:
+                return
+            method, target, _ = request_line.split(" ", 2)
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                key, _, value = line.partition(":")
+                headers[key.strip().lower()] = value.strip()
+            path = target.split("?", 1)[0]
+            if path == "/ws/frames" and headers.get("upgrade", "").lower() == "websocket":
+                await self.handle_websocket(reader, writer, headers)
+                return
+            length = int(headers.get("content-length", 0))
+            if not 0 <= length <= MAX_BODY:
+                status, payload = 413, {"error": f"request body larger than {MAX_BODY} bytes"}
+            else:
+                raw_body = await reader.readexactly(length) if length else b""
+                status, payload = await self.call(method, path, raw_body)
+            if isinstance(payload, str):
+                body, content_type = payload.encode(), "text/plain; version=0.0.4"
+            else:
+                body, content_type = json.dumps(payload).encode(), "application/json"
+            writer.write(
+                f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    # --- WebSocket ---
+
+    async def handle_websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+        await writer.drain()
+        writer.transport.set_write_buffer_limits(high=64 * 1024)
+        client = FrameClient(writer)
+        self.clients.add(client)
+        sender = asyncio.ensure_future(self.send_frames(client))
+        try:
+            while True:
+                opcode, payload = await read_ws_frame(reader)
+                if opcode == 0x8:  # close
+                    writer.write(encode_ws_frame(0x8, payload[:2]))
+                    break
+                if opcode == 0x9:  # ping
+                    writer.write(encode_ws_frame(0xA, payload))
+                elif opcode == 0x1:
+                    writer.write(encode_ws_frame(0x1, await self.handle_ws_command(payload)))
+        except WebSocketError as e:
+            logging.warning(f"WebSocket client rejected: {e}")
+            writer.write(encode_ws_frame(0x8, struct.pack("!H", e.code) + str(e).encode()[:120]))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(client)
+            sender.cancel()
+            logging.info(f"WebSocket client closed: {client.sent} frames sent, {client.dropped} dropped")
+
+    async def handle_ws_command(self, payload):
+        try:
+            message = json.loads(payload)
+            status, result = await self.call("POST", message["path"], json.dumps(message.get("body", {})))
+        except (ValueError, KeyError, TypeError) as e:
+            status, result = 400, {"error": str(e)}
+        return json.dumps({"status": status, "result": result}).encode()
+
+    async def send_frames(self, client):
+        try:
+            while True:
+                await client.ready.wait()
+                client.ready.clear()
+                seq, frame = client.pending
+                client.pending = None
+                if client.last is None or len(client.last) != len(frame):
+                    message = encode_frame_message(KEYFRAME, seq, frame)
+                else:
+                    message = encode_frame_message(DELTA, seq, frame, client.last)
+                client.last = frame
+                if message is None:
+                    continue
+                client.writer.write(encode_ws_frame(0x2, message))
+                await client.writer.drain()  # Mientras drena, los frames nuevos sustituyen al pendiente
+                client.sent += 1
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    def on_frame(self, packet):
+        # Hilo de envío DMX: solo se copia el frame y se pasa al event loop
+        if self.clients:
+            frame = np.frombuffer(bytes(packet[1:]), dtype=np.uint8)
+            self.loop.call_soon_threadsafe(self.publish, frame)
+
+    def publish(self, frame):
+        self.seq += 1
+        for client in self.clients:
+            client.offer(self.seq, frame)
+
+    # --- Ciclo de vida ---
+
+    async def serve(self):
+        self._stopped = asyncio.Event()
+        self.executor = concurrent.futures.ThreadPoolExecutor(DISPATCH_THREADS, thread_name_prefix="api-dispatch")
+        try:
+            server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        except OSError:
+            self.executor.shutdown(wait=False)
+            raise
+        logging.info(f"API listening on http://{self.host}:{self.port}")
+        self._started.set()
+        try:
+            await self._stopped.wait()
+        finally:
+            server.close()
+            for client in list(self.clients):
+                client.writer.close()
+            self.executor.shutdown(wait=False)
+
+    def _run(self, token):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self.serve())
+        except OSError as e:
+            logging.error(f"API server failed to start: {e}")
+        finally:
+            self._started.set()
+            self.loop.close()
+
+    def _request_stop(self):
+        if self.loop and self._stopped and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._stopped.set)
+
+    def start(self):
+        self.task = supervisor.start("api", self._run, on_cancel=self._request_stop)
+        self._started.wait(2.0)
+        self.engine.dmx.add_frame_listener(self.on_frame)
+
+    def stop(self, timeout=1.0):
+        self.engine.dmx.remove_frame_listener(self.on_frame)
+        if self.task:
+            supervisor.stop_task(self.task, timeout)
+            self.task = None
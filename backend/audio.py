@@ -1,28 +1,58 @@
 """
 Audio reactivity module for DMX Controller.
 Maps audio input to DMX values for moving heads.
+With beat_sync, energy onsets are reported to the tempo clock as beats so its
+phase follows the music (the BPM itself is set by tap tempo or the API).
 """
 
-import pyaudio
 import numpy as np
 import threading
 import logging
+from backend import clock, metrics
+from backend.supervisor import supervisor
+from backend.tempo import tempo
+
+BANDS = {"bass": (20, 250), "mid": (250, 2000), "high": (2000, 8000)}  # Hz
+ONSET_RATIO = 1.8  # Energía de un bloque frente a la media reciente para contar como beat
+MIN_BEAT_INTERVAL = 0.25  # Segundos; ignora onsets más seguidos (más de 240 BPM)
+
+# Última lectura del audio (0-1) para los efectos de expresiones (backend/expressions.py); 0 sin entrada
+bands = {"level": 0.0, "bass": 0.0, "mid": 0.0, "high": 0.0}
 
 class AudioReactivity:
     def __init__(self):
         self.running = False
+        self.beat_sync = False
         self.lock = threading.Lock()
 
-    def audio_reactivity(self, dmx_sender, start_address, heads, mode_channels):
+    def audio_reactivity(self, token, dmx_sender, start_address, heads, mode_channels):
+        import pyaudio
         CHUNK = 1024
         RATE = 44100
         p = pyaudio.PyAudio()
         stream = p.open(format=pyaudio.paInt16, channels=1, rate=RATE, input=True, frames_per_buffer=CHUNK)
+        average = None  # Energía media reciente
+        freqs = np.fft.rfftfreq(CHUNK, 1.0 / RATE)
+        band_masks = {name: (freqs >= low) & (freqs < high) for name, (low, high) in BANDS.items()}
+        window = np.hanning(CHUNK).astype(np.float32)
+        last_beat = 0.0
 
         try:
-            while self.running:
+            while self.running and not token.cancelled:
+                if stream.get_read_available() > CHUNK:
+                    metrics.audio_overruns.inc()  # El análisis va por detrás de la entrada
                 data = np.frombuffer(stream.read(CHUNK, exception_on_overflow=False), dtype=np.int16)
                 level = np.abs(data).mean() / 32768 * 255  # Normalize to 0-255
+                spectrum = np.abs(np.fft.rfft(data * window)) / (CHUNK * 32768 / 4)
+                bands.update({name: min(1.0, float(spectrum[mask].mean()) * 8) for name, mask in band_masks.items()},
+                             level=level / 255)
+                if self.beat_sync:
+                    energy = float(np.square(data, dtype=np.float32).mean())
+                    now = clock.now()
+                    if average and energy > average * ONSET_RATIO and now - last_beat >= MIN_BEAT_INTERVAL:
+                        tempo.on_beat(now)
+                        last_beat = now
+                    average = energy if average is None else average * 0.95 + energy * 0.05
                 for head in range(heads):
                     base = start_address - 1 + head * mode_channels
                     r_idx = base + (3 if mode_channels == 9 else 6)
@@ -34,9 +64,9 @@ class AudioReactivity:
                     dmx_sender.update_channel(b_idx, int(level / 2))
                     dmx_sender.update_channel(dimmer_idx, int(level))
                 logging.debug(f"Audio level: {level:.1f}")
-        except Exception as e:
-            logging.error(f"Audio error: {e}")
         finally:
+            # Un error se propaga al supervisor, que reabre el stream
+            bands.update(level=0.0, bass=0.0, mid=0.0, high=0.0)
             stream.stop_stream()
             stream.close()
             p.terminate()
@@ -44,19 +74,17 @@ class AudioReactivity:
 
     def start(self, dmx_sender, start_address, heads, mode_channels):
         with self.lock:
-            if self.running:
+            if supervisor.is_running("audio"):
                 logging.warning("Audio reactivity already running")
                 return
             self.running = True
-            threading.Thread(
-                target=self.audio_reactivity,
-                args=(dmx_sender, start_address, heads, mode_channels),
-                daemon=True
-            ).start()
+            supervisor.start("audio", self.audio_reactivity, args=(dmx_sender, start_address, heads, mode_channels),
+                             restart=True, max_restarts=3)
 
     def stop(self):
         with self.lock:
             self.running = False
+            supervisor.stop("audio", timeout=0.1)  # Puede estar leyendo un bloque del micrófono
 
 audio_reactivity = AudioReactivity()
 
@@ -65,3 +93,6 @@ def run_audio_reactivity(dmx_sender, start_address, heads, mode_channels):
 
 def stop_audio_reactivity():
     audio_reactivity.stop()
+
+def set_beat_sync(enabled):
+    audio_reactivity.beat_sync = enabled
@@ -0,0 +1,175 @@
+"""
+Render clock.
+Every time-based component (send loop pacing, effects, sequences, tempo,
+layers, cues, history, recorder, sensors, IR) reads the time with now() and
+waits with sleep() or wait(event, timeout) from this module instead of calling
+time.monotonic or time.sleep, so the whole engine can run on another clock.
+
+RealClock (the default) is the system monotonic clock. VirtualClock is a
+discrete-event clock for simulation (backend/simulation.py): time only moves
+when run_until() advances it, and it advances once every supervised thread is
+parked on the clock, straight to the earliest pending deadline. Threads due at
+that instant are released one at a time in a fixed order, so a 20-minute show
+runs as fast as the CPU renders its frames and always produces the same frames
+at the same timestamps.
+"""
+
+import logging
+import threading
+import time
+
+
+class RealClock:
+    """Reloj del sistema (time.monotonic)."""
+
+    def now(self):
+        return time.monotonic()
+
+    def wait(self, event=None, timeout=None):
+        """Espera `timeout` segundos o hasta que se active `event`; devuelve True si se activó."""
+        if event is None:
+            time.sleep(timeout or 0.0)
+            return False
+        return event.wait(timeout)
+
+    def notify(self):
+        pass
+
+
+class VirtualClock:
+    """Reloj simulado: el tiempo solo avanza con advance_to() o run_until()."""
+
+    def __init__(self, start=0.0, threads=None, order=None, poll=0.05):
+        self.t = float(start)
+        self.threads = threads or (lambda: [])  # threads() -> hilos que deben estar parados antes de avanzar
+        self.order = order or (lambda thread: thread.name)  # Desempate entre hilos con el mismo plazo
+        self.poll = poll  # Comprobación en tiempo real de eventos activados sin notify()
+        self.cond = threading.Condition()
+        self.waiting = {}  # hilo -> (plazo o None, evento o None)
+        self.stalls = 0  # Pasos en que algún hilo no llegó a pararse en el reloj
+
+    def now(self):
+        return self.t
+
+    def wait(self, event=None, timeout=None):
+        if event is not None and event.is_set():
+            return True
+        thread = threading.current_thread()
+        with self.cond:
+            deadline = None if timeout is None else self.t + max(0.0, timeout)
+            if deadline is not None and deadline <= self.t:
+                return False
+            self.waiting[thread] = (deadline, event)
+            self.cond.notify_all()  # Puede completar un settle()
+            try:
+                # Sigue cuando el reloj lo suelta (plazo cumplido o evento notificado)
+                while thread in self.waiting:
+                    if event is not None and event.is_set():
+                        break
+                    self.cond.wait(self.poll)
+                return event is not None and event.is_set()
+            finally:
+                self.waiting.pop(thread, None)
+
+    def _release(self, due=False):
+        # Los hilos que ya pueden seguir dejan de contar como parados antes de despertarlos;
+        # con `due`, también los de plazo cumplido (run_until los suelta de uno en uno con step())
+        for thread, (deadline, event) in list(self.waiting.items()):
+            if (event is not None and event.is_set()) or (due and deadline is not None and deadline <= self.t):
+                del self.waiting[thread]
+
+    def notify(self):
+        """Despierta a los hilos cuyo evento se ha activado (p. ej. CancelToken.cancel)."""
+        with self.cond:
+            self._release()
+            self.cond.notify_all()
+
+    def advance_to(self, t):
+        with self.cond:
+            self.t = max(self.t, float(t))
+            self._release(due=True)
+            self.cond.notify_all()
+
+    def advance(self, dt):
+        self.advance_to(self.t + dt)
+
+    def next_deadline(self):
+        with self.cond:
+            return min((deadline for deadline, _ in self.waiting.values() if deadline is not None), default=None)
+
+    def settle(self, timeout=1.0):
+        """Espera (en tiempo real) a que todos los hilos vivos de threads() estén parados en el reloj;
+        False si no ocurre en `timeout` segundos."""
+        limit = time.monotonic() + timeout
+        threads = self.threads()  # Fuera de cond: el supervisor cancela tokens con su lock tomado
+        while True:
+            with self.cond:
+                self._release()
+                parked = all(thread in self.waiting or not thread.is_alive() for thread in threads)
+            if parked:
+                # Un hilo que se paró pudo lanzar otro antes: solo vale si la lista no ha cambiado
+                current = self.threads()
+                if current == threads:
+                    return True
+                threads = current
+                continue
+            with self.cond:
+                remaining = limit - time.monotonic()
+                if remaining <= 0:
+                    self.stalls += 1
+                    return False
+                self.cond.wait(min(remaining, 0.005))  # Un hilo que termina no avisa
+
+    def step(self, end):
+        """Suelta al siguiente hilo con plazo hasta `end` (por plazo y después por order); False si no hay."""
+        with self.cond:
+            due = [(deadline, self.order(thread), thread) for thread, (deadline, _) in self.waiting.items()
+                   if deadline is not None and deadline <= end]
+            if not due:
+                return False
+            deadline, _, thread = min(due, key=lambda item: item[:2])
+            self.t = max(self.t, deadline)
+            del self.waiting[thread]
+            self.cond.notify_all()
+        return True
+
+    def run_until(self, end, timeout=1.0):
+        """Avanza hasta `end` soltando los hilos de uno en uno y esperando a que cada uno vuelva a pararse:
+        solo corre un hilo a la vez, así que el resultado no depende del planificador."""
+        self.settle(timeout)
+        while self.step(end):
+            self.settle(timeout)
+        self.advance_to(end)
+        self.settle(timeout)
+
+
+_clock = RealClock()
+
+
+def use(clock):
+    """Cambia el reloj de todo el motor (None = reloj del sistema); devuelve el anterior."""
+    global _clock
+    previous = _clock
+    _clock = clock or RealClock()
+    logging.info(f"Clock: {type(_clock).__name__}")
+    return previous
+
+
+def current():
+    return _clock
+
+
+def now():
+    return _clock.now()
+
+
+def sleep(seconds):
+    _clock.wait(None, seconds)
+
+
+def wait(event, timeout=None):
+    return _clock.wait(event, timeout)
+
+
+def notify():
+    _clock.notify()
@@ -0,0 +1,151 @@
+"""
+Color pipeline: RGB/HSV intents to each fixture's native emitters.
+RGB is converted to RGBW by white extraction with per-fixture calibration, and
+gamma/dimmer curves are applied through precomputed lookup tables (np.take),
+over whole groups at once.
+"""
+
+import numpy as np
+
+CURVES = ("linear", "gamma", "square", "scurve")
+
+
+def curve_function(curve="gamma", gamma=2.2):
+    """Función de respuesta normalizada [0, 1] -> [0, 1]."""
+    if curve == "linear":
+        return lambda x: x
+    if curve == "gamma":
+        return lambda x: x ** gamma
+    if curve == "square":
+        return lambda x: x * x
+    if curve == "scurve":
+        return lambda x: x * x * (3 - 2 * x)
+    raise ValueError(f"unknown curve: {curve}")
+
+
+def build_lut(curve="gamma", gamma=2.2, size=256, out_max=255):
+    """Tabla de `size` entradas con la curva aplicada, escalada a 0..out_max."""
+    x = np.linspace(0.0, 1.0, size)
+    dtype = np.uint8 if out_max <= 255 else np.uint16
+    return np.rint(curve_function(curve, gamma)(x) * out_max).astype(dtype)
+
+
+class Curve:
+    """Curva precalculada: LUT de 256 entradas para datos de 8 bits y de 65536 para valores continuos."""
+
+    def __init__(self, curve="gamma", gamma=2.2):
+        self.curve = curve
+        self.gamma = gamma
+        self.lut8 = build_lut(curve, gamma, 256, 255)
+        self.lut16 = build_lut(curve, gamma, 65536, 65535)
+        self.linear = curve == "linear"
+
+    def apply(self, values):
+        """values float 0-255 -> float 0-255; la entrada se indexa con 16 bits para no perder resolución abajo."""
+        if self.linear:
+            return values
+        idx = np.rint(np.clip(values, 0, 255) * 257).astype(np.intp)
+        return np.take(self.lut16, idx).astype(np.float32) / 257
+
+    def apply_u8(self, data):
+        """Aplica la curva a un array uint8."""
+        return np.take(self.lut8, data)
+
+
+def hsv_to_rgb(h, s, v):
+    """colorsys.hsv_to_rgb vectorizado: arrays en [0, 1] -> (r, g, b) en [0, 1]."""
+    h = np.asarray(h, dtype=np.float32) % 1.0
+    s = np.broadcast_to(np.asarray(s, dtype=np.float32), h.shape)
+    v = np.broadcast_to(np.asarray(v, dtype=np.float32), h.shape)
+    i = np.floor(h * 6.0)
+    f = h * 6.0 - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i.astype(np.int8) % 6
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    return r, g, b
+
+
+def extract_white(rgb, white=(1.0, 1.0, 1.0)):
+    """rgb (N, 3) normalizado -> (rgb restante, w). `white` es el aporte RGB del LED blanco; un componente 0
+    (el blanco no aporta a ese emisor) no limita w."""
+    white = np.asarray(white, dtype=np.float32)
+    ratio = np.divide(rgb, white, out=np.full(np.broadcast(rgb, white).shape, np.inf, dtype=np.float32),
+                      where=white > 0)
+    w = np.clip(np.min(ratio, axis=-1), 0.0, 1.0)
+    return np.clip(rgb - w[..., None] * white, 0.0, 1.0), w
+
+
+def rgb_to_rgbw(r, g, b, white=(1.0, 1.0, 1.0)):
+    """Conversión escalar 0-255 para código que escribe cabezas directamente (set_rgbw)."""
+    rgb, w = extract_white(np.array([r, g, b], dtype=np.float32) / 255, white)
+    return tuple(int(round(x)) for x in np.append(rgb, w) * 255)
+
+
+def calibration_values(values, name):
+    values = np.asarray(values, dtype=np.float32)
+    if values.shape != (3,) or not np.isfinite(values).all() or (values < 0).any():
+        raise ValueError(f"{name} must be three finite values >= 0, got {values.tolist()}")
+    return values
+
+
+class ColorPipeline:
+    """Convierte las intenciones RGB de una capa a los emisores de cada fixture, para todo el grupo a la vez."""
+
+    def __init__(self, heads=0, curve="gamma", gamma=2.2, white_extraction=True, dimmer_curve="linear"):
+        self.curve = Curve(curve, gamma)
+        self.dimmer = Curve(dimmer_curve, gamma)
+        self.white_extraction = white_extraction
+        self.gains = np.ones((0, 3), dtype=np.float32)
+        self.whites = np.ones((0, 3), dtype=np.float32)
+        self.resize(heads)
+
+    def resize(self, heads):
+        """Ajusta las tablas de calibración al número de fixtures (nuevos = sin calibrar)."""
+        for name in ("gains", "whites"):
+            table = getattr(self, name)
+            if len(table) < heads:
+                table = np.vstack([table, np.ones((heads - len(table), 3), dtype=np.float32)])
+            setattr(self, name, table)
+
+    def set_curve(self, curve="gamma", gamma=2.2, dimmer_curve=None):
+        self.curve = Curve(curve, gamma)
+        if dimmer_curve is not None:
+            self.dimmer = Curve(dimmer_curve, gamma)
+
+    def to_dict(self):
+        calibration = {str(i): {"gains": self.gains[i].tolist(), "white": self.whites[i].tolist()}
+                       for i in range(len(self.gains))
+                       if not (self.gains[i] == 1).all() or not (self.whites[i] == 1).all()}
+        return {"curve": self.curve.curve, "gamma": self.curve.gamma, "dimmer_curve": self.dimmer.curve,
+                "white_extraction": self.white_extraction, "calibration": calibration}
+
+    def set_calibration(self, fixture, gains=None, white=None):
+        """gains: ganancia por emisor R, G, B; white: aporte RGB del LED blanco del fixture.
+        ValueError si no son tres valores finitos no negativos (y, en white, alguno mayor que 0)."""
+        gains = None if gains is None else calibration_values(gains, "gains")
+        white = None if white is None else calibration_values(white, "white")
+        if white is not None and not (white > 0).any():
+            raise ValueError("white needs at least one component > 0")
+        self.resize(fixture + 1)
+        if gains is not None:
+            self.gains[fixture] = gains
+        if white is not None:
+            self.whites[fixture] = white
+
+    def convert(self, values, fixtures, has_white):
+        """values: {"red", "green", "blue"} float 0-255 -> mismos atributos (+ "white") tras calibración y curva."""
+        if len(fixtures) and fixtures.max() >= len(self.gains):
+            self.resize(fixtures.max() + 1)
+        rgb = np.stack((values["red"], values["green"], values["blue"]), axis=-1) / 255
+        rgb = np.clip(rgb * self.gains[fixtures], 0.0, 1.0)
+        result = dict(values)
+        if has_white and self.white_extraction:
+            rgb, w = extract_white(rgb, self.whites[fixtures])
+            result["white"] = self.curve.apply(w * 255)
+        for i, attribute in enumerate(("red", "green", "blue")):
+            result[attribute] = self.curve.apply(rgb[:, i] * 255)
+        return result
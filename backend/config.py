@@ -0,0 +1,78 @@
+"""
+Configuration for the DMX Controller.
+Values from config.json (if present) are merged over DEFAULT_CONFIG.
+"""
+
+import copy
+import json
+import logging
+import os
+
+CONFIG_PATH = os.environ.get("DMX_CONFIG", "config.json")
+
+DEFAULT_CONFIG = {
+    # break: sleep/busy/baud (backend/dmx.py); adaptive_length transmite solo hasta el último canal del
+    # patch; refresh_hz 0 = tan rápido como permita la longitud del paquete
+    "dmx": {"port": "/dev/ttyS0", "baudrate": 250000, "break": "sleep", "adaptive_length": False, "refresh_hz": 44},
+    # Entrada DMX por el RX del UART (backend/dmx_input.py): mezcla htp/ltp sobre el programador desde
+    # el canal offset + 1; el último frame se mantiene `hold` segundos si se pierde la señal
+    "dmx_input": {"enabled": False, "port": "/dev/ttyS0", "merge": "htp", "offset": 0, "hold": 1.0},
+    # positions: {"fixture": [x, y]} normalizadas para el pixel mapper; sin ellas, los fixtures van en fila
+    "patch": {"start_address": 1, "mode_channels": 9, "heads": 2, "groups": {}, "positions": {}},
+    # Pipeline de color de los efectos: curva (linear/gamma/square/scurve), extracción de blanco y
+    # calibración por fixture {"0": {"gains": [1, 0.9, 0.8], "white": [1, 0.85, 0.7]}}
+    "color": {"curve": "gamma", "gamma": 2.2, "dimmer_curve": "linear", "white_extraction": True, "calibration": {}},
+    # Caché de frames para efectos periódicos (un periodo por efecto/parámetros/nº de fixtures)
+    "render_cache": {"enabled": True, "budget_mb": 32},
+    # Render de capas en procesos worker (0 = todo en el proceso principal)
+    "render_workers": {"processes": 0},
+    # Publicación de cada frame en memoria compartida para procesos locales (backend/framebus.py)
+    "framebus": {"enabled": False, "name": "dmx_frames", "slots": 8},
+    # Perfilado por frame: anillo de eventos exportable a Chrome trace/Perfetto; volcado automático
+    # en dump_dir cuando un frame dura más de deadline_ms
+    "profiler": {"enabled": False, "capacity": 8192, "deadline_ms": 30, "dump_dir": "logs"},
+    # Etapa de salida: grand master, submasters {grupo: nivel}, límites {grupo: {atributo: máximo}},
+    # inversión {grupo: ["pan", "tilt"]} y curvas {grupo: {atributo: curva}}
+    "output": {"grand_master": 1.0, "submasters": {}, "limits": {}, "invert": {}, "curves": {}},
+    # Historial de deshacer del programador: pasos agrupados por pausas de `coalesce` segundos, con un
+    # máximo de budget_kb de memoria y max_steps pasos
+    "history": {"coalesce": 0.5, "budget_kb": 256, "max_steps": 1000},
+    # Reloj musical (backend/tempo.py): quantize por defecto de los cambios de efecto y arranques de
+    # secuencia (None/"beat"/"bar"/nº de beats); audio_sync ajusta la fase con los beats del audio
+    "tempo": {"bpm": 120, "beats_per_bar": 4, "quantize": None, "audio_sync": False},
+    # Archivo de show (SQLite) abierto al arrancar; None = sin show
+    "show": {"path": None},
+    # Arranque automático del daemon (sin GUI)
+    "daemon": {"effect": None, "sequence": None},
+    # Subsistemas opcionales: solo se importan si están habilitados
+    "subsystems": {"leds": True, "ir": True, "sensors": True, "audio": True, "osc": True},
+    "gpio": {"simulate": False},
+    "sensors": {"type": "DHT11", "interval": 2.0, "simulate": False},
+    "audio": {},
+    "osc": {"ip": "0.0.0.0", "port": 9000},
+    # API HTTP/WebSocket (solo librería estándar + numpy). Sin autenticación: desactivada y solo local por
+    # defecto; "host": "0.0.0.0" la abre a toda la red
+    "api": {"enabled": False, "host": "127.0.0.1", "port": 8080, "presets_dir": "presets"},
+}
+
+
+def _merge(base, override):
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+def load_config(path=CONFIG_PATH):
+    """Carga la configuración; si el archivo no existe se usan los valores por defecto."""
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                _merge(config, json.load(f))
+            logging.info(f"Config loaded from {path}")
+        except Exception as e:
+            logging.error(f"Error loading config {path}: {e}")
+    return config
@@ -0,0 +1,201 @@
+"""
+Tracking cue list.
+Each cue stores only the channels it changes (a sparse delta over the state
+of the previous cue); every other channel tracks through from earlier cues.
+The full state at a cue is rebuilt from the nearest cached keyframe (a full
+universe kept every `keyframe_interval` cues) plus at most that many deltas,
+so GOTO any cue costs the same whatever its number.
+
+Playback (GO/BACK/GOTO) writes the target state into the universe at once and
+crossfades the channels the cue list controls over the cue's fade time from
+the DMX send loop (Engine.compose), so fades are frame-accurate and need no
+thread of their own.
+
+Stored as {"keyframe_interval", "cues": [{"number", "label", "fade", "dmx": {"1": 255}}]},
+with 1-based channels as in sequence steps.
+"""
+
+import bisect
+import threading
+import numpy as np
+from backend import clock
+
+
+class Cue:
+    def __init__(self, number, indices, values, fade=0.0, label=""):
+        self.number = float(number)
+        self.indices = indices  # uint16, canales 0-based que cambia la cue
+        self.values = values  # uint8
+        self.fade = float(fade)
+        self.label = label
+
+    def to_dict(self):
+        return {"number": self.number, "label": self.label, "fade": self.fade,
+                "dmx": {str(i + 1): v for i, v in zip(self.indices.tolist(), self.values.tolist())}}
+
+
+class CueList:
+    def __init__(self, channels=512, keyframe_interval=16):
+        self.channels = channels
+        self.keyframe_interval = keyframe_interval
+        self.cues = []  # Ordenadas por número
+        self.numbers = []
+        self.keyframes = {}  # {posición: estado completo tras esa cue}, en múltiplos de keyframe_interval
+        self.used = np.zeros(channels, dtype=bool)  # Canales que alguna cue controla
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.cues)
+
+    def index(self, number):
+        """Posición de la cue `number`; KeyError si no existe."""
+        i = bisect.bisect_left(self.numbers, float(number))
+        if i == len(self.numbers) or self.numbers[i] != float(number):
+            raise KeyError(f"unknown cue: {number}")
+        return i
+
+    def state(self, position):
+        """Estado completo (uint8) tras la cue en `position`: keyframe anterior más sus deltas."""
+        with self.lock:
+            return self._state(position).copy()
+
+    def _state(self, position):
+        if position < 0:
+            return np.zeros(self.channels, dtype=np.uint8)
+        k = position - position % self.keyframe_interval
+        keyframe = self.keyframes.get(k)
+        if keyframe is None:
+            # Se construye desde el keyframe anterior (solo la primera vez tras cargar o editar)
+            keyframe = self._state(k - 1).copy() if k else np.zeros(self.channels, dtype=np.uint8)
+            cue = self.cues[k]
+            keyframe[cue.indices] = cue.values
+            self.keyframes[k] = keyframe
+        if position == k:
+            return keyframe
+        state = keyframe.copy()
+        for cue in self.cues[k + 1:position + 1]:
+            state[cue.indices] = cue.values
+        return state
+
+    def _invalidate(self, position):
+        for k in [k for k in self.keyframes if k >= position]:
+            del self.keyframes[k]
+
+    def record(self, number, state, fade=0.0, label=""):
+        """Graba (o regraba) la cue `number` desde `state`: guarda solo los canales que cambian respecto
+        al estado que le llega de la cue anterior."""
+        state = np.frombuffer(bytes(state), dtype=np.uint8)[:self.channels]
+        with self.lock:
+            number = float(number)
+            position = bisect.bisect_left(self.numbers, number)
+            replace = position < len(self.numbers) and self.numbers[position] == number
+            previous = self._state(position - 1)
+            changed = np.flatnonzero(state != previous[:len(state)])
+            cue = Cue(number, changed.astype(np.uint16), state[changed].copy(), fade, label)
+            if replace:
+                self.cues[position] = cue
+            else:
+                self.cues.insert(position, cue)
+                self.numbers.insert(position, number)
+            self.used[cue.indices] = True
+            self._invalidate(position)
+        return cue
+
+    def delete(self, number):
+        """Borra una cue; lo que cambiaba deja de llegar por tracking a las siguientes."""
+        with self.lock:
+            position = self.index(number)
+            del self.cues[position]
+            del self.numbers[position]
+            self._invalidate(position)
+            self.used[:] = False
+            for cue in self.cues:
+                self.used[cue.indices] = True
+
+    def to_dict(self):
+        return {"keyframe_interval": self.keyframe_interval, "cues": [cue.to_dict() for cue in self.cues]}
+
+    @classmethod
+    def from_dict(cls, data, channels=512):
+        cue_list = cls(channels, data.get("keyframe_interval", 16))
+        for item in sorted(data.get("cues", []), key=lambda c: float(c["number"])):
+            pairs = sorted((int(addr) - 1, value) for addr, value in item.get("dmx", {}).items())
+            indices = np.array([i for i, _ in pairs], dtype=np.uint16)
+            values = np.array([max(0, min(255, int(v))) for _, v in pairs], dtype=np.uint8)
+            cue = Cue(item["number"], indices, values, item.get("fade", 0.0), item.get("label", ""))
+            cue_list.cues.append(cue)
+            cue_list.numbers.append(cue.number)
+            cue_list.used[indices] = True
+        return cue_list
+
+
+class CuePlayer:
+    def __init__(self, cue_list, read, write, clock=clock.now):
+        self.cue_list = cue_list
+        self.read = read  # read() -> bytes del universo actual
+        self.write = write  # write(indices, values): fija el estado de destino en el universo
+        self.clock = clock
+        self.position = -1  # Cue activa; -1 = ninguna
+        self.fade = None  # (canales, origen, destino, inicio, duración); una sola tupla para leerla sin lock
+
+    def current(self):
+        """Cue activa (o None)."""
+        if 0 <= self.position < len(self.cue_list):
+            return self.cue_list.cues[self.position]
+        return None
+
+    def go(self, fade=None):
+        return self.goto_position(self.position + 1, fade)
+
+    def back(self, fade=None):
+        return self.goto_position(self.position - 1, fade)
+
+    def goto(self, number, fade=None):
+        return self.goto_position(self.cue_list.index(number), fade)
+
+    def goto_position(self, position, fade=None):
+        """Salta a la cue en `position`, fundiendo desde lo que sale ahora (también a mitad de otro fundido)."""
+        if not 0 <= position < len(self.cue_list):
+            raise ValueError("no more cues" if position >= 0 else "already at the first cue")
+        cue = self.cue_list.cues[position]
+        target = self.cue_list.state(position)
+        mask = np.flatnonzero(self.cue_list.used)
+        duration = cue.fade if fade is None else float(fade)
+        now = self.clock()
+        source = self.values(now, mask)
+        # El fundido se publica antes de escribir el destino, para que ningún frame salte directamente a él
+        if duration > 0:
+            self.fade = (mask, source, target[mask].astype(np.float32), now, duration)
+        else:
+            self.fade = None
+        self.write(mask, target[mask])
+        self.position = position
+        return cue
+
+    def values(self, now, mask):
+        """Valores actuales (float32) de los canales `mask`: interpolados si hay un fundido en curso."""
+        fade = self.fade
+        if fade is not None and now - fade[3] < fade[4] and np.array_equal(mask, fade[0]):
+            _, source, target, start, duration = fade
+            return source + (target - source) * ((now - start) / duration)
+        return np.frombuffer(self.read(), dtype=np.uint8)[mask].astype(np.float32)
+
+    def apply(self, data):
+        """Composer: durante un fundido sustituye los canales controlados por su valor interpolado."""
+        fade = self.fade
+        if fade is None:
+            return data
+        mask, source, target, start, duration = fade
+        progress = (self.clock() - start) / duration
+        if progress >= 1.0:
+            self.fade = None
+            return data
+        frame = np.frombuffer(data, dtype=np.uint8).copy()
+        frame[mask] = np.rint(source + (target - source) * progress).astype(np.uint8)
+        return frame.tobytes()
+
+    def status(self):
+        cue = self.current()
+        fade = self.fade
+        return {"cue": cue.number if cue else None, "label": cue.label if cue else "", "position": self.position,
+                "count": len(self.cue_list), "fading": fade is not None and self.clock() - fade[3] < fade[4]}
@@ -1,39 +1,260 @@
 """
 DMX communication module using MAX485.
 Handles sending DMX data to moving heads.
+
+Each frame is break + mark-after-break + start code + slots at 250 kbaud
+(44 µs per slot). A short universe (set_length) is transmitted up to its last
+used slot, padded to the DMX512-A minimum of 1204 µs break to break, so a small
+rig can refresh far above 44 Hz. The break is generated by one of BREAK_MODES;
+backend/dmx_timing.py measures them against a pty or a simulated capture port.
+Frames are paced on the render clock (backend/clock.py); the write timings
+reported to metrics and the profiler stay on time.perf_counter.
 """
 
-import serial
 import threading
 import time
 import logging
+from backend import clock, metrics
+from backend.profiler import profiler
+from backend.supervisor import supervisor
+
+SLOT_TIME = 11 / 250000  # Start + 8 bits + 2 stop a 250 kbaud
+BREAK_TIME = 0.0001  # El transmisor debe dar al menos 92 µs
+MIN_PACKET_TIME = 0.001204  # Mínimo de break a break (DMX512-A)
+MIN_SLOTS = 24  # Con break y MAB, 24 canales llegan al mínimo de 1204 µs
+BREAK_BAUDRATE = 76800  # Un 0x00 a esta velocidad: 117 µs en bajo (break) y 26 µs de stop (MAB)
+
+
+def packet_time(slots):
+    """Duración mínima en el cable de un frame con `slots` canales."""
+    return max(MIN_PACKET_TIME, BREAK_TIME + (slots + 1) * SLOT_TIME)
+
+
+def break_sleep(port, packet):
+    """break_condition y time.sleep: la duración real depende del planificador (típicamente 150-200 µs)."""
+    port.break_condition = True
+    time.sleep(BREAK_TIME)
+    port.break_condition = False
+    t = time.perf_counter()
+    port.write(packet)
+    return t
+
+
+def break_busy(port, packet):
+    """break_condition con espera activa: break preciso a cambio de ~100 µs de CPU por frame."""
+    port.break_condition = True
+    end = time.perf_counter() + BREAK_TIME
+    while time.perf_counter() < end:
+        pass
+    port.break_condition = False
+    t = time.perf_counter()
+    port.write(packet)
+    return t
+
+
+def break_baud(port, packet):
+    """Break como un 0x00 a baja velocidad: solo write, tcdrain y tcsetattr, sin ioctl de break."""
+    baudrate = port.baudrate
+    port.baudrate = BREAK_BAUDRATE
+    port.write(b"\x00")
+    port.flush()
+    port.baudrate = baudrate
+    t = time.perf_counter()
+    port.write(packet)
+    return t
+
+
+def break_none(port, packet):
+    """Sin break: para salidas que no son un UART (la captura de backend/simulation.py)."""
+    t = time.perf_counter()
+    port.write(packet)
+    return t
+
+
+# Cada estrategia genera el break, escribe el paquete y devuelve el instante en que empezó la escritura
+BREAK_MODES = {"sleep": break_sleep, "busy": break_busy, "baud": break_baud, "none": break_none}
+
+
+class NullPort:
+    """Stand-in serial port used when the UART (or pyserial) is unavailable; discards output."""
+
+    def __init__(self):
+        self.break_condition = False
+        self.baudrate = 250000
+
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def open_port(port, baudrate):
+    """Abre el puerto serie DMX; si falla devuelve un NullPort para que la app siga funcionando."""
+    try:
+        import serial
+        return serial.Serial(port, baudrate=baudrate, stopbits=serial.STOPBITS_TWO)
+    except ImportError:
+        logging.error("pyserial not installed, DMX output disabled")
+    except Exception as e:
+        logging.error(f"Cannot open DMX port {port}: {e}, DMX output disabled")
+    return NullPort()
+
 
 class DMXSender:
-    def __init__(self, port='/dev/ttyS0', baudrate=250000, num_channels=512):
-        self.serial = serial.Serial(port, baudrate=baudrate, stopbits=serial.STOPBITS_TWO)
+    def __init__(self, port='/dev/ttyS0', baudrate=250000, num_channels=512, serial_port=None, break_mode="sleep"):
+        self.serial = serial_port if serial_port is not None else open_port(port, baudrate)
         self.lock = threading.Lock()
         self.dmx_data = bytearray([0] * num_channels)
+        self.version = 0  # Se incrementa con cada escritura (backend/history.py detecta así los cambios)
         self.running = False
+        self.first_frame = threading.Event()
+        self.started_at = None
+        self.first_frame_at = None
+        self.frame_listeners = []
+        self.composer = None  # composer(data) -> data final del frame (p. ej. EffectStack.compose)
+        self.output = None  # output(data) -> data a transmitir (p. ej. OutputProcessor.process)
+        self.finished = None  # Frame ya compuesto que se transmite tal cual (reproducción de backend/recorder.py)
+        self.task = None
+        self.break_mode = None
+        self.send_break = None
+        self.set_break_mode(break_mode)
+        self.length = None  # Canales transmitidos; None = universo completo
+        self.interval = 0.023  # ~44 Hz
         logging.info(f"DMXSender initialized on {port}")
 
+    def set_break_mode(self, mode):
+        if mode not in BREAK_MODES:
+            raise ValueError(f"unknown break mode: {mode} (expected one of {', '.join(BREAK_MODES)})")
+        self.break_mode = mode
+        self.send_break = BREAK_MODES[mode]
+
+    def set_length(self, slots):
+        """Transmite solo los primeros `slots` canales (None = universo completo), como mínimo MIN_SLOTS."""
+        self.length = None if slots is None else max(MIN_SLOTS, min(int(slots), len(self.dmx_data)))
+
+    def set_refresh_rate(self, hz):
+        """Frames por segundo objetivo; 0 = tan rápido como lo permita la longitud del paquete."""
+        self.interval = 1.0 / hz if hz else 0.0
+
+    def frame_interval(self):
+        return max(self.interval, packet_time(self.length or len(self.dmx_data)))
+
+    def transmit(self, packet):
+        """Break + paquete (recortado a la longitud activa); espera a que salga del UART antes del
+        siguiente break, que si no cortaría el frame anterior. Devuelve el inicio de la escritura."""
+        wire = packet if self.length is None else packet[:1 + self.length]
+        t = self.send_break(self.serial, wire)
+        self.serial.flush()
+        return t
+
     def update_channel(self, addr, value):
+        t = time.perf_counter()
         with self.lock:
+            waited = time.perf_counter() - t
             if 0 <= addr < len(self.dmx_data):
                 self.dmx_data[addr] = max(0, min(255, value))
+                self.version += 1
+        metrics.lock_wait_seconds.observe(waited)
+
+    def update_channels(self, values):
+        """Escritura en lote: values es un iterable de (addr, value) aplicado con un solo lock."""
+        t = time.perf_counter()
+        with self.lock:
+            waited = time.perf_counter() - t
+            size = len(self.dmx_data)
+            for addr, value in values:
+                if 0 <= addr < size:
+                    self.dmx_data[addr] = max(0, min(255, value))
+            self.version += 1
+        metrics.lock_wait_seconds.observe(waited)
+
+    def update_frame(self, data):
+        """Sustituye el universo desde el canal 1 con `data` (bytes o array uint8)."""
+        with self.lock:
+            size = min(len(data), len(self.dmx_data))
+            self.dmx_data[:size] = bytes(data[:size])
+            self.version += 1
+
+    def send_finished(self, data):
+        """Transmite `data` (un frame de salida ya compuesto) sin pasar por composer ni output;
+        None vuelve a la salida normal."""
+        with self.lock:
+            self.finished = None if data is None else bytes(data)
+
+    def add_frame_listener(self, callback):
+        """callback(packet) se llama desde el hilo de envío tras cada frame; debe ser rápido."""
+        self.frame_listeners.append(callback)
+
+    def remove_frame_listener(self, callback):
+        if callback in self.frame_listeners:
+            self.frame_listeners.remove(callback)
 
-    def send_loop(self, interval=0.023):  # ~44 Hz refresh rate
-        while self.running:
+    def send_loop(self, token):
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+        last = None
+        while self.running and not token.cancelled:
+            frame_start = time.perf_counter()
+            tick = clock.now()
+            interval = self.frame_interval()
+            if last is not None and tick - last > 2 * interval:
+                metrics.frames_missed.inc(int((tick - last) / interval) - 1)
+            last = tick
+            profiling = profiler.enabled
             with self.lock:
-                packet = bytearray([0]) + self.dmx_data
-                self.serial.break_condition = True
-                time.sleep(0.0001)  # Break time
-                self.serial.break_condition = False
-                self.serial.write(packet)
-            time.sleep(interval)
+                finished = self.finished
+                data = bytes(self.dmx_data) if finished is None else finished
+            if self.composer and finished is None:
+                t = time.perf_counter()
+                try:
+                    data = self.composer(data)
+                except Exception as e:
+                    logging.error(f"Frame composer error: {e}")
+                if profiling:
+                    profiler.span("compose", t, time.perf_counter())
+            if self.output and finished is None:
+                t = time.perf_counter()
+                try:
+                    data = self.output(data)
+                except Exception as e:
+                    logging.error(f"Output stage error: {e}")
+                if profiling:
+                    profiler.span("output", t, time.perf_counter())
+            packet = b"\x00" + data
+            write_start = time.perf_counter()
+            metrics.frame_seconds.observe(write_start - frame_start)
+            t = self.transmit(packet)
+            write_end = time.perf_counter()
+            metrics.write_seconds.observe(write_end - write_start)
+            metrics.frames_sent.inc()
+            for listener in self.frame_listeners:
+                try:
+                    listener(packet)
+                except Exception as e:
+                    logging.error(f"Frame listener error: {e}")
+            if profiling:
+                profiler.span("break", write_start, t)
+                profiler.span("write", t, write_end)
+                frame_end = time.perf_counter()
+                profiler.span("listeners", write_end, frame_end)
+                profiler.end_frame(frame_start, frame_end)
+            if not self.first_frame.is_set():
+                self.first_frame_at = time.perf_counter()
+                self.first_frame.set()
+                logging.info(f"First DMX frame sent {(self.first_frame_at - self.started_at) * 1000:.1f} ms after start")
+            token.wait(max(0.0, tick + interval - clock.now()))
 
     def start(self):
         self.running = True
-        threading.Thread(target=self.send_loop, daemon=True).start()
+        self.started_at = time.perf_counter()
+        self.task = supervisor.start("dmx-send", self.send_loop, restart=True, max_restarts=100)
 
     def stop(self):
         self.running = False
+        if self.task:
+            supervisor.stop_task(self.task)
+            self.task = None
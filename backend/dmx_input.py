@@ -0,0 +1,254 @@
+"""
+DMX512 input on the UART receive line (MAX485 RO -> GPIO15).
+The port is put in PARMRK mode, so the tty driver marks a break as
+\\xff\\x00\\x00, a byte with a framing or parity error X as \\xff\\x00 X and a
+literal 0xFF as \\xff\\xff. The stream is read in bulk and split at those
+marks with bytes.find, copying runs of slots into a reusable buffer instead of
+handling byte by byte. A frame is published as soon as it reaches the length
+of the previous frames (when that length is stable), otherwise at the next
+break. Frames with errors, more than 512 slots or an alternate start code
+(RDM, text) are counted and dropped.
+
+Received frames are merged over the programmer values (HTP or LTP) before the
+effect layers, and held for `hold` seconds after the signal is lost.
+
+A pty cannot carry a break, so to test without hardware feed the master side
+with encode_frame() output and create the receiver with configure=False:
+    python -m backend.dmx_input
+"""
+
+import logging
+import threading
+import time
+import numpy as np
+from backend import clock, metrics
+from backend.layers import HTP, LTP
+from backend.supervisor import supervisor
+
+BREAK = b"\xff\x00\x00"
+MAX_FRAME = 513  # Start code + 512 canales
+NULL_START_CODE = 0
+
+frames_received = metrics.register(metrics.Counter("dmx_input_frames_total", "Valid DMX frames received"))
+frame_errors = metrics.register(metrics.Counter("dmx_input_errors_total",
+                                                "Received frames dropped (framing errors or overlong)"))
+
+
+def encode_frame(data, start_code=NULL_START_CODE):
+    """Frame tal como lo entrega el driver con PARMRK: break + start code + canales, con 0xFF escapados."""
+    return BREAK + (bytes([start_code]) + bytes(data)).replace(b"\xff", b"\xff\xff")
+
+
+def configure_port(port):
+    """Activa PARMRK en el puerto; sin él, el driver descarta los breaks y no se puede sincronizar."""
+    import termios
+    fd = port.fileno()
+    attrs = termios.tcgetattr(fd)
+    attrs[0] |= termios.PARMRK | termios.INPCK
+    attrs[0] &= ~(termios.IGNBRK | termios.BRKINT | termios.IGNPAR | termios.ISTRIP)
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+
+
+def open_input(port):
+    """Abre el puerto de entrada (lectura con timeout corto para atender la cancelación); None si falla."""
+    try:
+        import serial
+        return serial.Serial(port, baudrate=250000, stopbits=serial.STOPBITS_TWO, timeout=0.05)
+    except ImportError:
+        logging.error("pyserial not installed, DMX input disabled")
+    except Exception as e:
+        logging.error(f"Cannot open DMX input {port}: {e}, DMX input disabled")
+    return None
+
+
+class DMXReceiver:
+    def __init__(self, serial_port, configure=True, merge=HTP, offset=0, hold=1.0):
+        if merge not in (HTP, LTP):
+            raise ValueError(f"unknown merge mode: {merge}")
+        self.port = serial_port
+        if configure:
+            configure_port(serial_port)
+        self.mode = merge
+        self.offset = offset  # El canal 1 recibido se mezcla en el canal offset + 1
+        self.hold = hold  # Segundos que se mantiene el último frame tras perder la señal
+        self.buffer = bytearray(MAX_FRAME)
+        self.index = -1  # Bytes del frame en curso; -1 = esperando un break
+        self.published = 0  # Longitud con la que ya se publicó el frame en curso
+        self.expected = 0  # Longitud del último frame válido
+        self.stable = False  # Los dos últimos frames tenían la misma longitud: se publica sin esperar al break
+        self.pending = b""  # Marca 0xFF partida entre dos lecturas
+        self.frame = np.zeros(512, dtype=np.uint8)
+        self.length = 0
+        self.received_at = None
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.on_status = None  # on_status(status) cuando la señal aparece o se pierde
+        self.signal = False
+        self.frames = 0
+        self.errors = 0
+        self.ignored = 0  # Frames con otro start code
+        self.task = None
+
+    def add_frame_listener(self, callback):
+        """callback(slots) desde el hilo de recepción; `slots` es un buffer reutilizado, hay que copiarlo."""
+        self.listeners.append(callback)
+
+    def remove_frame_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def feed(self, chunk):
+        """Procesa un bloque del stream marcado con PARMRK."""
+        data = self.pending + chunk if self.pending else chunk
+        self.pending = b""
+        view = memoryview(data)
+        pos, size = 0, len(data)
+        while pos < size:
+            mark = data.find(b"\xff", pos)
+            end = size if mark < 0 else mark
+            if end > pos:
+                self._store(view[pos:end])
+            if mark < 0:
+                break
+            if mark + 1 >= size:
+                self.pending = data[mark:]
+                break
+            if data[mark + 1] == 0xff:
+                self._store(view[mark + 1:mark + 2])
+                pos = mark + 2
+                continue
+            if mark + 2 >= size:
+                self.pending = data[mark:]
+                break
+            if data[mark + 2] == 0:
+                self._break()
+            elif self.index >= 0:
+                self._drop()  # Error de trama o paridad a mitad de frame
+            pos = mark + 3
+
+    def _store(self, slots):
+        if self.index < 0:
+            return  # Sin sincronizar: se descarta hasta el siguiente break
+        count = len(slots)
+        if self.index + count > MAX_FRAME:
+            self._drop()
+            return
+        self.buffer[self.index:self.index + count] = slots
+        self.index += count
+        if self.stable and self.index == self.expected:
+            self._finish()
+
+    def _drop(self):
+        self.errors += 1
+        frame_errors.inc()
+        self.index = -1
+
+    def _break(self):
+        if self.index > self.published:
+            self._finish()  # Frame más corto (o más largo) que el anterior
+        self.index = 0
+        self.published = 0
+
+    def _finish(self):
+        length = self.index
+        if length < 2:
+            return
+        if self.buffer[0] != NULL_START_CODE:
+            self.ignored += 1
+            self.published = length
+            return
+        with self.lock:
+            self.frame[:length - 1] = np.frombuffer(self.buffer, dtype=np.uint8, count=length - 1, offset=1)
+            self.length = length - 1
+            self.received_at = clock.now()
+        self.stable = length == self.expected
+        self.published = self.expected = length
+        self.frames += 1
+        frames_received.inc()
+        slots = self.frame[:length - 1]
+        for listener in self.listeners:
+            try:
+                listener(slots)
+            except Exception as e:
+                logging.error(f"DMX input listener error: {e}")
+
+    def has_signal(self):
+        return self.received_at is not None and clock.now() - self.received_at <= self.hold
+
+    def merge(self, data):
+        """Composer de DMXSender: mezcla el último frame recibido sobre `data` (bytes del universo)."""
+        if not self.has_signal():
+            return data
+        frame = np.frombuffer(data, dtype=np.uint8).copy()
+        with self.lock:
+            count = max(0, min(self.length, len(frame) - self.offset))
+            target = frame[self.offset:self.offset + count]
+            if self.mode == HTP:
+                np.maximum(target, self.frame[:count], out=target)
+            else:
+                target[:] = self.frame[:count]
+        return frame.tobytes()
+
+    def status(self):
+        return {"signal": self.has_signal(), "slots": self.length, "frames": self.frames, "errors": self.errors,
+                "ignored": self.ignored, "merge": self.mode, "offset": self.offset}
+
+    def check_signal(self):
+        signal = self.has_signal()
+        if signal != self.signal:
+            self.signal = signal
+            logging.info(f"DMX input signal {'present' if signal else 'lost'}")
+            if self.on_status:
+                self.on_status(self.status())
+
+    def receive_loop(self, token):
+        while not token.cancelled:
+            chunk = self.port.read(max(1, self.port.in_waiting))
+            if chunk:
+                self.feed(chunk)
+            self.check_signal()
+
+    def start(self):
+        self.task = supervisor.start("dmx-input", self.receive_loop, restart=True, max_restarts=100)
+        logging.info(f"DMX input started ({self.mode} merge, offset {self.offset})")
+
+    def stop(self):
+        if self.task:
+            supervisor.stop_task(self.task, timeout=0.1)  # La lectura del puerto vuelve cada 50 ms
+            self.task = None
+        self.port.close()
+
+
+def open_test_pty():
+    """(puerto pyserial sobre el esclavo, fd maestro) para alimentar el receptor con encode_frame()."""
+    import os
+    import tty
+    import serial
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    port = serial.Serial(os.ttyname(slave), timeout=0.05)
+    os.close(slave)
+    return port, master
+
+
+if __name__ == "__main__":
+    # Prueba sin hardware: frames sintéticos (con un error de trama y un frame RDM) a través de un pty
+    import os
+    port, master = open_test_pty()
+    receiver = DMXReceiver(port, configure=False)
+    received = []
+    receiver.add_frame_listener(lambda slots: received.append(bytes(slots)))
+    receiver.start()
+    frames = [bytes((i + n) % 256 for n in range(28)) for i in range(100)]
+    for i, frame in enumerate(frames):
+        os.write(master, encode_frame(frame))
+        if i == 50:
+            os.write(master, BREAK + b"\x00\x01\xff\x00\x07")  # Error de trama: se descarta
+        if i == 60:
+            os.write(master, encode_frame(b"\x01\x10", start_code=0xCC))  # RDM: se ignora
+        time.sleep(0.002)
+    time.sleep(0.2)
+    receiver.stop()
+    os.close(master)
+    print(f"{len(received)} frames received, {receiver.errors} errors, {receiver.ignored} ignored, "
+          f"{'ok' if received == frames else 'MISMATCH'}")
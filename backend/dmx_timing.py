@@ -0,0 +1,176 @@
+"""
+DMX timing self-test.
+Runs every break strategy at several universe lengths against a target port
+and reports the achieved refresh rate and frame period jitter. Two targets:
+
+- CapturePort: a simulated UART that models wire time at the current baud
+  rate, so break length, mark-after-break and breaks that cut into a frame
+  still being shifted out can be measured without hardware.
+- a pty: the real pyserial/termios path (break ioctl, tcdrain, tcsetattr);
+  the master side is read back to check that every byte arrived. A pty does
+  not pace output, so its rate reflects software overhead only.
+
+Usage: python -m backend.dmx_timing [--pty] [--frames N] [--slots 512,28]
+"""
+
+import argparse
+import os
+import threading
+import time
+import numpy as np
+from backend import dmx
+
+
+class CapturePort:
+    """Puerto serie simulado: registra breaks y escrituras con el tiempo que ocuparían en el cable."""
+
+    def __init__(self, baudrate=250000):
+        self.baudrate = baudrate
+        self.busy_until = 0.0  # Fin de la transmisión de lo ya escrito
+        self.break_start = None
+        self.breaks = []  # (duración del break, MAB) de cada frame
+        self.cut = 0  # Breaks puestos mientras aún salían datos
+        self.pending_break = None  # Duración del último break, hasta conocer su MAB
+        self.break_end = None
+        self.written = 0
+
+    @property
+    def break_condition(self):
+        return self.break_start is not None
+
+    @break_condition.setter
+    def break_condition(self, value):
+        now = time.perf_counter()
+        if value and self.break_start is None:
+            if now < self.busy_until:
+                self.cut += 1
+            self.break_start = now
+        elif not value and self.break_start is not None:
+            self.pending_break = now - self.break_start
+            self.break_end = now
+            self.break_start = None
+
+    def write(self, data):
+        now = time.perf_counter()
+        start = max(now, self.busy_until)
+        wire = len(data) * 11 / self.baudrate
+        if len(data) == 1 and data[0] == 0 and self.baudrate < 250000:
+            # Break por cambio de velocidad: 9 bits en bajo y 2 de stop
+            self.pending_break = 9 / self.baudrate
+            self.break_end = start + self.pending_break
+        elif self.pending_break is not None:
+            self.breaks.append((self.pending_break, start - self.break_end))
+            self.pending_break = None
+        self.busy_until = start + wire
+        self.written += len(data)
+        return len(data)
+
+    def flush(self):
+        while time.perf_counter() < self.busy_until:
+            time.sleep(max(0.0, self.busy_until - time.perf_counter() - 0.0002))
+
+    def close(self):
+        pass
+
+
+def open_pty():
+    """Puerto pyserial sobre un pty y un hilo que vacía el lado maestro contando bytes."""
+    import serial
+    master, slave = os.openpty()
+    port = serial.Serial(os.ttyname(slave), baudrate=250000, stopbits=serial.STOPBITS_TWO)
+    os.close(slave)
+    received = [0]
+    done = threading.Event()
+
+    def drain():
+        while not done.is_set():
+            try:
+                received[0] += len(os.read(master, 65536))
+            except OSError:
+                break
+
+    thread = threading.Thread(target=drain, name="pty-drain", daemon=True)
+    thread.start()
+
+    def close():
+        port.close()
+        done.set()
+        os.close(master)
+        thread.join(0.5)
+
+    return port, received, close
+
+
+def measure(sender, frames):
+    """Transmite `frames` frames al ritmo de send_loop y devuelve los periodos medidos."""
+    packet = b"\x00" + bytes(sender.dmx_data)
+    periods = np.empty(frames)
+    last = time.perf_counter()
+    for i in range(frames):
+        frame_start = time.perf_counter()
+        sender.transmit(packet)
+        remaining = frame_start + sender.frame_interval() - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+        now = time.perf_counter()
+        periods[i] = now - last
+        last = now
+    return periods
+
+
+def self_test(modes=None, slots=(512, 128, 28), frames=200, pty=False):
+    """Mide cada estrategia de break y longitud; devuelve una lista de resultados (dicts)."""
+    results = []
+    for mode in modes or [mode for mode in dmx.BREAK_MODES if mode != "none"]:
+        for length in slots:
+            if pty:
+                port, received, close = open_pty()
+            else:
+                port, received, close = CapturePort(), None, None
+            sender = dmx.DMXSender(serial_port=port, break_mode=mode)
+            sender.set_refresh_rate(0)
+            sender.set_length(length)
+            sent = 1 + sender.length
+            try:
+                periods = measure(sender, frames)[1:]
+            finally:
+                if close:
+                    time.sleep(0.05)
+                    close()
+            result = {"break": mode, "slots": sender.length, "fps": 1 / periods.mean(),
+                      "period_ms": periods.mean() * 1000, "p99_ms": np.percentile(periods, 99) * 1000,
+                      "min_period_ms": dmx.packet_time(sender.length) * 1000}
+            if pty:
+                extra = 1 if mode == "baud" else 0
+                result["bytes_ok"] = received[0] == frames * (sent + extra)
+            else:
+                breaks = np.array(port.breaks) if port.breaks else np.zeros((1, 2))
+                result.update(break_us=breaks[:, 0].mean() * 1e6, break_max_us=breaks[:, 0].max() * 1e6,
+                              mab_us=breaks[:, 1].mean() * 1e6, cut_frames=port.cut)
+            results.append(result)
+    return results
+
+
+def format_results(results):
+    lines = []
+    for r in results:
+        line = (f"{r['break']:6} {r['slots']:4} slots  {r['fps']:7.1f} fps  period {r['period_ms']:6.2f} ms "
+                f"(p99 {r['p99_ms']:6.2f}, min {r['min_period_ms']:5.2f})")
+        if "bytes_ok" in r:
+            line += f"  bytes {'ok' if r['bytes_ok'] else 'MISSING'}"
+        else:
+            line += (f"  break {r['break_us']:6.1f} µs (max {r['break_max_us']:6.1f})  MAB {r['mab_us']:6.1f} µs"
+                     f"  cut {r['cut_frames']}")
+        lines.append(line)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DMX break/refresh timing self-test")
+    parser.add_argument("--pty", action="store_true", help="measure through a pty instead of the capture port")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--slots", default="512,128,28")
+    parser.add_argument("--break", dest="modes", default=None, help="comma-separated break modes")
+    args = parser.parse_args()
+    modes = args.modes.split(",") if args.modes else None
+    print(format_results(self_test(modes, [int(s) for s in args.slots.split(",")], args.frames, args.pty)))
@@ -1,74 +1,100 @@
 """
 Effects module for DMX moving heads.
 Supports ColorChase, Strobe, and Rainbow effects.
+EffectManager runs one effect in its own thread; the Effect classes below are
+the vectorized versions rendered per frame by the layer stack (backend/layers.py).
 """
 
-import threading
 import time
 import colorsys
 import logging
+import numpy as np
+from backend.color import hsv_to_rgb
+from backend.profiler import profiler
+from backend.supervisor import supervisor
+from backend.tempo import tempo
+
+EFFECT_NAMES = ("ColorChase", "Strobe", "Rainbow")
 
 class EffectManager:
     def __init__(self):
         self.current_effect = None
         self.running = False
+        self.speed = 100  # Velocidad en %, 100 = tiempos originales
+        self.beats = None  # Con valor, un ciclo cada `beats` beats del reloj de tempo en lugar de la velocidad
+
+    def set_speed(self, value):
+        self.speed = max(1, min(100, value))
+
+    def set_beats(self, beats):
+        self.beats = beats or None
+
+    def _wait(self, token, seconds, steps):
+        """Espera al siguiente paso (`steps` pasos por ciclo); devuelve True si el efecto se ha detenido.
+        Sin tempo, `seconds` escalados por la velocidad; con tempo, hasta el siguiente punto de la rejilla."""
+        if self.beats:
+            return tempo.wait(token, self.beats / steps)
+        return token.wait(seconds * 100.0 / self.speed)
 
     def run_effect(self, name, dmx_sender, start_address, heads, mode_channels):
-        """Inicia el efecto seleccionado en un hilo separado."""
-        self.stop_effect()  # Detiene cualquier efecto previo
+        """Inicia el efecto seleccionado en un hilo supervisado (sustituye al anterior)."""
         self.running = True
         self.current_effect = name
-        thread = threading.Thread(
-            target=self._dispatch_effect,
-            args=(name, dmx_sender, start_address, heads, mode_channels),
-            daemon=True
-        )
-        thread.start()
-
-    def _dispatch_effect(self, name, dmx_sender, start_address, heads, mode_channels):
+        supervisor.start("effect", self._dispatch_effect, args=(name, dmx_sender, start_address, heads, mode_channels))
+
+    def _dispatch_effect(self, token, name, dmx_sender, start_address, heads, mode_channels):
         """Llama a la función correspondiente del efecto."""
         if name == "ColorChase":
-            self.color_chase(dmx_sender, start_address, heads, mode_channels)
+            self.color_chase(token, dmx_sender, start_address, heads, mode_channels)
         elif name == "Strobe":
-            self.strobe(dmx_sender, start_address, heads, mode_channels)
+            self.strobe(token, dmx_sender, start_address, heads, mode_channels)
         elif name == "Rainbow":
-            self.rainbow(dmx_sender, start_address, heads, mode_channels)
+            self.rainbow(token, dmx_sender, start_address, heads, mode_channels)
         logging.info(f"Effect {name} finished")
 
     def stop_effect(self):
         """Detiene cualquier efecto en ejecución."""
         self.running = False
         self.current_effect = None
+        supervisor.stop("effect")
 
-    def color_chase(self, dmx_sender, start_address, heads, mode_channels):
+    def color_chase(self, token, dmx_sender, start_address, heads, mode_channels):
         """Cambia colores básicos en secuencia por cada cabeza."""
         colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
-        while self.running and self.current_effect == "ColorChase":
+        while not token.cancelled:
             for color in colors:
+                t = time.perf_counter()
                 for head in range(heads):
                     base = start_address - 1 + head * mode_channels
                     r_idx = base + (3 if mode_channels == 9 else 6)
                     dmx_sender.update_channel(r_idx, color[0])
                     dmx_sender.update_channel(r_idx + 1, color[1])
                     dmx_sender.update_channel(r_idx + 2, color[2])
-                time.sleep(0.5)
+                if profiler.enabled:
+                    profiler.span("ColorChase", t, time.perf_counter())
+                if self._wait(token, 0.5, len(colors)):
+                    return
 
-    def strobe(self, dmx_sender, start_address, heads, mode_channels):
+    def strobe(self, token, dmx_sender, start_address, heads, mode_channels):
         """Enciende y apaga el canal de strobe a intervalos fijos."""
         on = False
-        while self.running and self.current_effect == "Strobe":
+        while not token.cancelled:
+            t = time.perf_counter()
             val = 255 if on else 0
             for head in range(heads):
                 base = start_address - 1 + head * mode_channels
                 idx = base + (2 if mode_channels == 9 else 5)
                 dmx_sender.update_channel(idx, val)
+            if profiler.enabled:
+                profiler.span("Strobe", t, time.perf_counter())
             on = not on
-            time.sleep(0.2)
+            self._wait(token, 0.2, 2)
 
-    def rainbow(self, dmx_sender, start_address, heads, mode_channels):
+    def rainbow(self, token, dmx_sender, start_address, heads, mode_channels):
         """Aplica un ciclo HSV de color arcoiris."""
         hue = 0.0
-        while self.running and self.current_effect == "Rainbow":
+        while not token.cancelled:
+            t = time.perf_counter()
             r, g, b = [int(x * 255) for x in colorsys.hsv_to_rgb(hue, 1.0, 1.0)]
             for head in range(heads):
                 base = start_address - 1 + head * mode_channels
@@ -76,8 +102,10 @@ class EffectManager:
                 dmx_sender.update_channel(r_idx, r)
                 dmx_sender.update_channel(r_idx + 1, g)
                 dmx_sender.update_channel(r_idx + 2, b)
+            if profiler.enabled:
+                profiler.span("Rainbow", t, time.perf_counter())
             hue = (hue + 0.01) % 1.0
-            time.sleep(0.1)
+            self._wait(token, 0.1, 100)
 
 # Instancia única del manejador de efectos
 effect_manager = EffectManager()
@@ -89,3 +117,97 @@ def run_effect(name, dmx_sender, start_address, heads, mode_channels):
 def stop_effect():
     """Función externa para detener efectos."""
     effect_manager.stop_effect()
+
+def set_speed(value):
+    """Función externa para ajustar la velocidad de los efectos (1-100%)."""
+    effect_manager.set_speed(value)
+
+def set_beats(beats):
+    """Función externa para fijar los beats por ciclo de los efectos (None = por velocidad)."""
+    effect_manager.set_beats(beats)
+
+
+class Effect:
+    """Efecto vectorizado: render(t, count) -> {atributo: array float 0-255 por fixture}."""
+    name = None
+    attributes = ()
+    live = False  # Lee estado del proceso principal (tempo, audio): no se reparte a los workers
+
+    def __init__(self, speed=100, spread=0.0, beats=None):
+        self.speed = speed
+        self.spread = spread  # Desfase entre fixtures consecutivos, en fracción de ciclo
+        self.beats = beats  # Con valor, un ciclo cada `beats` beats en fase con el tempo (EffectStack.tempo)
+
+    def params(self):
+        return {"speed": self.speed, "spread": self.spread, "beats": self.beats}
+
+    def effect_time(self, t):
+        return t * self.speed / 100.0
+
+    def cycle(self):
+        """Periodo en tiempo de efecto si render() es función pura y periódica de t; None si no (no se cachea)."""
+        return None
+
+    def render(self, t, count):
+        raise NotImplementedError
+
+    def close(self):
+        """Libera lo que el efecto tenga abierto (hilos, archivos) cuando su capa sale de la pila."""
+
+
+class ColorChaseEffect(Effect):
+    name = "ColorChase"
+    attributes = ("red", "green", "blue")
+    COLORS = np.array([(255, 0, 0), (0, 255, 0), (0, 0, 255)], dtype=np.float32)
+    STEP = 0.5
+
+    def cycle(self):
+        return self.STEP * len(self.COLORS)
+
+    def render(self, t, count):
+        steps = self.effect_time(t) / self.STEP + self.spread * len(self.COLORS) * np.arange(count)
+        rgb = self.COLORS[np.floor(steps).astype(np.intp) % len(self.COLORS)]
+        return {"red": rgb[:, 0], "green": rgb[:, 1], "blue": rgb[:, 2]}
+
+
+class StrobeEffect(Effect):
+    name = "Strobe"
+    attributes = ("dimmer",)
+    STEP = 0.2
+
+    def cycle(self):
+        return self.STEP * 2
+
+    def render(self, t, count):
+        steps = self.effect_time(t) / self.STEP + self.spread * 2 * np.arange(count)
+        return {"dimmer": (np.floor(steps).astype(np.intp) % 2) * np.float32(255)}
+
+
+class RainbowEffect(Effect):
+    name = "Rainbow"
+    attributes = ("red", "green", "blue")
+    HUE_PER_SECOND = 0.1
+
+    def cycle(self):
+        return 1.0 / self.HUE_PER_SECOND
+
+    def render(self, t, count):
+        hue = self.effect_time(t) * self.HUE_PER_SECOND + self.spread * np.arange(count)
+        r, g, b = hsv_to_rgb(hue, 1.0, 1.0)
+        return {"red": r * 255, "green": g * 255, "blue": b * 255}
+
+
+LAYER_EFFECTS = {cls.name: cls for cls in (ColorChaseEffect, StrobeEffect, RainbowEffect)}
+
+
+def register_effect(cls):
+    """Registra una clase Effect para usarla por nombre en la pila de capas."""
+    LAYER_EFFECTS[cls.name] = cls
+    return cls
+
+
+def create_effect(name, **params):
+    """Instancia un efecto vectorizado por nombre."""
+    if name not in LAYER_EFFECTS:
+        raise KeyError(f"unknown effect: {name}")
+    return LAYER_EFFECTS[name](**params)
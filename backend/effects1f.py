@@ -9,6 +9,7 @@ import colorsys
 import logging
 from backend.heads.mh110_head import MH110Head
 from backend.heads.stagewash_head import StageWashHead
+from backend.color import rgb_to_rgbw
 
 class EffectManager:
     def __init__(self):
@@ -44,7 +45,7 @@ class EffectManager:
                     if hasattr(head, "set_rgb"):
                         head.set_rgb(dmx_sender.dmx_data, *color)
                     elif hasattr(head, "set_rgbw"):
-                        head.set_rgbw(dmx_sender.dmx_data, *color, 0)
+                        head.set_rgbw(dmx_sender.dmx_data, *rgb_to_rgbw(*color))
                 time.sleep(max(0.05, 1.0 - self.speed / 100.0))
 
     def strobe(self, dmx_sender):
@@ -65,7 +66,7 @@ class EffectManager:
                 if hasattr(head, "set_rgb"):
                     head.set_rgb(dmx_sender.dmx_data, r, g, b)
                 elif hasattr(head, "set_rgbw"):
-                    head.set_rgbw(dmx_sender.dmx_data, r, g, b, 0)
+                    head.set_rgbw(dmx_sender.dmx_data, *rgb_to_rgbw(r, g, b))
             hue = (hue + 0.01) % 1.0
             time.sleep(max(0.02, 0.2 - self.speed / 200.0))
 
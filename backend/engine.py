@@ -0,0 +1,742 @@
+"""
+DMX engine: output, effects, sequences, OSC, sensors, IR and status LEDs,
+with no Qt dependency. Used by the headless daemon (daemon.py) and by the
+GUI (main.py), which is just one client of the engine.
+"""
+
+import logging
+import threading
+import time
+from backend import config as config_module
+from backend import color, cues, dmx, dmx_input, effects, expressions, framebus, gpio, history, layers, metrics
+from backend import movement, output, pixelmap, recorder, render_cache, scenes, sequences, subsystems, workers
+from backend.profiler import profiler
+from backend.supervisor import supervisor
+from backend.tempo import tempo
+from backend.patch import PROFILES, Patch
+from backend.showfile import ShowFile
+
+
+class Engine:
+    def __init__(self, config=None, serial_port=None):
+        self.config = config or config_module.load_config()
+        self.serial_port = serial_port  # Sustituye al UART (p. ej. la captura de backend/simulation.py)
+        self.patch = Patch(**self.config["patch"])
+        color_config = self.config["color"]
+        self.color = color.ColorPipeline(self.patch.heads, color_config["curve"], color_config["gamma"],
+                                         color_config["white_extraction"], color_config["dimmer_curve"])
+        self.set_calibration(color_config["calibration"])
+        cache_config = self.config["render_cache"]
+        self.render_cache = render_cache.RenderCache(cache_config["budget_mb"]) if cache_config["enabled"] else None
+        tempo_config = self.config["tempo"]
+        tempo.beats_per_bar = tempo_config["beats_per_bar"]
+        tempo.set_bpm(tempo_config["bpm"])
+        self.tempo = tempo
+        self.stack = layers.EffectStack(self.patch, color=self.color, cache=self.render_cache, tempo=tempo)
+        self.render_pool = None
+        self.framebus = None
+        self.output = output.OutputProcessor(self.patch, gamma=color_config["gamma"], **self.config["output"])
+        self.effect_layer = None
+        self.effect_speed = 100
+        self.effect_beats = None
+        self.effect_definitions = {}  # Efectos de expresiones definidos en esta sesión o en el show
+        self.dmx = None
+        self.dmx_input = None
+        self.history = None
+        self.cue_list = cues.CueList()
+        self.cue_player = cues.CuePlayer(self.cue_list, self.read_universe, self.write_channels)
+        self.leds = self.ir = self.sensors = self.audio = self.osc = None
+        self.sensor_service = None
+        self.api = None
+        self.show = None
+        self.recorder = None
+        self.player = None
+        self.current_effect = None
+        self.current_sequence = None
+        self.sequence_task = None
+        self.listeners = []
+        self.lock = threading.RLock()
+        self.running = False
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        """Arranca la salida DMX primero y después los subsistemas opcionales habilitados."""
+        if self.config["show"]["path"]:
+            self.open_show(self.config["show"]["path"])
+        processes = self.config["render_workers"]["processes"]
+        if processes:
+            cache_config = self.config["render_cache"]
+            budget = cache_config["budget_mb"] if cache_config["enabled"] else 0
+            self.render_pool = workers.RenderPool(self.patch, processes, budget)
+            self.render_pool.start()
+            self.stack.pool = self.render_pool
+        dmx_config = self.config["dmx"]
+        self.dmx = dmx.DMXSender(dmx_config["port"], dmx_config["baudrate"], serial_port=self.serial_port,
+                                 break_mode=dmx_config["break"])
+        self.dmx.set_refresh_rate(dmx_config["refresh_hz"])
+        self.update_universe_length()
+        self.register_metrics()
+        profiler_config = self.config["profiler"]
+        profiler.configure(profiler_config["enabled"], profiler_config["deadline_ms"] / 1000, profiler_config["dump_dir"],
+                           profiler_config["capacity"])
+        self.dmx.composer = self.compose
+        self.start_dmx_input()
+        history_config = self.config["history"]
+        self.history = history.History(self.dmx, history_config["coalesce"], budget_kb=history_config["budget_kb"],
+                                       max_steps=history_config["max_steps"])
+        # Reproducción, secuencias y AudioReactivity escriben el programador: no son ediciones del usuario
+        self.history.ignore = lambda: (self.player is not None and self.player.running) \
+            or supervisor.is_running("sequence") or supervisor.is_running("audio")
+        self.history.start()
+        self.dmx.output = self.output.process
+        bus_config = self.config["framebus"]
+        if bus_config["enabled"]:
+            try:
+                self.framebus = framebus.FramePublisher(bus_config["name"], bus_config["slots"], len(self.dmx.dmx_data))
+                self.dmx.add_frame_listener(self.framebus.publish)
+            except OSError as e:
+                logging.error(f"Frame bus unavailable: {e}")
+        self.dmx.start()
+        self.running = True
+        self.load_subsystems()
+        started = ["DMX"]
+        if self.sensors:
+            self.sensor_service = self.sensors.SensorService(interval=self.config["sensors"]["interval"])
+            self.sensor_service.subscribe(lambda reading: self.emit("sensor", reading))
+            self.set_sensor_type(self.config["sensors"]["type"])
+            self.sensor_service.start()
+            started.append("Sensor")
+        if self.ir:
+            self.ir.on_ir_change(self.on_ir_change)
+            started.append("IR")
+        if self.audio:
+            self.audio.set_beat_sync(self.config["tempo"]["audio_sync"])
+        if self.osc:
+            try:
+                self.osc.start_osc_server(self.dmx, self.config["osc"]["ip"], self.config["osc"]["port"])
+                started.append("OSC")
+            except Exception as e:
+                logging.error(f"OSC server failed to start: {e}")
+        if self.config["api"]["enabled"]:
+            from backend import api
+            api_config = self.config["api"]
+            self.api = api.APIServer(self, api_config["host"], api_config["port"], api_config["presets_dir"])
+            self.api.start()
+            started.append("API")
+        self.set_status_led(0, 1, 0)
+        logging.info(f"Engine started: {', '.join(started)}")
+
+    def start_dmx_input(self):
+        input_config = self.config["dmx_input"]
+        if not input_config["enabled"]:
+            return
+        if input_config["port"] == self.config["dmx"]["port"] and self.dmx.break_mode == "baud":
+            # pyserial reconfigura el tty al cambiar de velocidad y borra PARMRK
+            logging.warning("DMX input shares the output UART: 'baud' break mode disables break detection")
+        port = dmx_input.open_input(input_config["port"])
+        if port is None:
+            return
+        try:
+            self.dmx_input = dmx_input.DMXReceiver(port, merge=input_config["merge"], offset=input_config["offset"],
+                                                   hold=input_config["hold"])
+        except Exception as e:
+            logging.error(f"DMX input unavailable: {e}")
+            port.close()
+            return
+        self.dmx_input.on_status = lambda status: self.emit("dmx_input", status)
+        self.dmx_input.start()
+
+    def compose(self, data):
+        """Composer del frame: fundido de cues y entrada DMX sobre los valores del programador, después las capas."""
+        data = self.cue_player.apply(data)
+        if self.dmx_input:
+            data = self.dmx_input.merge(data)
+        return self.stack.compose(data)
+
+    def get_dmx_input(self):
+        if not self.dmx_input:
+            return {"enabled": False}
+        status = self.dmx_input.status()
+        status["channels"] = self.dmx_input.frame[:self.dmx_input.length].tolist()
+        return dict(status, enabled=True)
+
+    def load_subsystems(self):
+        """Imports only the optional subsystems enabled in the config; missing libraries leave them as None."""
+        if self.config["gpio"]["simulate"]:
+            gpio.set_backend(gpio.SimulatedGPIO())
+        self.leds = subsystems.load("leds", self.config)
+        self.ir = subsystems.load("ir", self.config)
+        self.sensors = subsystems.load("sensors", self.config)
+        self.audio = subsystems.load("audio", self.config)
+        self.osc = subsystems.load("osc", self.config)
+
+    def stop(self):
+        self.running = False
+        self.stop_sequence()
+        self.stop_effect()
+        self.stop_recording()
+        self.stop_playback()
+        if self.api:
+            self.api.stop()
+        if self.sensor_service:
+            self.sensor_service.stop()
+        if self.osc:
+            self.osc.stop_osc_server()
+        if self.ir:
+            self.ir.cleanup()
+        if self.leds:
+            self.leds.cleanup()
+        if self.history:
+            self.history.stop()
+        if self.dmx_input:
+            self.dmx_input.stop()
+            self.dmx_input = None
+        if self.dmx:
+            self.dmx.stop()
+        if self.render_pool:
+            self.render_pool.stop()
+        if self.framebus:
+            self.dmx.remove_frame_listener(self.framebus.publish)
+            self.framebus.close()
+            self.framebus = None
+        if self.show:
+            self.show.close()
+        if not supervisor.stop_all():
+            logging.warning(f"Threads still running after stop: {supervisor.health()['tasks']}")
+        logging.info("Engine stopped")
+
+    def startup_report(self, t0):
+        """Resumen de tiempos de arranque relativo a t0 (time.perf_counter())."""
+        first_frame = self.dmx.first_frame_at if self.dmx else None
+        first_ms = f"{(first_frame - t0) * 1000:.0f} ms" if first_frame else "pending"
+        msg = f"Startup: first DMX frame {first_ms}, ready {(time.perf_counter() - t0) * 1000:.0f} ms"
+        if subsystems.load_times:
+            msg += " (" + ", ".join(f"{name} {t * 1000:.0f} ms" for name, t in subsystems.load_times.items()) + ")"
+        return msg
+
+    def register_metrics(self):
+        """Gauges del estado del motor, calculados al exportar."""
+        cache = self.render_cache
+        gauges = (
+            ("engine_uptime_seconds", "Seconds since the DMX output started",
+             lambda: time.perf_counter() - self.dmx.started_at if self.dmx and self.dmx.started_at else 0),
+            ("effect_layers", "Active effect layers", lambda: len(self.stack.layers)),
+            ("render_cache_bytes", "Render cache memory in use", lambda: cache.size if cache else 0),
+            ("render_cache_hits", "Render cache hits", lambda: cache.hits if cache else 0),
+            ("render_cache_misses", "Render cache misses", lambda: cache.misses if cache else 0),
+            ("render_workers_late", "Worker frames that missed the deadline",
+             lambda: self.render_pool.late if self.render_pool else 0),
+        )
+        for name, help_text, function in gauges:
+            metrics.unregister(name)
+            metrics.register(metrics.Gauge(name, help_text, function))
+
+    def stats(self):
+        return metrics.snapshot()
+
+    def health(self):
+        """Estado de los hilos supervisados (estado, reinicios, último error)."""
+        return supervisor.health()
+
+    def set_profiling(self, enabled, deadline_ms=None):
+        profiler.configure(enabled, deadline_ms / 1000 if deadline_ms is not None else None)
+        self.log(f"Frame profiler {'enabled' if enabled else 'disabled'}")
+
+    def profile_trace(self):
+        """Traza Chrome/Perfetto de los últimos frames registrados."""
+        return profiler.trace()
+
+    # --- Eventos para clientes (GUI, API) ---
+
+    def subscribe(self, callback):
+        """callback(event, data) se llama desde el hilo que produce el evento."""
+        self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def emit(self, event, data=None):
+        for callback in list(self.listeners):
+            try:
+                callback(event, data)
+            except Exception as e:
+                logging.error(f"Engine listener error: {e}")
+
+    def log(self, msg):
+        logging.info(msg)
+        self.emit("log", msg)
+
+    # --- Patch y canales ---
+
+    @property
+    def start_address(self):
+        return self.patch.start_address
+
+    @property
+    def mode_channels(self):
+        return self.patch.mode_channels
+
+    @property
+    def heads(self):
+        return self.patch.heads
+
+    def set_patch(self, start_address=None, mode_channels=None, heads=None, groups=None, positions=None):
+        self.patch.update(start_address, mode_channels, heads, groups, positions)
+        self.update_universe_length()
+        self.emit("patch", self.get_patch())
+
+    def update_universe_length(self):
+        """Con adaptive_length, el universo transmitido termina en el último canal del patch."""
+        if self.dmx:
+            self.dmx.set_length(self.patch.highest_channel() if self.config["dmx"]["adaptive_length"] else None)
+            self.update_frame_rate()
+
+    def update_frame_rate(self):
+        """Las cachés de render muestrean los efectos a la frecuencia real de salida (longitud y refresco),
+        y el supervisor limita la espera al parar tareas a un frame."""
+        fps = 1 / self.dmx.frame_interval()
+        supervisor.set_frame_interval(self.dmx.frame_interval())  # Parar o cambiar una tarea cuesta como mucho un frame
+        if self.render_cache:
+            self.render_cache.set_fps(fps)
+        if self.render_pool:
+            self.render_pool.set_fps(fps)
+
+    def configure_dmx(self, break_mode=None, adaptive_length=None, refresh_hz=None):
+        """Cambia la estrategia de break, la longitud adaptativa o el refresco (refresh_hz 0 = máximo)."""
+        dmx_config = self.config["dmx"]
+        if break_mode is not None:
+            self.dmx.set_break_mode(break_mode)
+            dmx_config["break"] = break_mode
+        if adaptive_length is not None:
+            dmx_config["adaptive_length"] = bool(adaptive_length)
+            self.update_universe_length()
+        if refresh_hz is not None:
+            self.dmx.set_refresh_rate(refresh_hz)
+            dmx_config["refresh_hz"] = refresh_hz
+            self.update_frame_rate()
+        self.log(f"DMX output: break {dmx_config['break']}, {self.dmx.length or len(self.dmx.dmx_data)} slots, "
+                 f"{1 / self.dmx.frame_interval():.0f} Hz max")
+        return self.get_dmx()
+
+    def get_dmx(self):
+        dmx_config = self.config["dmx"]
+        return {"break": self.dmx.break_mode, "adaptive_length": dmx_config["adaptive_length"],
+                "refresh_hz": dmx_config["refresh_hz"], "slots": self.dmx.length or len(self.dmx.dmx_data),
+                "frame_rate": 1 / self.dmx.frame_interval()}
+
+    def get_patch(self):
+        return self.patch.to_dict()
+
+    def head_address(self, head, channel):
+        return self.patch.head_address(head, channel)
+
+    def set_channel(self, addr, value):
+        self.dmx.update_channel(addr, value)
+
+    def set_channels(self, channels):
+        """Escritura en lote: channels es un dict {addr (0-based): value}."""
+        self.dmx.update_channels(channels.items())
+
+    def blackout(self):
+        for head in range(self.heads):
+            for ch in range(self.mode_channels):
+                self.dmx.update_channel(self.head_address(head, ch), 0)
+        self.log("Blackout activated")
+
+    def set_color(self, r, g, b):
+        for head in range(self.heads):
+            r_idx = self.head_address(head, 3 if self.mode_channels == 9 else 6)
+            self.dmx.update_channel(r_idx, r)
+            self.dmx.update_channel(r_idx + 1, g)
+            self.dmx.update_channel(r_idx + 2, b)
+
+    def set_calibration(self, calibration):
+        """Calibración de color {"fixture": {"gains", "white"}}; una entrada no válida se ignora con un error."""
+        for fixture, values in calibration.items():
+            try:
+                self.color.set_calibration(int(fixture), values.get("gains"), values.get("white"))
+            except (TypeError, ValueError) as e:
+                logging.error(f"Color calibration for fixture {fixture} ignored: {e}")
+
+    def set_grand_master(self, level, group=None):
+        """Nivel 0-1 del grand master, o del submaster de `group` (None lo elimina)."""
+        if group is None:
+            self.output.set_grand_master(level)
+        else:
+            self.output.set_submaster(group, level)
+        self.emit("output", self.output.to_dict())
+
+    def configure_output(self, limits=None, invert=None, curves=None):
+        self.output.configure(limits, invert, curves)
+        self.emit("output", self.output.to_dict())
+
+    # --- Escenas ---
+
+    def save_scene(self, path):
+        scenes.save_scene(self.dmx.dmx_data, path)
+        self.log(f"Scene saved: {path}")
+
+    def load_scene(self, path):
+        data = scenes.load_scene(path)
+        for i, value in enumerate(data):
+            self.dmx.update_channel(i, value)
+        self.log(f"Scene loaded: {path}")
+
+    # --- Deshacer ---
+
+    def undo(self):
+        step = self.history.undo()
+        self.log(f"Undo: {len(step.indices)} channels" if step else "Nothing to undo")
+        return self.history.status()
+
+    def redo(self):
+        step = self.history.redo()
+        self.log(f"Redo: {len(step.indices)} channels" if step else "Nothing to redo")
+        return self.history.status()
+
+    # --- Cue list ---
+
+    def read_universe(self):
+        with self.dmx.lock:
+            return bytes(self.dmx.dmx_data)
+
+    def write_channels(self, indices, values):
+        self.dmx.update_channels(zip(indices.tolist(), values.tolist()))
+
+    def set_cue_list(self, cue_list):
+        self.cue_list = cue_list
+        self.cue_player = cues.CuePlayer(cue_list, self.read_universe, self.write_channels)
+
+    def record_cue(self, number, fade=0.0, label=""):
+        """Graba la cue `number` con lo que hay ahora en el universo (solo se guardan los canales que cambian)."""
+        cue = self.cue_list.record(number, self.read_universe(), fade, label)
+        self.log(f"Cue {cue.number:g} recorded: {len(cue.indices)} channels")
+        self.emit("cue", self.cue_player.status())
+        return cue
+
+    def delete_cue(self, number):
+        self.cue_list.delete(number)
+        self.log(f"Cue {float(number):g} deleted")
+
+    def cue_go(self, fade=None):
+        return self._cue_moved(self.cue_player.go(fade))
+
+    def cue_back(self, fade=None):
+        return self._cue_moved(self.cue_player.back(fade))
+
+    def cue_goto(self, number, fade=None):
+        return self._cue_moved(self.cue_player.goto(number, fade))
+
+    def _cue_moved(self, cue):
+        self.log(f"Cue {cue.number:g} {cue.label}".rstrip())
+        status = self.cue_player.status()
+        self.emit("cue", status)
+        return status
+
+    def get_cues(self):
+        return dict(self.cue_list.to_dict(), status=self.cue_player.status())
+
+    # --- Efectos ---
+
+    def run_effect(self, name, quantize=None):
+        """Cambia el efecto principal (capa sobre todo el patch); devuelve False si no se puede iniciar.
+        Con `quantize` ("beat", "bar" o beats) el cambio ocurre en el siguiente punto de esa rejilla."""
+        quantize = self.config["tempo"]["quantize"] if quantize is None else quantize
+        with self.lock:
+            if name == self.current_effect:
+                return True
+            if name == "AudioReactivity" and not self.audio:
+                self.log("Audio reactivity unavailable")
+                return False
+            if name != "AudioReactivity" and name not in effects.LAYER_EFFECTS:
+                self.log(f"Unknown effect {name}")
+                return False
+            at = tempo.next_time(quantize) if name != "AudioReactivity" and tempo.quantum(quantize) else None
+            self._stop_effect(at)
+            if name == "AudioReactivity":
+                self.audio.run_audio_reactivity(self.dmx, self.start_address, self.heads, self.mode_channels)
+            else:
+                effect = effects.create_effect(name, speed=self.effect_speed, beats=self.effect_beats)
+                self.effect_layer = self.stack.add(effect, start_at=at)
+            self.current_effect = name
+        self.log(f"Effect {name} started")
+        self.set_status_led(0, 0, 1)  # Blue LED for effect
+        self.emit("effect", name)
+        return True
+
+    def _stop_effect(self, at=None):
+        """Retira el efecto principal; con `at`, la capa sigue hasta ese instante (cambio cuantizado)."""
+        if self.effect_layer:
+            if at is None:
+                self.stack.remove(self.effect_layer.id)
+            else:
+                self.stack.remove_at(self.effect_layer.id, at)
+            self.effect_layer = None
+        if self.audio:
+            self.audio.stop_audio_reactivity()
+            if self.current_effect == "AudioReactivity" and self.history:
+                self.history.absorb()
+        self.current_effect = None
+
+    def stop_effect(self):
+        with self.lock:
+            was_running = self.current_effect is not None
+            self._stop_effect()
+        if was_running:
+            self.log("Effect stopped")
+            self.set_status_led(0, 1, 0)  # Green LED for idle
+            self.emit("effect", None)
+
+    def set_effect_speed(self, value):
+        self.effect_speed = max(1, min(100, value))
+        if self.effect_layer:
+            self.effect_layer.effect.speed = self.effect_speed
+        effects.set_speed(value)
+        logging.info(f"Effect speed set to {value}%")
+
+    def set_effect_beats(self, beats):
+        """Beats por ciclo del efecto principal (en fase con el tempo); None vuelve a la velocidad."""
+        beats = float(beats) if beats else None
+        if beats is not None and beats <= 0:
+            raise ValueError(f"invalid beats: {beats}")
+        self.effect_beats = beats
+        if self.effect_layer:
+            self.effect_layer.effect.beats = beats
+        effects.set_beats(beats)
+        logging.info(f"Effect beats set to {beats}")
+
+    # --- Tempo ---
+
+    def set_tempo(self, bpm=None, beats_per_bar=None):
+        if beats_per_bar is not None:
+            if int(beats_per_bar) < 1:
+                raise ValueError(f"invalid beats_per_bar: {beats_per_bar}")
+            tempo.beats_per_bar = int(beats_per_bar)
+        if bpm is not None:
+            tempo.set_bpm(float(bpm))
+        self.emit("tempo", tempo.status())
+
+    def tap_tempo(self):
+        tempo.tap()
+        self.emit("tempo", tempo.status())
+
+    def nudge_tempo(self, seconds):
+        tempo.nudge(float(seconds))
+
+    def resync_tempo(self):
+        tempo.resync()
+        self.emit("tempo", tempo.status())
+
+    def get_tempo(self):
+        return dict(tempo.status(), effect_beats=self.effect_beats, quantize=self.config["tempo"]["quantize"])
+
+    def define_effect(self, definition):
+        """Registra un efecto de expresiones (backend/expressions.py); ValueError si no es válido."""
+        cls = expressions.define_effect(definition)
+        self.effect_definitions[cls.name] = cls.definition
+        self.log(f"Effect defined: {cls.name} ({', '.join(cls.attributes)})")
+        return cls
+
+    def get_effects(self):
+        return {"effects": sorted(effects.LAYER_EFFECTS), "definitions": self.effect_definitions}
+
+    # --- Pila de capas ---
+
+    def add_layer(self, name, group="all", attributes=None, intensity=1.0, priority=0, blend=layers.LTP, **params):
+        """Añade un efecto como capa independiente; varias capas pueden correr a la vez."""
+        layer = self.stack.add(effects.create_effect(name, **params), group, attributes, intensity, priority, blend)
+        self.log(f"Layer {layer.id} started: {name} on {group}")
+        return layer
+
+    def add_pixel_map(self, source, group="all", intensity=1.0, priority=0, blend=layers.LTP, **options):
+        """Capa PixelMap (backend/pixelmap.py) con las posiciones actuales de los fixtures del grupo."""
+        positions = self.patch.fixture_positions(group).tolist()
+        return self.add_layer(pixelmap.PixelMapEffect.name, group, None, intensity, priority, blend, source=source,
+                              positions=positions, **options)
+
+    def remove_layer(self, layer_id):
+        removed = self.stack.remove(layer_id)
+        if removed:
+            self.log(f"Layer {layer_id} stopped")
+        return removed
+
+    def record_positions(self, group="all"):
+        """Posiciones pan/tilt actuales del grupo, normalizadas, para usarlas como puntos de un Spline."""
+        with self.dmx.lock:
+            data = bytes(self.dmx.dmx_data)
+        return movement.read_positions(data, self.patch, group).tolist()
+
+    def clear_layers(self):
+        with self.lock:
+            self.stack.clear()
+            self.effect_layer = None
+            if self.current_effect != "AudioReactivity":
+                self.current_effect = None
+        self.log("All layers stopped")
+
+    # --- Archivo de show ---
+
+    def open_show(self, path):
+        """Abre (o crea) un show: aplica patch, salida, color y capas; escenas y secuencias se leen al usarlas."""
+        t0 = time.perf_counter()
+        if self.show:
+            self.show.close()
+        self.show = ShowFile(path)
+        patch = self.show.get("patch", "patch")
+        if patch:
+            self.set_patch(**patch)
+        settings = self.show.get("output", "output")
+        if settings:
+            self.output.configure(settings["limits"], settings["invert"], settings["curves"], settings["submasters"])
+            self.output.set_grand_master(settings["grand_master"])
+        settings = self.show.get("color", "color")
+        if settings:
+            self.color.set_curve(settings["curve"], settings["gamma"], settings["dimmer_curve"])
+            self.color.white_extraction = settings["white_extraction"]
+            self.set_calibration(settings["calibration"])
+        for name in self.show.names("effect"):
+            try:
+                self.define_effect(self.show.get("effect", name))
+            except (KeyError, ValueError) as e:
+                logging.error(f"Effect {name} in show not loaded: {e}")
+        cue_list = self.show.get("cuelist", "main")
+        if cue_list is not None:
+            self.set_cue_list(cues.CueList.from_dict(cue_list))
+        saved_layers = self.show.get("layers", "layers")
+        if saved_layers is not None:
+            self.clear_layers()
+            for layer in saved_layers:
+                self.add_layer(layer["effect"], layer["group"], layer["attributes"], layer["intensity"],
+                               layer["priority"], layer["blend"], **layer["params"])
+        self.log(f"Show opened: {path} ({(time.perf_counter() - t0) * 1000:.1f} ms)")
+        return self.show.contents()
+
+    def save_show(self):
+        """Guarda el estado actual en el show abierto; solo se escriben los elementos que cambian."""
+        if not self.show:
+            raise ValueError("no show open")
+        self.show.put("patch", "patch", self.get_patch())
+        self.show.put("profile", str(self.mode_channels), PROFILES[self.mode_channels])
+        self.show.put("output", "output", self.output.to_dict())
+        self.show.put("color", "color", self.color.to_dict())
+        self.show.put("layers", "layers", [layer.to_dict() for layer in self.stack.layers])
+        if len(self.cue_list):
+            self.show.put("cuelist", "main", self.cue_list.to_dict())
+        for name, definition in self.effect_definitions.items():
+            self.show.put("effect", name, definition)
+        self.log(f"Show saved: {self.show.path}")
+        return self.show.contents()
+
+    def store_show_scene(self, name):
+        if not self.show:
+            raise ValueError("no show open")
+        with self.dmx.lock:
+            data = list(self.dmx.dmx_data)
+        self.show.put("scene", name, data)
+        self.log(f"Scene stored in show: {name}")
+
+    def recall_show_scene(self, name):
+        data = self.show.get("scene", name) if self.show else None
+        if data is None:
+            raise KeyError(f"unknown scene: {name}")
+        self.dmx.update_frame(bytes(data))
+        self.log(f"Scene recalled from show: {name}")
+
+    def load_show_sequence(self, name):
+        sequence = self.show.get("sequence", name) if self.show else None
+        if sequence is None:
+            raise KeyError(f"unknown sequence: {name}")
+        self.current_sequence = sequence
+        self.log(f"Sequence loaded from show: {name}")
+        return sequence
+
+    # --- Grabación y reproducción ---
+
+    def start_recording(self, path):
+        self.stop_recording()
+        self.recorder = recorder.Recorder(path)
+        self.recorder.start(self.dmx)
+        self.log(f"Recording started: {path}")
+
+    def stop_recording(self):
+        if self.recorder:
+            self.recorder.stop()
+            self.log(f"Recording saved: {self.recorder.path}")
+            self.recorder = None
+
+    def play_recording(self, path, speed=1.0, loop=False):
+        """Reproduce una grabación sobre el universo con su temporización original."""
+        self.stop_playback()
+        self.player = recorder.Player(path)
+        self.player.play(self.dmx, speed, loop)
+        self.log(f"Playback started: {path} ({self.player.duration:.1f} s)")
+        return self.player.duration
+
+    def stop_playback(self):
+        if self.player:
+            self.player.close()
+            self.player = None
+            self.log("Playback stopped")
+
+    # --- Secuencias ---
+
+    def load_sequence(self, path):
+        self.current_sequence = sequences.load_sequence(path)
+        self.log(f"Sequence loaded: {path}")
+        return self.current_sequence
+
+    def run_sequence(self, sequence=None, quantize=None):
+        """Lanza la secuencia; con `quantize` ("beat", "bar" o beats) arranca en el siguiente punto de esa rejilla."""
+        quantize = self.config["tempo"]["quantize"] if quantize is None else quantize
+        tempo.quantum(quantize)  # ValueError si no es válido
+        with self.lock:
+            sequence = sequence or self.current_sequence
+            if not sequence:
+                self.log("No sequence loaded")
+                return False
+            if supervisor.is_running("sequence"):
+                self.log("Another sequence is running")
+                return False
+            self.current_sequence = sequence
+            self.sequence_task = supervisor.start("sequence", self._sequence_task, args=(sequence, quantize))
+        self.log("Sequence started")
+        self.set_status_led(0, 0, 1)  # Blue LED for sequence
+        return True
+
+    def _sequence_task(self, token, sequence, quantize=None):
+        if tempo.quantum(quantize) and tempo.wait(token, quantize):
+            return
+        try:
+            sequences.run_sequence(self.dmx, self.start_address, self.heads, self.mode_channels, sequence, token,
+                                   self.stack)
+        finally:
+            if self.history:
+                self.history.absorb()
+
+    def stop_sequence(self):
+        sequences.stop_sequence()
+        if self.sequence_task:
+            supervisor.stop_task(self.sequence_task)
+            self.sequence_task = None
+            self.log("Sequence stopped")
+            self.set_status_led(0, 1, 0)  # Green LED for idle
+
+    # --- Hardware ---
+
+    def set_sensor_type(self, sensor_type):
+        if self.sensor_service:
+            self.sensor_service.set_backend(self.sensors.make_sensor(sensor_type, self.config["sensors"]["simulate"]))
+
+    def on_ir_change(self, detected):
+        if detected:
+            self.run_effect("ColorChase")
+            self.set_status_led(0, 0, 1)  # Blue LED when IR detected
+        else:
+            self.set_status_led(0, 1, 0)  # Green LED when idle
+        self.emit("ir", detected)
+
+    def set_status_led(self, red, green, blue):
+        if self.leds:
+            self.leds.set_led_color(red, green, blue)
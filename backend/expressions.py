@@ -0,0 +1,243 @@
+"""
+Expression effects: looks defined as data instead of Python.
+A definition gives one expression per attribute, for example
+
+    {"name": "Wave", "cycle": 2.0,
+     "attributes": {"dimmer": "255 * tri(t / 2 + x)",
+                    "red": "255 * (phase < 0.5)", "blue": "where(bass > 0.6, 255, 40)"}}
+
+Variables: t (effect time in seconds, scaled by speed), i (fixture index in
+the group), n (fixtures in the group), x (position in the group, 0-1), beat
+and phase (tempo clock, backend/tempo.py), level, bass, mid, high (audio input
+0-1, backend/audio.py). Functions are listed in FUNCTIONS; `a if c else b`,
+comparisons and and/or/not are vectorized.
+
+Each definition is parsed once, checked node by node against a whitelist (no
+attributes, subscripts, lambdas or calls to anything outside FUNCTIONS), and
+all its attributes are compiled into a single NumPy expression evaluated for
+every fixture of the layer in one call per frame. Compiled kernels are cached
+by the hash of the definition. define_effect() registers the look as a layer
+effect, so it runs by name like the built-in effects.
+"""
+
+import ast
+import hashlib
+import json
+import threading
+import numpy as np
+from backend import audio
+from backend.effects import LAYER_EFFECTS, Effect, register_effect
+from backend.patch import PROFILES
+from backend.tempo import tempo
+
+ATTRIBUTES = sorted({attribute for profile in PROFILES.values() for attribute in profile})
+MAX_LENGTH = 1000  # Caracteres por expresión
+
+VARIABLES = ("t", "i", "n", "x", "beat", "phase", "level", "bass", "mid", "high")
+LIVE_VARIABLES = {"beat", "phase", "level", "bass", "mid", "high"}  # Estado del proceso principal
+CONSTANTS = {"pi": np.pi, "tau": 2 * np.pi}
+
+
+def _tri(x):
+    """Onda triangular 0-1-0 de periodo 1."""
+    return 1.0 - np.abs(2.0 * np.mod(x, 1.0) - 1.0)
+
+
+def _square(x, duty=0.5):
+    return (np.mod(x, 1.0) < duty).astype(np.float32)
+
+
+def _smoothstep(edge0, edge1, x):
+    v = np.clip((x - edge0) / (edge1 - edge0), 0.0, 1.0)
+    return v * v * (3 - 2 * v)
+
+
+def _hash(x):
+    """Ruido determinista 0-1 por valor (p. ej. hash(i) para un valor aleatorio fijo por fixture)."""
+    return np.mod(np.sin(np.asarray(x, dtype=np.float64) * 12.9898) * 43758.5453, 1.0)
+
+
+FUNCTIONS = {
+    "sin": np.sin, "cos": np.cos, "tan": np.tan, "abs": np.abs, "sqrt": np.sqrt, "exp": np.exp, "log": np.log,
+    "floor": np.floor, "ceil": np.ceil, "round": np.rint, "min": np.minimum, "max": np.maximum, "clip": np.clip,
+    "where": np.where, "fract": lambda x: np.mod(x, 1.0), "saw": lambda x: np.mod(x, 1.0), "tri": _tri,
+    "square": _square, "smoothstep": _smoothstep, "mix": lambda a, b, f: a + (b - a) * f, "hash": _hash,
+}
+
+ALLOWED_NODES = (
+    ast.Expression, ast.Load, ast.Name, ast.Constant, ast.Call, ast.BinOp, ast.UnaryOp,
+    ast.Compare, ast.BoolOp, ast.IfExp,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.USub, ast.UAdd, ast.Not,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq, ast.And, ast.Or,
+)
+
+
+class _Vectorize(ast.NodeTransformer):
+    """Reescribe las construcciones escalares de Python como operaciones NumPy elemento a elemento."""
+
+    def visit_Constant(self, node):
+        # Sin enteros de Python: 9 ** 9 ** 9 desborda en float en lugar de calcularse con precisión arbitraria
+        return ast.Constant(float(node.value))
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        return ast.Call(ast.Name("where", ast.Load()), [node.test, node.body, node.orelse], [])
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        name = "_and" if isinstance(node.op, ast.And) else "_or"
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.Call(ast.Name(name, ast.Load()), [result, value], [])
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.Call(ast.Name("_not", ast.Load()), [node.operand], [])
+        return node
+
+
+def validate(tree, source):
+    """ValueError si el árbol usa algo fuera de la lista blanca; devuelve las variables usadas."""
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise ValueError(f"{type(node).__name__} not allowed in {source!r}")
+        if isinstance(node, ast.Constant) and (isinstance(node.value, bool) or
+                                               not isinstance(node.value, (int, float))):
+            raise ValueError(f"only numeric constants are allowed in {source!r}")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+                raise ValueError(f"unknown function in {source!r}")
+            if node.keywords:
+                raise ValueError(f"keyword arguments not allowed in {source!r}")
+        elif isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+            if node.id not in VARIABLES and node.id not in CONSTANTS:
+                raise ValueError(f"unknown name {node.id!r} in {source!r}")
+            names.add(node.id)
+        elif isinstance(node, ast.Compare) and len(node.ops) > 1:
+            raise ValueError(f"chained comparisons not allowed in {source!r}")
+    return names
+
+
+class Kernel:
+    """Expresiones de una definición compiladas en un único código NumPy: evaluate(env) -> tupla de arrays."""
+
+    def __init__(self, expressions):
+        self.attributes = tuple(expressions)
+        trees = []
+        self.names = set()
+        for attribute, source in expressions.items():
+            if attribute not in ATTRIBUTES:
+                raise ValueError(f"unknown attribute: {attribute}")
+            source = str(source)
+            if len(source) > MAX_LENGTH:
+                raise ValueError(f"expression for {attribute} too long")
+            try:
+                tree = ast.parse(source, mode="eval")
+            except SyntaxError as e:
+                raise ValueError(f"syntax error in {attribute}: {e.msg}") from None
+            self.names |= validate(tree, source)
+            trees.append(tree.body)
+        tree = _Vectorize().visit(ast.Expression(ast.Tuple(trees, ast.Load())))
+        self.code = compile(ast.fix_missing_locations(tree), "<effect>", "eval")
+        self.live = bool(self.names & LIVE_VARIABLES)
+        self.globals = dict(FUNCTIONS, __builtins__={}, _and=np.logical_and, _or=np.logical_or,
+                            _not=np.logical_not, **CONSTANTS)
+        # Evaluación de prueba: los errores de tipo o desbordamiento se detectan al definir, no en el frame
+        index = np.arange(4, dtype=np.float32)
+        sample = dict.fromkeys(VARIABLES, 0.5)
+        sample.update(i=index, n=4, x=index / 3)
+        try:
+            with np.errstate(all="ignore"):
+                results = self.evaluate(sample)
+            finite = [bool(np.all(np.isfinite(value))) for value in results]
+        except (ArithmeticError, TypeError, ValueError) as e:
+            raise ValueError(f"expression cannot be evaluated: {e}") from None
+        for attribute, ok in zip(self.attributes, finite):
+            if not ok:
+                raise ValueError(f"expression for {attribute} is not finite (NaN or infinity)")
+
+    def evaluate(self, env):
+        return eval(self.code, self.globals, env)
+
+
+_kernels = {}
+_kernels_lock = threading.Lock()
+
+
+def definition_hash(definition):
+    return hashlib.sha1(json.dumps(definition, sort_keys=True).encode()).hexdigest()
+
+
+def compile_definition(definition):
+    """Kernel de una definición; se compila una vez por contenido (hash) y proceso."""
+    key = definition_hash(definition["attributes"])
+    with _kernels_lock:
+        kernel = _kernels.get(key)
+    if kernel is None:
+        kernel = Kernel(definition["attributes"])
+        with _kernels_lock:
+            _kernels[key] = kernel
+    return kernel
+
+
+class ExpressionEffect(Effect):
+    """Efecto definido por expresiones; las subclases las crea define_effect()."""
+    definition = None
+
+    def __init__(self, speed=100, spread=0.0, beats=None):
+        super().__init__(speed, spread, beats)
+        self.kernel = compile_definition(self.definition)
+        self.live = self.kernel.live
+        self._index = np.empty(0, dtype=np.float32)
+
+    def cycle(self):
+        # Solo es periódico (y cacheable) si el autor declara el ciclo y no depende del tempo ni del audio
+        return None if self.live else self.definition.get("cycle")
+
+    def render(self, t, count):
+        if len(self._index) != count:
+            self._index = np.arange(count, dtype=np.float32)
+        env = {"t": self.effect_time(t), "i": self._index, "n": count,
+               "x": self._index / (count - 1) if count > 1 else self._index}
+        if self.live:
+            beat = tempo.beat()
+            env.update(audio.bands, beat=beat, phase=beat % 1.0)
+        shape = (count,)
+        # NaN e infinitos (p. ej. sqrt de un negativo en algún instante) no llegan a las curvas de color
+        return {attribute: np.nan_to_num(np.array(np.broadcast_to(value, shape), dtype=np.float32), nan=0.0)
+                for attribute, value in zip(self.kernel.attributes, self.kernel.evaluate(env))}
+
+    def __reduce__(self):
+        # Las clases se crean en tiempo de ejecución: para los workers se reconstruyen desde la definición
+        return restore_effect, (self.definition, self.params())
+
+
+def restore_effect(definition, params):
+    return effect_class(definition)(**params)
+
+
+def effect_class(definition):
+    """Clase Effect para una definición (validada y compilada)."""
+    name = str(definition.get("name", ""))
+    if not name:
+        raise ValueError("effect definition needs a name")
+    if not definition.get("attributes"):
+        raise ValueError(f"effect {name} defines no attributes")
+    if definition.get("cycle") is not None and float(definition["cycle"]) <= 0:
+        raise ValueError(f"invalid cycle for {name}")
+    definition = {"name": name, "attributes": dict(definition["attributes"]), "cycle": definition.get("cycle")}
+    compile_definition(definition)  # Valida antes de registrar
+    return type(f"{name}Expression", (ExpressionEffect,),
+                {"name": name, "attributes": tuple(definition["attributes"]), "definition": definition})
+
+
+def define_effect(definition):
+    """Valida, compila y registra una definición como efecto de capa; devuelve su clase."""
+    cls = effect_class(definition)
+    existing = LAYER_EFFECTS.get(cls.name)
+    if existing is not None and not issubclass(existing, ExpressionEffect):
+        raise ValueError(f"{cls.name} is a built-in effect")
+    return register_effect(cls)
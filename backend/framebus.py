@@ -0,0 +1,145 @@
+"""
+Shared-memory frame bus.
+Every transmitted frame is published into a named multiprocessing.shared_memory
+ring, so local tools (visualizers, recorders, a web bridge) can read the output
+without touching DMXSender or its lock and without any IPC round-trip.
+
+Layout: header <4sHHIQ (magic, version, slots, frame size, latest sequence),
+padded to 64 bytes, then `slots` slots of <QdI (sequence, timestamp, length)
+plus the frame data. Each slot is a seqlock: the writer sets its sequence to an
+odd value while copying and to an even one when done, and a reader retries if
+the sequence is odd or changed during its copy. The writer never waits for readers.
+
+Reader usage from another process:
+    reader = FrameReader("dmx_frames")
+    seq, timestamp, frame = reader.latest()
+"""
+
+import logging
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+MAGIC = b"DMXF"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQ")
+HEADER_SIZE = 64
+SLOT = struct.Struct("<QdI")
+SLOT_HEADER = 24  # SLOT rellenado a 8 bytes
+
+
+def slot_stride(frame_size):
+    return SLOT_HEADER + (frame_size + 7) // 8 * 8
+
+
+class FramePublisher:
+    def __init__(self, name="dmx_frames", slots=8, frame_size=512):
+        self.name = name
+        self.slots = slots
+        self.frame_size = frame_size
+        self.stride = slot_stride(frame_size)
+        size = HEADER_SIZE + slots * self.stride
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Segmento huérfano de una ejecución anterior
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.buf = self.shm.buf
+        self.seq = 0
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, slots, frame_size, 0)
+        logging.info(f"Frame bus published as shared memory '{name}' ({slots} slots)")
+
+    def publish(self, packet):
+        """Frame listener de DMXSender: packet = start code + universo."""
+        data = memoryview(packet)[1:1 + self.frame_size]
+        self.seq += 1
+        offset = HEADER_SIZE + (self.seq % self.slots) * self.stride
+        struct.pack_into("<Q", self.buf, offset, 2 * self.seq - 1)  # Impar: escribiendo
+        self.buf[offset + SLOT_HEADER:offset + SLOT_HEADER + len(data)] = data
+        struct.pack_into("<dI", self.buf, offset + 8, time.time(), len(data))
+        struct.pack_into("<Q", self.buf, offset, 2 * self.seq)
+        struct.pack_into("<Q", self.buf, 12, self.seq)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameReader:
+    def __init__(self, name="dmx_frames"):
+        self.shm = shared_memory.SharedMemory(name=name)
+        # El segmento es del publicador: que el resource tracker del lector no lo borre al salir
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+        self.buf = self.shm.buf
+        magic, version, self.slots, self.frame_size, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"shared memory '{name}' is not a frame bus")
+        self.stride = slot_stride(self.frame_size)
+        self.out = bytearray(self.frame_size)
+
+    def latest_seq(self):
+        return struct.unpack_from("<Q", self.buf, 12)[0]
+
+    def read(self, seq, out=None, retries=100):
+        """Copia el frame `seq` en `out` (o en un buffer propio reutilizado); devuelve (timestamp, frame) o None
+        si ese frame ya se ha sobrescrito."""
+        out = self.out if out is None else out
+        offset = HEADER_SIZE + (seq % self.slots) * self.stride
+        for _ in range(retries):
+            before = struct.unpack_from("<Q", self.buf, offset)[0]
+            if before != 2 * seq:
+                if before > 2 * seq:
+                    return None
+                continue  # Escritura en curso
+            timestamp, length = struct.unpack_from("<dI", self.buf, offset + 8)
+            out[:length] = self.buf[offset + SLOT_HEADER:offset + SLOT_HEADER + length]
+            if struct.unpack_from("<Q", self.buf, offset)[0] == before:
+                return timestamp, memoryview(out)[:length]
+        return None
+
+    def latest(self, out=None):
+        """(seq, timestamp, frame) del último frame publicado, o None si aún no hay ninguno."""
+        while True:
+            seq = self.latest_seq()
+            if seq == 0:
+                return None
+            result = self.read(seq, out)
+            if result is not None:
+                return (seq,) + result
+
+    def frames(self, poll=0.005):
+        """Generador de frames nuevos (seq, timestamp, frame); salta los que se pierden si el lector va lento."""
+        last = self.latest_seq()
+        while True:
+            seq = self.latest_seq()
+            if seq == last:
+                time.sleep(poll)
+                continue
+            last = max(last + 1, seq - self.slots + 1)
+            result = self.read(last)
+            if result is not None:
+                yield (last,) + result
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+if __name__ == "__main__":
+    # Monitor mínimo: python -m backend.framebus [nombre]
+    import sys
+    reader = FrameReader(sys.argv[1] if len(sys.argv) > 1 else "dmx_frames")
+    count, started = 0, time.monotonic()
+    for seq, timestamp, frame in reader.frames():
+        count += 1
+        if time.monotonic() - started >= 1.0:
+            print(f"seq {seq}  {count} fps  first channels {list(frame[:8])}")
+            count, started = 0, time.monotonic()
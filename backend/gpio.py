@@ -0,0 +1,122 @@
+"""
+GPIO hardware abstraction.
+RPiGPIO wraps RPi.GPIO on the Raspberry Pi; SimulatedGPIO runs anywhere and
+lets inputs be driven by hand (tests, development on a desktop).
+Pins are BCM numbers; levels are 0/1.
+"""
+
+import logging
+import threading
+
+
+class RPiGPIO:
+    """Backend over RPi.GPIO (BCM numbering)."""
+
+    def __init__(self):
+        import RPi.GPIO as GPIO
+        self.GPIO = GPIO
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)
+
+    def setup_output(self, pin, initial=0):
+        self.GPIO.setup(pin, self.GPIO.OUT, initial=self.GPIO.HIGH if initial else self.GPIO.LOW)
+
+    def setup_input(self, pin, pull_up=True):
+        self.GPIO.setup(pin, self.GPIO.IN, pull_up_down=self.GPIO.PUD_UP if pull_up else self.GPIO.PUD_DOWN)
+
+    def output(self, pin, value):
+        self.GPIO.output(pin, self.GPIO.HIGH if value else self.GPIO.LOW)
+
+    def input(self, pin):
+        return 1 if self.GPIO.input(pin) else 0
+
+    def add_edge_callback(self, pin, callback, bouncetime_ms=0):
+        """callback(pin) se llama desde el hilo de eventos de RPi.GPIO en cada flanco."""
+        kwargs = {"callback": callback}
+        if bouncetime_ms:
+            kwargs["bouncetime"] = int(bouncetime_ms)
+        self.GPIO.add_event_detect(pin, self.GPIO.BOTH, **kwargs)
+
+    def remove_edge_callback(self, pin):
+        self.GPIO.remove_event_detect(pin)
+
+    def cleanup(self, pins=None):
+        if pins:
+            self.GPIO.cleanup(list(pins))
+        else:
+            self.GPIO.cleanup()
+
+
+class SimulatedGPIO:
+    """In-memory backend; records writes and fires edge callbacks from set_input()."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.levels = {}
+        self.modes = {}
+        self.callbacks = {}
+        self.writes = []
+
+    def setup_output(self, pin, initial=0):
+        with self.lock:
+            self.modes[pin] = "out"
+            self.levels[pin] = 1 if initial else 0
+
+    def setup_input(self, pin, pull_up=True):
+        with self.lock:
+            self.modes[pin] = "in"
+            self.levels.setdefault(pin, 1 if pull_up else 0)
+
+    def output(self, pin, value):
+        with self.lock:
+            self.levels[pin] = 1 if value else 0
+            self.writes.append((pin, self.levels[pin]))
+
+    def input(self, pin):
+        with self.lock:
+            return self.levels.get(pin, 0)
+
+    def set_input(self, pin, level):
+        """Simula un cambio de nivel en una entrada; dispara el callback si hay flanco."""
+        level = 1 if level else 0
+        with self.lock:
+            changed = self.levels.get(pin) != level
+            self.levels[pin] = level
+            callback = self.callbacks.get(pin)
+        if changed and callback:
+            callback(pin)
+
+    def add_edge_callback(self, pin, callback, bouncetime_ms=0):
+        with self.lock:
+            self.callbacks[pin] = callback
+
+    def remove_edge_callback(self, pin):
+        with self.lock:
+            self.callbacks.pop(pin, None)
+
+    def cleanup(self, pins=None):
+        with self.lock:
+            for pin in list(pins) if pins else list(self.modes):
+                self.modes.pop(pin, None)
+                self.callbacks.pop(pin, None)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Devuelve el backend GPIO activo, creando el de RPi.GPIO la primera vez."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = RPiGPIO()
+            logging.info("GPIO backend: RPi.GPIO")
+        return _backend
+
+
+def set_backend(backend):
+    """Fija el backend GPIO (p. ej. SimulatedGPIO en pruebas)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -8,3 +8,10 @@ class BaseHead:
         index = self.start + offset
         if 0 <= index < len(data):
             data[index] = value
+
+    def set_pan_tilt16(self, data, pan, tilt):
+        """Posición de 16 bits (0-65535): byte alto en el canal grueso, byte bajo en el fino."""
+        self.set_pan(data, pan >> 8)
+        self.set_pan_fine(data, pan & 0xFF)
+        self.set_tilt(data, tilt >> 8)
+        self.set_tilt_fine(data, tilt & 0xFF)
@@ -0,0 +1,158 @@
+"""
+Undo/redo history for the programmer values (DMXSender.dmx_data).
+Nothing is recorded on the write path: update_channel and friends only bump
+DMXSender.version. A supervised task polls that counter and, when it changed,
+compares the universe against a baseline copy with numpy. Changes keep
+accumulating into one open step until the edits pause for `coalesce` seconds
+(or the step has been open `max_step` seconds), so a slider drag, a scene load
+or an OSC burst becomes a single undo step.
+
+Each step stores only (indices, old, new) for the channels that changed.
+Steps live in a ring bounded by `budget_kb` and `max_steps`; the oldest are
+dropped first, so memory does not grow with the length of the session.
+Undo and redo are applied as one batched update_channels call.
+"""
+
+import logging
+import threading
+import numpy as np
+from backend import clock
+from backend.supervisor import supervisor
+
+STEP_OVERHEAD = 64  # Bytes aproximados por paso además de sus arrays
+
+
+class Step:
+    def __init__(self, indices, old, new, timestamp):
+        self.indices = indices  # uint16
+        self.old = old  # uint8
+        self.new = new  # uint8
+        self.timestamp = timestamp
+
+    def size(self):
+        return self.indices.nbytes + self.old.nbytes + self.new.nbytes + STEP_OVERHEAD
+
+
+class History:
+    def __init__(self, dmx_sender, coalesce=0.5, max_step=2.0, budget_kb=256, max_steps=1000, poll=0.05):
+        self.dmx = dmx_sender
+        self.coalesce = coalesce  # Segundos sin cambios que cierran un paso
+        self.max_step = max_step  # Un paso abierto más tiempo se cierra aunque sigan llegando cambios
+        self.budget = budget_kb * 1024
+        self.max_steps = max_steps
+        self.poll = poll
+        self.lock = threading.Lock()
+        self.steps = []  # Del más antiguo al más reciente; los posteriores a `position` son rehacibles
+        self.position = 0
+        self.size = 0
+        self.baseline = self.read()  # Estado al cerrar el último paso
+        self.version = self.dmx.version
+        self.opened = None  # Inicio del paso abierto
+        self.changed = None  # Último cambio del paso abierto
+        self.ignore = None  # ignore() -> True mientras los cambios no deben grabarse (p. ej. reproducción)
+        self.task = None
+
+    def read(self):
+        with self.dmx.lock:
+            return np.frombuffer(bytes(self.dmx.dmx_data), dtype=np.uint8)
+
+    def check(self, now=None):
+        """Detecta cambios desde la última comprobación y cierra el paso abierto si toca."""
+        now = clock.now() if now is None else now
+        with self.lock:
+            version = self.dmx.version
+            if self.ignore and self.ignore():
+                if version != self.version:
+                    self._absorb()
+                return
+            if version != self.version:
+                self.version = version
+                if self.opened is None:
+                    self.opened = now
+                self.changed = now
+            if self.opened is not None and (now - self.changed >= self.coalesce or now - self.opened >= self.max_step):
+                self._commit(now)
+
+    def absorb(self):
+        """Toma el universo actual como línea base sin crear un paso (p. ej. al terminar una secuencia,
+        para que su última escritura no se grabe como edición)."""
+        with self.lock:
+            self._absorb()
+
+    def _absorb(self):
+        self.version = self.dmx.version
+        self.baseline = self.read()
+        self.opened = self.changed = None
+
+    def _commit(self, now):
+        current = self.read()
+        changed = np.flatnonzero(current != self.baseline)
+        self.opened = self.changed = None
+        if not len(changed):
+            return  # Cambios que se anularon entre sí
+        step = Step(changed.astype(np.uint16), self.baseline[changed], current[changed], now)
+        self.baseline = current
+        for dropped in self.steps[self.position:]:
+            self.size -= dropped.size()
+        del self.steps[self.position:]  # Una edición nueva descarta lo que se podía rehacer
+        self.steps.append(step)
+        self.size += step.size()
+        drop = 0
+        while drop < len(self.steps) - 1 and (self.size > self.budget or len(self.steps) - drop > self.max_steps):
+            self.size -= self.steps[drop].size()
+            drop += 1
+        del self.steps[:drop]
+        self.position = len(self.steps)
+
+    def flush(self):
+        """Cierra el paso abierto (antes de deshacer, para que deshaga también lo último editado)."""
+        with self.lock:
+            self.version = self.dmx.version
+            if self.opened is not None or not np.array_equal(self.read(), self.baseline):
+                self._commit(clock.now())
+
+    def _apply(self, step, values):
+        # Escritura en lote; la versión resultante se absorbe para no grabar el propio deshacer
+        self.dmx.update_channels(zip(step.indices.tolist(), values.tolist()))
+        self.version = self.dmx.version
+        self.baseline = self.baseline.copy()
+        self.baseline[step.indices] = values
+
+    def undo(self):
+        self.flush()
+        with self.lock:
+            if self.position == 0:
+                return None
+            self.position -= 1
+            step = self.steps[self.position]
+            self._apply(step, step.old)
+        logging.info(f"Undo: {len(step.indices)} channels")
+        return step
+
+    def redo(self):
+        self.flush()  # Si hay ediciones nuevas, descartan lo que se podía rehacer
+        with self.lock:
+            if self.position == len(self.steps):
+                return None
+            step = self.steps[self.position]
+            self.position += 1
+            self._apply(step, step.new)
+        logging.info(f"Redo: {len(step.indices)} channels")
+        return step
+
+    def status(self):
+        with self.lock:
+            return {"undo": self.position, "redo": len(self.steps) - self.position, "bytes": self.size,
+                    "pending": self.opened is not None}
+
+    def run(self, token):
+        while not token.wait(self.poll):
+            self.check()
+
+    def start(self):
+        self.task = supervisor.start("history", self.run, restart=True)
+
+    def stop(self):
+        if self.task:
+            supervisor.stop_task(self.task)
+            self.task = None
@@ -1,41 +1,136 @@
 """
 IR module for handling IR emitter and receiver (phototransistor).
+The receiver is edge-triggered: callbacks fire once per debounced change
+instead of the pin being polled. The debounce wait is a supervised task on the
+render clock (backend/clock.py), so a simulation runs it in virtual time.
 """
 
-import RPi.GPIO as GPIO
-import time
 import logging
 import atexit
+import threading
+from backend import clock, gpio
+from backend.supervisor import supervisor
+
+RECEIVER_PIN = 16  # Entrada con pull-up, nivel bajo = haz interrumpido
+EMITTER_PIN = 12
+
+
+class IRInput:
+    """Debounced IR receiver; callbacks get True when detected, False when cleared."""
+
+    def __init__(self, backend=None, pin=RECEIVER_PIN, debounce=0.05):
+        self.backend = backend
+        self.pin = pin
+        self.debounce = debounce
+        self.detected = False
+        self.callbacks = []
+        self.lock = threading.Lock()
+        self.started = False
+        self._settle_task = None
+
+    def add_callback(self, callback):
+        with self.lock:
+            self.callbacks.append(callback)
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            if self.backend is None:
+                self.backend = gpio.get_backend()
+            self.backend.setup_input(self.pin, pull_up=True)
+            self.detected = self.backend.input(self.pin) == 0
+            self.backend.add_edge_callback(self.pin, self._on_edge, self.debounce * 1000)
+            self.started = True
+        logging.info(f"IR receiver listening on GPIO{self.pin}")
+
+    def _on_edge(self, pin):
+        # Un rebote genera varios flancos: se espera a que la línea se estabilice
+        if self.debounce <= 0:
+            self._settle()
+            return
+        with self.lock:
+            if self._settle_task is not None:
+                return
+            self._settle_task = supervisor.start("ir-debounce", self._debounce)
+
+    def _debounce(self, token):
+        if not token.wait(self.debounce):
+            self._settle()
+
+    def _settle(self):
+        with self.lock:
+            self._settle_task = None
+            if not self.started:
+                return
+            detected = self.backend.input(self.pin) == 0
+            if detected == self.detected:
+                return
+            self.detected = detected
+            callbacks = list(self.callbacks)
+        logging.debug(f"IR detected: {detected}")
+        for callback in callbacks:
+            try:
+                callback(detected)
+            except Exception as e:
+                logging.error(f"IR callback error: {e}")
+
+    def is_detected(self):
+        return self.detected
+
+    def stop(self):
+        with self.lock:
+            if not self.started:
+                return
+            if self._settle_task is not None:
+                supervisor.cancel(self._settle_task)  # Sin esperar: _settle toma este mismo lock
+                self._settle_task = None
+            self.backend.remove_edge_callback(self.pin)
+            self.started = False
+
+
+ir_input = IRInput()
 
-# Configuración de pines (modo BCM)
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(16, GPIO.IN, pull_up_down=GPIO.PUD_UP)  # IR receiver
-GPIO.setup(12, GPIO.OUT)  # IR emitter
 
 def is_ir_detected():
-    """Verifica si el sensor IR detecta un objeto (entrada baja)"""
+    """Estado actual (ya filtrado) del receptor IR"""
     try:
-        detected = GPIO.input(16) == 0
-        logging.debug(f"IR detected: {detected}")
-        return detected
+        ir_input.start()
+        return ir_input.is_detected()
     except Exception as e:
         logging.error(f"IR receiver error: {e}")
         return False
 
+
+def on_ir_change(callback):
+    """Registra callback(detected) para cada cambio del receptor; se llama desde el hilo GPIO."""
+    ir_input.add_callback(callback)
+    ir_input.start()
+
+
 def send_ir_pulse():
     """Envía un pulso corto desde el emisor IR"""
     try:
-        GPIO.output(12, 1)
-        time.sleep(0.1)
-        GPIO.output(12, 0)
+        backend = gpio.get_backend()
+        backend.setup_output(EMITTER_PIN, 0)
+        backend.output(EMITTER_PIN, 1)
+        clock.sleep(0.1)
+        backend.output(EMITTER_PIN, 0)
         logging.info("IR pulse sent")
     except Exception as e:
         logging.error(f"IR emitter error: {e}")
 
+
 def cleanup():
     """Libera los pines GPIO al cerrar el programa"""
-    GPIO.cleanup()
-    logging.info("GPIO cleanup executed")
+    if ir_input.started:
+        ir_input.stop()
+        ir_input.backend.cleanup((RECEIVER_PIN, EMITTER_PIN))
+        logging.info("GPIO cleanup executed")
+    # Un motor nuevo (p. ej. otra simulación) registra sus callbacks sobre el backend GPIO que haya entonces
+    ir_input.backend = None
+    ir_input.callbacks = []
+
 
 # Registro automático para limpiar al salir del programa
 atexit.register(cleanup)
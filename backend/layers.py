@@ -0,0 +1,215 @@
+"""
+Layered effect stack.
+Many effect instances run at once, each bound to a fixture group and a set of
+attributes, with its own intensity, priority and blend mode. All layers are
+merged over the programmer values in a single render pass per frame, called
+from the DMX send loop (DMXSender.composer). Layers that drive red/green/blue
+go through the color pipeline (backend/color.py) before merging. Periodic
+effects are served from the render cache (backend/render_cache.py) if given,
+and layers can be rendered in worker processes (backend/workers.py).
+
+With a tempo clock (backend/tempo.py), effects with a `beats` parameter take
+their time from the beat position instead of the layer's age, so they stay in
+phase with the music and with each other. Layers can be scheduled to start and
+stop at a given clock time, which is how quantized effect switches are done.
+"""
+
+import itertools
+import logging
+import threading
+import time
+import numpy as np
+from backend import clock, metrics
+from backend.profiler import profiler
+
+LTP = "ltp"  # El último (mayor prioridad) gana, mezclado según la intensidad
+HTP = "htp"  # Gana el valor más alto
+ADD = "add"  # Se suma al valor de debajo
+BLEND_MODES = (LTP, HTP, ADD)
+
+
+def layer_time(effect, started, now, beat=None):
+    """Tiempo que se pasa a render(): la edad de la capa o, si el efecto va a tempo, la posición en beats
+    convertida de forma que cada `beats` beats dure exactamente un ciclo."""
+    if effect.beats and beat is not None:
+        cycle = effect.cycle()
+        if cycle and effect.speed > 0:
+            return beat / effect.beats * cycle * 100.0 / effect.speed
+    return now - started
+
+
+class Layer:
+    def __init__(self, layer_id, effect, group, attributes, intensity, priority, blend, started):
+        self.id = layer_id
+        self.effect = effect
+        self.group = group
+        self.attributes = attributes
+        self.intensity = intensity
+        self.priority = priority
+        self.blend = blend
+        self.started = started  # Puede estar en el futuro: la capa no sale hasta entonces
+        self.stop_at = None  # Instante en que se retira sola (cambios cuantizados)
+        self.failed = False
+
+    def to_dict(self):
+        return {"id": self.id, "effect": self.effect.name, "group": self.group,
+                "attributes": list(self.attributes), "intensity": self.intensity,
+                "priority": self.priority, "blend": self.blend, "params": self.effect.params()}
+
+
+class EffectStack:
+    def __init__(self, patch, clock=clock.now, color=None, cache=None, pool=None, tempo=None):
+        self.patch = patch
+        self.clock = clock
+        self.tempo = tempo
+        self.color = color
+        self.cache = cache
+        self.pool = pool
+        self.lock = threading.Lock()
+        self.layers = ()  # Tupla inmutable ordenada por prioridad; el render la lee sin lock
+        self._ids = itertools.count(1)
+
+    def add(self, effect, group="all", attributes=None, intensity=1.0, priority=0, blend=LTP, start_at=None):
+        """Añade una capa y devuelve su Layer; las de mayor prioridad se aplican encima.
+        Con `start_at` (instante del reloj) la capa no se renderiza hasta entonces."""
+        if blend not in BLEND_MODES:
+            raise ValueError(f"unknown blend mode: {blend}")
+        attributes = tuple(attributes or effect.attributes)
+        unknown = set(attributes) - set(effect.attributes)
+        if unknown:
+            raise ValueError(f"{effect.name} does not drive {sorted(unknown)}")
+        self.patch.group(group)  # KeyError si el grupo no existe
+        started = self.clock() if start_at is None else start_at
+        layer = Layer(next(self._ids), effect, group, attributes, float(intensity), priority, blend, started)
+        with self.lock:
+            self.layers = tuple(sorted(self.layers + (layer,), key=lambda l: l.priority))
+        logging.info(f"Layer {layer.id} added: {effect.name} on {group} ({blend}, priority {priority})")
+        return layer
+
+    def remove(self, layer_id):
+        with self.lock:
+            remaining = tuple(l for l in self.layers if l.id != layer_id)
+            removed = [l for l in self.layers if l.id == layer_id]
+            self.layers = remaining
+        self._close(removed)
+        return bool(removed)
+
+    def _close(self, layers):
+        for layer in layers:
+            try:
+                layer.effect.close()
+            except Exception as e:
+                logging.error(f"Layer {layer.id} ({layer.effect.name}) close failed: {e}")
+
+    def remove_at(self, layer_id, at):
+        """Programa la retirada de una capa en el instante `at` del reloj; False si no existe."""
+        layer = self.get(layer_id)
+        if layer is None:
+            return False
+        layer.stop_at = at
+        return True
+
+    def update(self, layer_id, intensity=None, priority=None, blend=None):
+        if blend is not None and blend not in BLEND_MODES:
+            raise ValueError(f"unknown blend mode: {blend}")
+        with self.lock:
+            for layer in self.layers:
+                if layer.id == layer_id:
+                    if intensity is not None:
+                        layer.intensity = float(intensity)
+                    if blend is not None:
+                        layer.blend = blend
+                    if priority is not None:
+                        layer.priority = priority
+                        self.layers = tuple(sorted(self.layers, key=lambda l: l.priority))
+                    return layer
+        raise KeyError(f"unknown layer: {layer_id}")
+
+    def clear(self):
+        with self.lock:
+            removed, self.layers = self.layers, ()
+        self._close(removed)
+
+    def get(self, layer_id):
+        for layer in self.layers:
+            if layer.id == layer_id:
+                return layer
+        return None
+
+    def compose(self, data):
+        """Mezcla todas las capas sobre `data` (bytes del universo) y devuelve el frame resultante."""
+        layers = self.layers
+        if not layers:
+            return data
+        now = self.clock()
+        if any(layer.stop_at is not None and layer.stop_at <= now for layer in layers):
+            with self.lock:
+                expired = [l for l in self.layers if l.stop_at is not None and l.stop_at <= now]
+                self.layers = tuple(l for l in self.layers if l not in expired)
+            self._close(expired)
+            layers = self.layers
+        layers = tuple(layer for layer in layers if layer.started <= now)
+        if not layers:
+            return data
+        beat = self.tempo.beat(now) if self.tempo else None
+        rendered = self.pool.render(layers, now, self.tempo) if self.pool else {}
+        frame = np.frombuffer(data, dtype=np.uint8).astype(np.float32)
+        for layer in layers:
+            if not layer.failed:
+                self.render_layer(layer, frame, now, rendered.get(layer.id), beat)
+        np.clip(frame, 0, 255, out=frame)
+        return np.rint(frame).astype(np.uint8).tobytes()
+
+    def disable(self, layer, error):
+        layer.failed = True
+        logging.error(f"Layer {layer.id} ({layer.effect.name}) disabled: {error}")
+
+    def render_layer(self, layer, frame, now, values=None, beat=None):
+        """Mezcla una capa en `frame`; `values` son los del worker si ya se renderizó fuera."""
+        indices = {}
+        for attribute in layer.attributes:
+            idx = self.patch.channels(attribute, layer.group)
+            if idx is not None and len(idx):
+                indices[attribute] = idx
+        if not indices:
+            return
+        count = len(next(iter(indices.values())))
+        if values is None:
+            t = time.perf_counter()
+            t_layer = layer_time(layer.effect, layer.started, now, beat)
+            try:
+                if self.cache:
+                    values = self.cache.render(layer.effect, t_layer, count)
+                else:
+                    values = layer.effect.render(t_layer, count)
+            except Exception as e:
+                self.disable(layer, e)
+                return
+            rendered = time.perf_counter()
+            metrics.effect_render_seconds.labels(layer.effect.name).observe(rendered - t)
+            if profiler.enabled:
+                profiler.span(layer.effect.name, t, rendered, layer.id)
+        merge_start = time.perf_counter() if profiler.enabled else None
+        try:
+            # La conversión también puede fallar con valores de la capa: solo se desactiva esta capa
+            if self.color and all(a in indices for a in ("red", "green", "blue")):
+                white = self.patch.channels("white", layer.group)
+                has_white = white is not None and "white" not in layer.attributes
+                values = self.color.convert(values, self.patch.fixtures(layer.group), has_white)
+                if has_white:
+                    indices["white"] = white
+            if self.color and "dimmer" in indices:
+                values = dict(values, dimmer=self.color.dimmer.apply(values["dimmer"]))
+        except Exception as e:
+            self.disable(layer, e)
+            return
+        for attribute, idx in indices.items():
+            value = values[attribute]
+            if layer.blend == LTP:
+                frame[idx] += (value - frame[idx]) * layer.intensity
+            elif layer.blend == HTP:
+                frame[idx] = np.maximum(frame[idx], value * layer.intensity)
+            else:
+                frame[idx] += value * layer.intensity
+        if merge_start is not None:
+            profiler.span("merge", merge_start, time.perf_counter(), layer.id)
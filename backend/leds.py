@@ -1,28 +1,62 @@
 """
 LED control module for RGB indicators.
+The driver caches the current color and only touches GPIO when it changes.
 """
 
-import RPi.GPIO as GPIO
 import logging
+import threading
+from backend import gpio
+
+LED_PINS = (5, 6, 13)  # Red, Green, Blue
+
+
+class StatusLED:
+    def __init__(self, backend=None, pins=LED_PINS):
+        self.backend = backend
+        self.pins = pins
+        self.state = None
+        self.lock = threading.Lock()
+
+    def _setup(self):
+        if self.backend is None:
+            self.backend = gpio.get_backend()
+        for pin in self.pins:
+            self.backend.setup_output(pin, 0)
+        self.state = (False, False, False)
+
+    def set_color(self, red, green, blue):
+        """Aplica el color; devuelve False si ya estaba aplicado (sin escribir en GPIO)."""
+        color = (bool(red), bool(green), bool(blue))
+        try:
+            with self.lock:
+                if color == self.state:
+                    return False
+                if self.state is None:
+                    self._setup()
+                for pin, old, new in zip(self.pins, self.state, color):
+                    if old != new:
+                        self.backend.output(pin, new)
+                self.state = color
+        except Exception as e:
+            logging.error(f"LED error: {e}")
+            return False
+        logging.info(f"LEDs set: R={int(red)}, G={int(green)}, B={int(blue)}")
+        return True
+
+    def cleanup(self):
+        with self.lock:
+            if self.state is not None:
+                self.backend.cleanup(self.pins)
+                self.state = None
+                logging.info("GPIO cleaned up")
+
+
+status_led = StatusLED()
 
-GPIO.setmode(GPIO.BCM)
-GPIO.setwarnings(False)
-GPIO.setup(5, GPIO.OUT)   # Red LED
-GPIO.setup(6, GPIO.OUT)   # Green LED
-GPIO.setup(13, GPIO.OUT)  # Blue LED
 
 def set_led_color(red, green, blue):
-    try:
-        GPIO.output(5, GPIO.HIGH if red else GPIO.LOW)
-        GPIO.output(6, GPIO.HIGH if green else GPIO.LOW)
-        GPIO.output(13, GPIO.HIGH if blue else GPIO.LOW)
-        logging.info(f"LEDs set: R={red}, G={green}, B={blue}")
-    except Exception as e:
-        logging.error(f"LED error: {e}")
+    status_led.set_color(red, green, blue)
 
-def cleanup():
-    GPIO.cleanup()
-    logging.info("GPIO cleaned up")
 
-# Initialize LEDs off
-set_led_color(0, 0, 0)
+def cleanup():
+    status_led.cleanup()
@@ -0,0 +1,193 @@
+"""
+Metrics for the realtime path: counters, gauges and histograms.
+Updating a metric is a few attribute operations (no locks, no allocation), so
+instrumentation stays on in production. Values are exported in Prometheus
+text format (GET /metrics) and as JSON (GET /api/stats).
+"""
+
+import bisect
+import time
+
+# Límites de los buckets en segundos: de 50 µs a 1 s
+TIME_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+REGISTRY = []
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=(), labels=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.label_values = labels
+        self.children = {}
+
+    def labels(self, *values):
+        """Hijo con etiquetas (p. ej. render_seconds.labels("Rainbow")); se crea la primera vez."""
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = type(self)(self.name, self.help, labels=tuple(zip(self.labelnames, values)),
+                                                       **self.child_args())
+        return child
+
+    def child_args(self):
+        return {}
+
+    def series(self):
+        return list(self.children.values()) if self.labelnames else [self]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=(), labels=()):
+        super().__init__(name, help_text, labelnames, labels)
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        return [(self.name, self.label_values, self.value)]
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge(Metric):
+    """Valor instantáneo; con `function` se calcula al exportar."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, function=None, labelnames=(), labels=()):
+        super().__init__(name, help_text, labelnames, labels)
+        self.function = function
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        return [(self.name, self.label_values, self.function() if self.function else self.value)]
+
+    def snapshot(self):
+        return self.samples()[0][2]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=TIME_BUCKETS, labelnames=(), labels=()):
+        super().__init__(name, help_text, labelnames, labels)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # El último es +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def child_args(self):
+        return {"buckets": self.buckets}
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def time(self):
+        """Context manager que observa la duración del bloque."""
+        return _Timer(self)
+
+    def quantile(self, q):
+        """Estimación por buckets (límite superior del bucket que contiene el cuantil)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets + (self.max,), self.counts):
+            total += count
+            if total >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def samples(self):
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            result.append((self.name + "_bucket", self.label_values + (("le", le),), total))
+        result.append((self.name + "_sum", self.label_values, self.sum))
+        result.append((self.name + "_count", self.label_values, self.count))
+        return result
+
+    def snapshot(self):
+        return {"count": self.count, "mean": self.sum / self.count if self.count else 0.0,
+                "p50": self.quantile(0.5), "p99": self.quantile(0.99), "max": self.max}
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def unregister(name):
+    REGISTRY[:] = [m for m in REGISTRY if m.name != name]
+
+
+def prometheus_text():
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for series in metric.series():
+            for name, labels, value in series.samples():
+                lines.append(f"{name}{_label_text(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    """Resumen JSON: {nombre: valor} o {nombre: {etiqueta: valor}} para métricas con etiquetas."""
+    result = {}
+    for metric in REGISTRY:
+        if metric.labelnames:
+            result[metric.name] = {",".join(str(v) for _, v in child.label_values): child.snapshot()
+                                   for child in metric.children.values()}
+        else:
+            result[metric.name] = metric.snapshot()
+    return result
+
+
+# --- Métricas del motor ---
+
+frames_sent = register(Counter("dmx_frames_sent_total", "DMX frames transmitted"))
+frames_missed = register(Counter("dmx_frames_missed_total", "Frame slots skipped because the send loop ran late"))
+frame_seconds = register(Histogram("dmx_frame_seconds", "Frame build time (compose and output stage)"))
+write_seconds = register(Histogram("dmx_write_seconds", "Break plus serial write duration"))
+lock_wait_seconds = register(Histogram("dmx_lock_wait_seconds", "Wait for the DMXSender lock in channel updates"))
+effect_render_seconds = register(Histogram("effect_render_seconds", "Effect layer render time", labelnames=("effect",)))
+osc_messages = register(Counter("osc_messages_total", "OSC messages received"))
+osc_dropped = register(Counter("osc_dropped_total", "OSC messages rejected (invalid or no output)"))
+sequence_drift_seconds = register(Histogram("sequence_drift_seconds", "Sequence step start lateness"))
+audio_overruns = register(Counter("audio_overruns_total", "Audio reads that found more than one buffer queued"))
+sensor_read_seconds = register(Histogram("sensor_read_seconds", "Sensor read latency", buckets=(
+    0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)))
@@ -0,0 +1,165 @@
+"""
+Movement engine: 16-bit pan/tilt trajectories for every fixture of a group at once.
+Shapes are evaluated as NumPy arrays (one element per fixture) and split into
+coarse/fine channels, so 14CH fixtures move smoothly at the output refresh rate.
+Positions are normalized: 0.0-1.0 covers the full pan/tilt range.
+"""
+
+import numpy as np
+from backend.effects import Effect, register_effect
+
+TWO_PI = np.float32(2 * np.pi)
+
+
+def split_16bit(values):
+    """Posiciones normalizadas -> (coarse, fine) como arrays float 0-255."""
+    v16 = np.rint(np.clip(values, 0.0, 1.0) * 65535).astype(np.int32)
+    return (v16 >> 8).astype(np.float32), (v16 & 0xFF).astype(np.float32)
+
+
+def read_positions(data, patch, group="all"):
+    """Lee las posiciones actuales (N, 2) normalizadas de un grupo desde un universo DMX."""
+    frame = np.frombuffer(bytes(data), dtype=np.uint8).astype(np.float32)
+    result = []
+    for coarse, fine in (("pan", "pan_fine"), ("tilt", "tilt_fine")):
+        value = frame[patch.channels(coarse, group)] * 256
+        fine_idx = patch.channels(fine, group)
+        if fine_idx is not None:
+            value += frame[fine_idx]
+        result.append(value / 65535)
+    return np.stack(result, axis=1)
+
+
+class MovementEffect(Effect):
+    """Base de los movimientos: path(phase) -> (pan, tilt) normalizados, con límite de velocidad opcional."""
+    attributes = ("pan", "pan_fine", "tilt", "tilt_fine")
+
+    def __init__(self, speed=100, spread=0.0, center=(0.5, 0.5), size=(0.25, 0.25), period=4.0, max_speed=None,
+                 beats=None):
+        super().__init__(speed, spread, beats)
+        self.center = np.array(center, dtype=np.float32)
+        self.size = np.array(size, dtype=np.float32)
+        self.period = float(period)
+        self.max_speed = max_speed  # Fracción del recorrido por segundo
+        self._last = None
+        self._last_t = None
+
+    def params(self):
+        params = super().params()
+        params.update(center=self.center.tolist(), size=self.size.tolist(), period=self.period, max_speed=self.max_speed)
+        return params
+
+    def cycle(self):
+        # Con límite de velocidad la posición depende del frame anterior
+        return None if self.max_speed else self.period
+
+    def path(self, phase):
+        raise NotImplementedError
+
+    def limit(self, t, position):
+        """Limita el desplazamiento por frame a max_speed * dt."""
+        if self.max_speed and self._last is not None and self._last.shape == position.shape and t > self._last_t:
+            step = self.max_speed * (t - self._last_t)
+            position = self._last + np.clip(position - self._last, -step, step)
+        self._last, self._last_t = position, t
+        return position
+
+    def render(self, t, count):
+        phase = self.effect_time(t) / self.period + self.spread * np.arange(count, dtype=np.float32)
+        pan, tilt = self.path(phase)
+        position = self.limit(t, np.stack((pan, tilt)))
+        pan, pan_fine = split_16bit(position[0])
+        tilt, tilt_fine = split_16bit(position[1])
+        return {"pan": pan, "pan_fine": pan_fine, "tilt": tilt, "tilt_fine": tilt_fine}
+
+
+@register_effect
+class CircleMovement(MovementEffect):
+    name = "Circle"
+
+    def path(self, phase):
+        angle = phase * TWO_PI
+        return self.center[0] + self.size[0] * np.cos(angle), self.center[1] + self.size[1] * np.sin(angle)
+
+
+@register_effect
+class Figure8Movement(MovementEffect):
+    name = "Figure8"
+
+    def path(self, phase):
+        angle = phase * TWO_PI
+        return self.center[0] + self.size[0] * np.sin(angle), self.center[1] + self.size[1] * np.sin(2 * angle)
+
+
+@register_effect
+class SweepMovement(MovementEffect):
+    """Barrido de pan de lado a lado con tilt fijo."""
+    name = "Sweep"
+
+    def path(self, phase):
+        pan = self.center[0] + self.size[0] * np.sin(phase * TWO_PI)
+        return pan, np.full_like(pan, self.center[1])
+
+
+@register_effect
+class RandomWalkMovement(MovementEffect):
+    """Paseo aleatorio suave: puntos aleatorios por fixture interpolados con coseno (ciclo de `points` tramos)."""
+    name = "RandomWalk"
+
+    def __init__(self, seed=0, points=32, **kwargs):
+        super().__init__(**kwargs)
+        self.seed = seed
+        self.points = points
+        self._table = np.empty((0, points, 2), dtype=np.float32)
+
+    def params(self):
+        params = super().params()
+        params.update(seed=self.seed, points=self.points)
+        return params
+
+    def cycle(self):
+        return None if self.max_speed else self.period * self.points
+
+    def targets(self, count):
+        if len(self._table) < count:
+            rng = np.random.default_rng(self.seed)
+            self._table = rng.uniform(-1.0, 1.0, size=(count, self.points, 2)).astype(np.float32)
+        return self._table[:count]
+
+    def path(self, phase):
+        # Cada periodo recorre un tramo entre dos puntos aleatorios
+        table = self.targets(len(phase))
+        k = np.floor(phase).astype(np.intp)
+        f = (1 - np.cos((phase - k) * np.pi)) / 2
+        rows = np.arange(len(phase))
+        a = table[rows, k % self.points]
+        b = table[rows, (k + 1) % self.points]
+        offset = a + (b - a) * f[:, None]
+        return self.center[0] + self.size[0] * offset[:, 0], self.center[1] + self.size[1] * offset[:, 1]
+
+
+@register_effect
+class SplineMovement(MovementEffect):
+    """Catmull-Rom cerrada a través de posiciones grabadas [(pan, tilt), ...]; un periodo recorre todas."""
+    name = "Spline"
+
+    def __init__(self, points=((0.25, 0.5), (0.5, 0.25), (0.75, 0.5), (0.5, 0.75)), **kwargs):
+        super().__init__(**kwargs)
+        self.points = np.array(points, dtype=np.float32).reshape(-1, 2)
+        if len(self.points) < 2:
+            raise ValueError("Spline needs at least 2 points")
+
+    def params(self):
+        params = super().params()
+        params["points"] = self.points.tolist()
+        return params
+
+    def path(self, phase):
+        n = len(self.points)
+        u = (phase % 1.0) * n
+        k = np.floor(u).astype(np.intp)
+        f = (u - k)[:, None]
+        p0, p1, p2, p3 = (self.points[(k + i) % n] for i in (-1, 0, 1, 2))
+        pos = 0.5 * ((2 * p1) + (p2 - p0) * f + (2 * p0 - 5 * p1 + 4 * p2 - p3) * f ** 2
+                     + (3 * p1 - p0 - 3 * p2 + p3) * f ** 3)
+        return pos[:, 0], pos[:, 1]
@@ -1,38 +1,85 @@
- """
+"""
 OSC server module for remote DMX control.
+The UDP socket is only bound when the server is started.
+
+    /dmx/channel <channel> <value>
+    /tempo/tap   /tempo/bpm <bpm>   /tempo/nudge <seconds>   /tempo/resync (downbeat now)
 """
 
-from pythonosc import osc_server, dispatcher
-import threading
 import logging
+from backend import metrics
+from backend.supervisor import supervisor
+from backend.tempo import tempo
+
 
 class OSCServer:
     def __init__(self, ip="0.0.0.0", port=9000):
-        self.dispatcher = dispatcher.Dispatcher()
-        self.dispatcher.map("/dmx/channel", self.handle_dmx)
+        self.ip = ip
+        self.port = port
         self.dmx_sender = None
         self.running = False
-        self.server = osc_server.ThreadingOSCUDPServer((ip, port), self.dispatcher)
-        logging.info(f"OSC server initialized on {ip}:{port}")
+        self.server = None
+
+    def handle_dmx(self, address, channel=None, value=None):
+        metrics.osc_messages.inc()
+        try:
+            channel, value = int(channel), int(value)
+        except (TypeError, ValueError):
+            channel = None
+        if not self.dmx_sender or channel is None or not 1 <= channel <= len(self.dmx_sender.dmx_data):
+            metrics.osc_dropped.inc()
+            return
+        self.dmx_sender.update_channel(channel - 1, value)
+        logging.info(f"OSC: Set channel {channel} to {value}")
 
-    def handle_dmx(self, address, channel, value):
-        if self.dmx_sender:
-            self.dmx_sender.update_channel(channel - 1, int(value))
-            logging.info(f"OSC: Set channel {channel} to {value}")
+    def handle_tempo(self, address, *args):
+        metrics.osc_messages.inc()
+        command = address.rsplit("/", 1)[-1]
+        try:
+            if command == "tap":
+                tempo.tap()
+            elif command == "resync":
+                tempo.resync()
+            elif command == "bpm":
+                tempo.set_bpm(float(args[0]))
+            else:
+                tempo.nudge(float(args[0]))
+        except (IndexError, TypeError, ValueError):
+            metrics.osc_dropped.inc()
 
-    def start(self, dmx_sender):
+    def start(self, dmx_sender, ip=None, port=None):
+        from pythonosc import dispatcher, osc_server
         self.dmx_sender = dmx_sender
+        self.ip = ip or self.ip
+        self.port = port or self.port
+        osc_dispatcher = dispatcher.Dispatcher()
+        osc_dispatcher.map("/dmx/channel", self.handle_dmx)
+        for command in ("tap", "bpm", "nudge", "resync"):
+            osc_dispatcher.map(f"/tempo/{command}", self.handle_tempo)
+        self.server = osc_server.ThreadingOSCUDPServer((self.ip, self.port), osc_dispatcher)
+        self.server.timeout = 0.05  # handle_request vuelve a mirar el token cada 50 ms
         self.running = True
-        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        supervisor.start("osc", self._serve)
+        logging.info(f"OSC server listening on {self.ip}:{self.port}")
+
+    def _serve(self, token):
+        while not token.cancelled:
+            self.server.handle_request()
 
     def stop(self):
         self.running = False
-        self.server.shutdown()
+        if self.server:
+            supervisor.stop("osc", timeout=0.1)  # handle_request puede estar en su espera de 50 ms
+            self.server.server_close()
+            self.server = None
+
 
 osc_server = OSCServer()
 
-def start_osc_server(dmx_sender):
-    osc_server.start(dmx_sender)
+
+def start_osc_server(dmx_sender, ip=None, port=None):
+    osc_server.start(dmx_sender, ip, port)
+
 
 def stop_osc_server():
     osc_server.stop()
@@ -0,0 +1,117 @@
+"""
+Output stage: the last processing step before a frame is transmitted.
+Applies the grand master and group submasters to intensity channels, response
+curves, per-channel maximum limits and pan/tilt inversion. Settings are compiled
+from the patch into a per-slot scale vector and a (512, 256) lookup table, so a
+frame costs one multiply and one table lookup over the whole universe whatever
+the rig size.
+"""
+
+import logging
+import threading
+import numpy as np
+from backend.color import build_lut, curve_function
+
+UNIVERSE = 512
+INTENSITY = ("dimmer",)  # Atributos afectados por grand master y submasters
+INVERTIBLE = {"pan": ("pan", "pan_fine"), "tilt": ("tilt", "tilt_fine")}
+
+
+class OutputProcessor:
+    """
+    limits: {grupo: {atributo: máximo}}, invert: {grupo: ["pan", "tilt"]},
+    curves: {grupo: {atributo: curva}}, submasters: {grupo: nivel 0-1}.
+    """
+
+    def __init__(self, patch, grand_master=1.0, submasters=None, limits=None, invert=None, curves=None, gamma=2.2):
+        self.patch = patch
+        self.lock = threading.Lock()
+        self.grand_master = float(grand_master)
+        self.submasters = dict(submasters or {})
+        self.limits = dict(limits or {})
+        self.invert = dict(invert or {})
+        self.curves = dict(curves or {})
+        self.gamma = gamma
+        self._rows = np.arange(UNIVERSE, dtype=np.intp)
+        self._compiled = None  # (versión del patch, escala, lut); se sustituye entero, el render lo lee sin lock
+        self._dirty = True
+
+    def to_dict(self):
+        return {"grand_master": self.grand_master, "submasters": self.submasters, "limits": self.limits,
+                "invert": self.invert, "curves": self.curves}
+
+    def set_grand_master(self, level):
+        self.grand_master = max(0.0, min(1.0, float(level)))
+        self._dirty = True
+
+    def set_submaster(self, group, level):
+        self.patch.group(group)  # KeyError si el grupo no existe
+        with self.lock:
+            if level is None:
+                self.submasters.pop(group, None)
+            else:
+                self.submasters[group] = max(0.0, min(1.0, float(level)))
+            self._dirty = True
+
+    def configure(self, limits=None, invert=None, curves=None, submasters=None):
+        """Sustituye las tablas indicadas (None = sin cambios)."""
+        for group_curves in (curves or {}).values():
+            for curve in group_curves.values():
+                curve_function(curve)  # ValueError si la curva no existe
+        with self.lock:
+            if limits is not None:
+                self.limits = dict(limits)
+            if invert is not None:
+                self.invert = dict(invert)
+            if curves is not None:
+                self.curves = dict(curves)
+            if submasters is not None:
+                self.submasters = {group: max(0.0, min(1.0, float(level))) for group, level in submasters.items()}
+            self._dirty = True
+
+    def compile(self):
+        """Precalcula la escala por canal y la LUT por canal (curva, límite e inversión)."""
+        with self.lock:
+            version = self.patch.version
+            scale = np.ones(UNIVERSE, dtype=np.float32)
+            lut = np.tile(np.arange(256, dtype=np.uint8), (UNIVERSE, 1))
+            for attribute in INTENSITY:
+                idx = self.patch.channels(attribute)
+                if idx is not None:
+                    scale[idx] = self.grand_master
+            for group, level in self.submasters.items():
+                for attribute in INTENSITY:
+                    idx = self.patch.channels(attribute, group)
+                    if idx is not None:
+                        scale[idx] *= level
+            for group, curves in self.curves.items():
+                for attribute, curve in curves.items():
+                    idx = self.patch.channels(attribute, group)
+                    if idx is not None:
+                        lut[idx] = np.take(build_lut(curve, self.gamma), lut[idx])
+            for group, limits in self.limits.items():
+                for attribute, maximum in limits.items():
+                    idx = self.patch.channels(attribute, group)
+                    if idx is not None:
+                        lut[idx] = np.minimum(lut[idx], int(maximum))
+            for group, axes in self.invert.items():
+                for axis in axes:
+                    for attribute in INVERTIBLE.get(axis, ()):
+                        idx = self.patch.channels(attribute, group)
+                        if idx is not None:
+                            lut[idx] = 255 - lut[idx]
+            self._dirty = False
+        self._compiled = (version, scale, lut)
+        logging.info(f"Output stage compiled (patch version {version})")
+
+    def process(self, data):
+        """Aplica la etapa de salida a `data` (bytes del universo) y devuelve el frame a transmitir."""
+        compiled = self._compiled
+        if self._dirty or compiled is None or compiled[0] != self.patch.version:
+            self.compile()
+            compiled = self._compiled
+        _, scale, lut = compiled
+        frame = np.frombuffer(data, dtype=np.uint8)
+        size = len(frame)
+        scaled = np.rint(frame * scale[:size]).astype(np.uint8)
+        return lut[self._rows[:size], scaled].tobytes()
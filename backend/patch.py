@@ -0,0 +1,103 @@
+"""
+Patch: fixtures, their channel layout, fixture groups and 2D positions.
+Channel offsets follow StageWashHead (backend/heads/stagewash_head.py).
+Positions are normalized (0-1, origin top left) and used by the pixel mapper
+(backend/pixelmap.py); fixtures without one are laid out in a row.
+"""
+
+import threading
+import numpy as np
+
+# Offset de cada atributo dentro de la cabeza, por modo
+PROFILES = {
+    9: {"pan": 0, "tilt": 1, "dimmer": 2, "red": 3, "green": 4, "blue": 5, "white": 6, "speed": 7, "reset": 8},
+    14: {"pan": 0, "pan_fine": 1, "tilt": 2, "tilt_fine": 3, "speed": 4, "dimmer": 5,
+         "red": 6, "green": 7, "blue": 8, "white": 9, "macro": 10, "mix_speed": 11, "function": 12, "reset": 13},
+}
+
+
+class Patch:
+    """`heads` identical fixtures from `start_address`, plus named groups of fixture indices."""
+
+    def __init__(self, start_address=1, mode_channels=9, heads=2, groups=None, positions=None):
+        self.lock = threading.Lock()
+        self.start_address = start_address
+        self.mode_channels = mode_channels
+        self.heads = heads
+        self.groups = dict(groups or {})
+        self.positions = {str(k): v for k, v in (positions or {}).items()}  # {"fixture": [x, y]}
+        self.version = 0
+        self._cache = {}
+
+    def update(self, start_address=None, mode_channels=None, heads=None, groups=None, positions=None):
+        with self.lock:
+            if start_address is not None:
+                self.start_address = start_address
+            if mode_channels is not None:
+                if mode_channels not in PROFILES:
+                    raise ValueError(f"unsupported mode: {mode_channels}")
+                self.mode_channels = mode_channels
+            if heads is not None:
+                self.heads = heads
+            if groups is not None:
+                self.groups = dict(groups)
+            if positions is not None:
+                self.positions = {str(k): v for k, v in positions.items()}
+            self.version += 1
+            self._cache = {}
+
+    def to_dict(self):
+        return {"start_address": self.start_address, "mode_channels": self.mode_channels,
+                "heads": self.heads, "groups": self.groups, "positions": self.positions}
+
+    def head_address(self, head, channel):
+        """Índice 0-based del canal `channel` de la cabeza `head`."""
+        return self.start_address - 1 + head * self.mode_channels + channel
+
+    def highest_channel(self):
+        """Último canal (1-based) usado por el patch."""
+        return min(512, self.start_address - 1 + self.heads * self.mode_channels)
+
+    def group(self, name):
+        """Índices de fixture de un grupo; "all" siempre existe. Se omiten cabezas fuera del universo."""
+        if name in (None, "all"):
+            heads = range(self.heads)
+        elif name in self.groups:
+            heads = self.groups[name]
+        else:
+            raise KeyError(f"unknown group: {name}")
+        return [i for i in heads if 0 <= i < self.heads and self.head_address(i, self.mode_channels - 1) < 512]
+
+    def fixtures(self, group="all"):
+        """Array de índices de fixture del grupo (cacheado)."""
+        key = ("fixtures", group)
+        with self.lock:
+            if key not in self._cache:
+                self._cache[key] = np.array(self.group(group), dtype=np.intp)
+            return self._cache[key]
+
+    def fixture_positions(self, group="all"):
+        """Array (N, 2) de posiciones normalizadas (x, y) de los fixtures del grupo (cacheado)."""
+        key = ("positions", group)
+        with self.lock:
+            if key not in self._cache:
+                heads = self.group(group)
+                row = max(1, self.heads - 1)
+                self._cache[key] = np.array([self.positions.get(str(i), (i / row if self.heads > 1 else 0.5, 0.5))
+                                             for i in heads], dtype=np.float32).reshape(-1, 2)
+            return self._cache[key]
+
+    def channels(self, attribute, group="all"):
+        """Array de índices DMX (0-based) del atributo para cada fixture del grupo, o None si el modo no lo tiene."""
+        key = (attribute, group)
+        with self.lock:
+            if key in self._cache:
+                return self._cache[key]
+            offset = PROFILES[self.mode_channels].get(attribute)
+            if offset is None:
+                result = None
+            else:
+                heads = np.array(self.group(group), dtype=np.intp)
+                result = self.start_address - 1 + heads * self.mode_channels + offset
+            self._cache[key] = result
+            return result
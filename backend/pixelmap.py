@@ -0,0 +1,224 @@
+"""
+Pixel mapper: images, GIFs, gradients and raw video shown across fixtures.
+Each fixture has a 2D position in the patch (Patch.fixture_positions). For a
+given source size the bilinear sampling coordinates (four flat pixel indices
+and weights per fixture) are computed once; every frame is then resampled onto
+all fixtures with a single fancy-index gather, so the per-frame cost depends on
+the number of fixtures, not on the source resolution. The result is an RGB
+layer effect ("PixelMap"), converted by the color pipeline like any other.
+
+Sources are decoded on a supervised background thread into a bounded prefetch
+queue; the render path only takes the frame due at the layer time. Supported:
+    *.npy                    one image (H, W, 3) or frames (F, H, W, 3), at `fps`
+    *.rgb / *.raw            raw rgb24 stream (e.g. ffmpeg -f rawvideo -pix_fmt rgb24),
+                             needs width and height; a FIFO works but cannot loop
+    gradient:ff0000,0000ff   horizontal gradient between the given colors
+    other image files        through Pillow (optional), GIFs with their frame durations
+"""
+
+import logging
+import os
+import queue
+import numpy as np
+from backend.effects import Effect, register_effect
+from backend.supervisor import supervisor
+
+RAW_EXTENSIONS = (".rgb", ".raw")
+GRADIENT = "gradient:"
+
+
+def to_rgb(image):
+    """Imagen (H, W), (H, W, 3) o (H, W, 4), entera o float 0-1 -> (H, W, 3) uint8 contigua."""
+    image = np.asarray(image)
+    if image.dtype != np.uint8:
+        image = np.clip(image * 255 if image.dtype.kind == "f" else image, 0, 255).astype(np.uint8)
+    if image.ndim == 2:
+        image = image[:, :, None]
+    if image.ndim != 3 or image.shape[2] not in (1, 3, 4):
+        raise ValueError(f"unsupported image shape: {image.shape}")
+    if image.shape[2] == 1:
+        image = np.repeat(image, 3, axis=2)
+    return np.ascontiguousarray(image[:, :, :3])
+
+
+def gradient(colors, size=256):
+    """Imagen 1 x size con un degradado lineal entre los colores (tuplas RGB o "rrggbb")."""
+    stops = np.array([tuple(int(c[i:i + 2], 16) for i in (0, 2, 4)) if isinstance(c, str) else c
+                      for c in colors], dtype=np.float32)
+    if len(stops) < 2:
+        raise ValueError("a gradient needs at least two colors")
+    x = np.linspace(0, len(stops) - 1, size)
+    rgb = np.stack([np.interp(x, np.arange(len(stops)), stops[:, i]) for i in range(3)], axis=1)
+    return np.rint(rgb).astype(np.uint8)[None]
+
+
+def check_source(source, width=None, height=None):
+    """ValueError si la fuente no se podrá abrir (sin abrirla: un FIFO bloquearía)."""
+    source = str(source)
+    if source.startswith(GRADIENT):
+        gradient(source[len(GRADIENT):].split(","))
+        return
+    if not os.path.exists(source):
+        raise ValueError(f"source not found: {source}")
+    extension = os.path.splitext(source)[1].lower()
+    if extension in RAW_EXTENSIONS and not (width and height):
+        raise ValueError("raw video needs width and height")
+    if extension not in RAW_EXTENSIONS and extension != ".npy":
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            raise ValueError("Pillow not installed, only .npy, raw video and gradients are available") from None
+
+
+def read_frames(source, width=None, height=None, fps=None):
+    """Generador de (duración en segundos, imagen) de una pasada por la fuente."""
+    source = str(source)
+    interval = 1.0 / (fps or 25.0)
+    if source.startswith(GRADIENT):
+        yield interval, gradient(source[len(GRADIENT):].split(","))
+        return
+    extension = os.path.splitext(source)[1].lower()
+    if extension == ".npy":
+        data = np.load(source, mmap_mode="r")
+        for frame in (data if data.ndim == 4 else [data]):
+            yield interval, frame
+    elif extension in RAW_EXTENSIONS:
+        size = width * height * 3
+        with open(source, "rb") as f:
+            while True:
+                data = f.read(size)
+                if len(data) < size:
+                    return
+                yield interval, np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+    else:
+        from PIL import Image, ImageSequence
+        with Image.open(source) as image:
+            for frame in ImageSequence.Iterator(image):
+                duration = frame.info.get("duration")
+                yield (duration / 1000.0 if duration else interval), np.asarray(frame.convert("RGB"))
+
+
+class FrameDecoder:
+    """Decodifica la fuente en un hilo supervisado y deja (inicio en tiempo de media, imagen) en una cola acotada."""
+
+    def __init__(self, source, width=None, height=None, fps=None, loop=True, prefetch=8):
+        self.source = source
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.loop = loop
+        self.queue = queue.Queue(prefetch)
+        self.task = None
+
+    def run(self, token):
+        start = 0.0
+        while not token.cancelled:
+            count = 0
+            for duration, frame in read_frames(self.source, self.width, self.height, self.fps):
+                item = (start, to_rgb(frame))
+                while not token.cancelled:
+                    try:
+                        self.queue.put_nowait(item)
+                        break
+                    except queue.Full:
+                        token.wait(0.01)  # En el reloj de render, también con el reloj simulado
+                if token.cancelled:
+                    return
+                start += duration
+                count += 1
+            if not self.loop or count <= 1:
+                return  # Una imagen fija no se vuelve a decodificar
+
+    def start(self):
+        self.task = supervisor.start(f"pixelmap-{id(self):x}", self.run)
+
+    def stop(self):
+        if self.task:
+            supervisor.cancel(self.task)  # Sin esperar: se llama desde el hilo de render
+            self.task = None
+
+
+def row_positions(count):
+    x = np.linspace(0.0, 1.0, count) if count > 1 else np.full(count, 0.5)
+    return np.stack((x, np.full(count, 0.5)), axis=1).astype(np.float32)
+
+
+def bilinear_sampler(positions, shape):
+    """Índices planos (4, N) y pesos (4, N, 1) del muestreo bilineal de `positions` (0-1) en una imagen `shape`."""
+    height, width = shape[:2]
+    x = np.clip(positions[:, 0], 0.0, 1.0) * (width - 1)
+    y = np.clip(positions[:, 1], 0.0, 1.0) * (height - 1)
+    x0 = np.floor(x).astype(np.intp)
+    y0 = np.floor(y).astype(np.intp)
+    x1 = np.minimum(x0 + 1, width - 1)
+    y1 = np.minimum(y0 + 1, height - 1)
+    fx = (x - x0).astype(np.float32)
+    fy = (y - y0).astype(np.float32)
+    index = np.stack((y0 * width + x0, y0 * width + x1, y1 * width + x0, y1 * width + x1))
+    weights = np.stack(((1 - fx) * (1 - fy), fx * (1 - fy), (1 - fx) * fy, fx * fy))[:, :, None]
+    return index, weights
+
+
+@register_effect
+class PixelMapEffect(Effect):
+    name = "PixelMap"
+    attributes = ("red", "green", "blue")
+    live = True  # El hilo y la cola del decodificador viven en el proceso principal
+
+    def __init__(self, speed=100, spread=0.0, beats=None, source=None, positions=None, loop=True, width=None,
+                 height=None, fps=None):
+        super().__init__(speed, spread, beats)
+        check_source(source, width, height)
+        self.source = str(source)
+        self.positions = np.array(positions, dtype=np.float32).reshape(-1, 2) if positions else None
+        self.loop = loop
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.decoder = None
+        self.frame = None
+        self.pending = None  # Siguiente imagen ya sacada de la cola pero aún no debida
+        self.sampler = None  # ((alto, ancho, fixtures), índices, pesos)
+
+    def params(self):
+        params = super().params()
+        params.update(source=self.source, positions=None if self.positions is None else self.positions.tolist(),
+                      loop=self.loop, width=self.width, height=self.height, fps=self.fps)
+        return params
+
+    def current(self, t):
+        """Imagen que toca en el tiempo de media `t`; la última disponible si el decodificador va por detrás."""
+        while True:
+            if self.pending is None:
+                try:
+                    self.pending = self.decoder.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if self.frame is not None and self.pending[0] > t:
+                break
+            self.frame = self.pending[1]
+            self.pending = None
+        return self.frame
+
+    def render(self, t, count):
+        if self.decoder is None:
+            self.decoder = FrameDecoder(self.source, self.width, self.height, self.fps, self.loop)
+            self.decoder.start()
+        frame = self.current(self.effect_time(t))
+        if frame is None:
+            zeros = np.zeros(count, dtype=np.float32)
+            return {"red": zeros, "green": zeros, "blue": zeros}
+        key = frame.shape[:2] + (count,)
+        if self.sampler is None or self.sampler[0] != key:
+            positions = self.positions if self.positions is not None and len(self.positions) == count \
+                else row_positions(count)
+            self.sampler = (key,) + bilinear_sampler(positions, frame.shape)
+            logging.info(f"Pixel map: {count} fixtures sampled from {frame.shape[1]}x{frame.shape[0]} {self.source}")
+        _, index, weights = self.sampler
+        rgb = (frame.reshape(-1, 3)[index] * weights).sum(axis=0)
+        return {"red": rgb[:, 0], "green": rgb[:, 1], "blue": rgb[:, 2]}
+
+    def close(self):
+        if self.decoder:
+            self.decoder.stop()
+            self.decoder = None
@@ -0,0 +1,181 @@
+"""
+Show recorder and player.
+The recorder listens to the DMXSender output and writes it from a background
+thread as keyframes plus sparse deltas (only the slots that changed), so a
+mostly static hour of output takes a few MB instead of ~80 MB of raw frames.
+The player memory-maps a recording and streams it back with the original
+timing. Recorded frames are the final output (after the effect layers and the
+output stage), so they are sent with DMXSender.send_finished, bypassing both.
+
+File layout: header <4sBH (magic, version, channels), then records
+<BdH (kind, seconds since start, count) followed by
+    KEYFRAME: `channels` bytes with the full universe
+    DELTA:    `count` packed (<H index, B value) records
+    END:      no payload, marks the end of the recording
+Frames identical to the previous one are not stored.
+"""
+
+import logging
+import mmap
+import queue
+import struct
+import numpy as np
+from backend import clock
+from backend.supervisor import supervisor
+
+MAGIC = b"DMXR"
+VERSION = 1
+HEADER = struct.Struct("<4sBH")
+RECORD = struct.Struct("<BdH")
+KEYFRAME = 0
+DELTA = 1
+END = 2
+DELTA_DTYPE = np.dtype([("index", "<u2"), ("value", "u1")])
+
+
+class Recorder:
+    def __init__(self, path, keyframe_interval=10.0, max_pending=256):
+        self.path = path
+        self.keyframe_interval = keyframe_interval  # Segundos entre keyframes (para saltar en la reproducción)
+        self.queue = queue.Queue(max_pending)
+        self.dmx = None
+        self.task = None
+        self.started = None
+        self.frames = 0
+        self.stored = 0
+        self.dropped = 0
+
+    def start(self, dmx_sender):
+        self.dmx = dmx_sender
+        self.started = clock.now()
+        # Al cancelar, el centinela None hace que el escritor vacíe la cola y cierre el fichero
+        self.task = supervisor.start("recorder", self.write_loop, on_cancel=lambda: self.queue.put(None))
+        dmx_sender.add_frame_listener(self.on_frame)
+        logging.info(f"Recording to {self.path}")
+
+    def on_frame(self, packet):
+        # Hilo de envío DMX: solo se encola; la escritura va en el hilo del grabador
+        try:
+            self.queue.put_nowait((clock.now() - self.started, packet))
+        except queue.Full:
+            self.dropped += 1
+
+    def write_loop(self, token):
+        previous = None
+        last_keyframe = None
+        t = 0.0
+        with open(self.path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self.dmx.dmx_data)))
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                t, packet = item
+                frame = np.frombuffer(packet, dtype=np.uint8, offset=1)
+                self.frames += 1
+                if previous is None or len(frame) != len(previous) or t - last_keyframe >= self.keyframe_interval:
+                    f.write(RECORD.pack(KEYFRAME, t, len(frame)))
+                    f.write(frame.tobytes())
+                    last_keyframe = t
+                else:
+                    changed = np.flatnonzero(frame != previous)
+                    if not len(changed):
+                        continue
+                    deltas = np.empty(len(changed), dtype=DELTA_DTYPE)
+                    deltas["index"] = changed
+                    deltas["value"] = frame[changed]
+                    f.write(RECORD.pack(DELTA, t, len(changed)))
+                    f.write(deltas.tobytes())
+                previous = frame
+                self.stored += 1
+            f.write(RECORD.pack(END, clock.now() - self.started, 0))
+
+    def stop(self, timeout=2.0):
+        if self.dmx:
+            self.dmx.remove_frame_listener(self.on_frame)
+        if self.task:
+            supervisor.stop_task(self.task, timeout)
+            self.task = None
+        logging.info(f"Recording stopped: {self.frames} frames, {self.stored} stored, {self.dropped} dropped")
+
+
+class Player:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.channels = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            self.file.close()
+            raise ValueError(f"not a DMX recording: {path}")
+        self.index = self.build_index()
+        self.keyframes = np.flatnonzero(self.index["kind"] == KEYFRAME)
+        self.duration = float(self.index["time"][-1]) if len(self.index) else 0.0
+        self.running = False
+        self.task = None
+
+    def build_index(self):
+        """Recorre las cabeceras de registro una vez: (kind, time, count, offset del payload)."""
+        entries = []
+        offset = HEADER.size
+        size = len(self.map)
+        while offset + RECORD.size <= size:
+            kind, t, count = RECORD.unpack_from(self.map, offset)
+            offset += RECORD.size
+            entries.append((kind, t, count, offset))
+            if kind == END:
+                break
+            offset += count if kind == KEYFRAME else count * DELTA_DTYPE.itemsize
+        return np.array(entries, dtype=[("kind", "u1"), ("time", "f8"), ("count", "u4"), ("offset", "i8")])
+
+    def frames(self, start=0.0):
+        """Genera (tiempo, frame uint8) desde `start` segundos; arranca en el keyframe anterior."""
+        if not len(self.keyframes):
+            return
+        times = self.index["time"][self.keyframes]
+        k = max(0, np.searchsorted(times, start, side="right") - 1)
+        frame = np.zeros(self.channels, dtype=np.uint8)
+        for kind, t, count, offset in self.index[self.keyframes[k]:].tolist():
+            if kind == KEYFRAME:
+                frame = np.frombuffer(self.map, dtype=np.uint8, count=count, offset=offset).copy()
+            elif kind == DELTA:
+                deltas = np.frombuffer(self.map, dtype=DELTA_DTYPE, count=count, offset=offset)
+                frame[deltas["index"]] = deltas["value"]
+            else:
+                break
+            if t >= start:
+                yield t, frame
+
+    def play(self, dmx_sender, speed=1.0, loop=False, start=0.0):
+        self.stop()
+        self.running = True
+        self.task = supervisor.start("player", self.play_loop, args=(dmx_sender, speed, loop, start))
+
+    def play_loop(self, token, dmx_sender, speed, loop, start):
+        try:
+            while self.running:
+                t0 = clock.now() - start / speed
+                for t, frame in self.frames(start):
+                    # Plazos absolutos desde el inicio: el retardo de un frame no se acumula en los siguientes
+                    if token.wait(max(0.0, t0 + t / speed - clock.now())):
+                        return
+                    dmx_sender.send_finished(frame)
+                # Se mantiene el último frame hasta el final grabado antes de terminar o repetir
+                if token.wait(max(0.0, t0 + self.duration / speed - clock.now())) or not loop:
+                    break
+                start = 0.0
+        finally:
+            dmx_sender.send_finished(None)  # Vuelve la salida en vivo
+            self.running = False
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        if self.task:
+            supervisor.stop_task(self.task, timeout)
+        self.task = None
+
+    def close(self):
+        self.stop()
+        self.map.close()
+        self.file.close()
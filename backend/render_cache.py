@@ -0,0 +1,101 @@
+"""
+Render cache for periodic effects.
+Effects whose cycle() is not None are pure periodic functions of time, so one
+full period is sampled at the output frame rate and played back by indexing
+modulo the period. Entries are keyed by (effect, params, fixture count), filled
+slot by slot as they are first needed (no render burst on a cache miss), stored
+as float16 and evicted least-recently-used under a memory budget. The engine
+keeps `fps` equal to the sender's real frame rate (set_fps), so a fast short
+universe gets one sample per transmitted frame.
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+
+MAX_FRAMES = 4096  # Periodos más largos (p. ej. velocidades muy bajas) se renderizan en vivo
+
+
+class CacheEntry:
+    def __init__(self, attributes, frames, count, period):
+        self.attributes = attributes
+        self.period = period
+        self.data = np.zeros((frames, len(attributes), count), dtype=np.float16)
+        self.filled = np.zeros(frames, dtype=bool)
+        self.nbytes = self.data.nbytes + self.filled.nbytes
+
+
+class RenderCache:
+    def __init__(self, budget_mb=32, fps=44):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.fps = fps
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def set_fps(self, fps):
+        """Cambia la frecuencia de muestreo; las entradas muestreadas a otra frecuencia se descartan."""
+        with self.lock:
+            if fps == self.fps:
+                return
+            self.fps = fps
+            self.entries.clear()
+            self.size = 0
+        logging.info(f"Render cache: sampling at {fps:.0f} fps")
+
+    def key(self, effect, count):
+        return effect.name, json.dumps(effect.params(), sort_keys=True), count
+
+    def render(self, effect, t, count):
+        """Como effect.render(t, count), desde la caché si el efecto es periódico."""
+        cycle = effect.cycle()
+        if not cycle or effect.speed <= 0:
+            return effect.render(t, count)
+        period = cycle * 100.0 / effect.speed
+        frames = max(1, round(period * self.fps))
+        if frames > MAX_FRAMES:
+            return effect.render(t, count)
+        key = self.key(effect, count)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.insert(key, effect.attributes, frames, count, period)
+            else:
+                self.entries.move_to_end(key)
+        slot = int((t % period) / period * frames) % frames
+        if entry is not None and entry.filled[slot]:
+            self.hits += 1
+            return {attribute: entry.data[slot, i].astype(np.float32) for i, attribute in enumerate(entry.attributes)}
+        self.misses += 1
+        # Un poco después del inicio del hueco para que los efectos por pasos no caigan justo en el borde
+        values = effect.render((slot + 1e-6) * period / frames, count)
+        if entry is not None:
+            for i, attribute in enumerate(entry.attributes):
+                entry.data[slot, i] = values[attribute]
+            entry.filled[slot] = True
+        return values
+
+    def insert(self, key, attributes, frames, count, period):
+        entry = CacheEntry(tuple(attributes), frames, count, period)
+        if entry.nbytes > self.budget:
+            return None
+        while self.entries and self.size + entry.nbytes > self.budget:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.nbytes
+        self.entries[key] = entry
+        self.size += entry.nbytes
+        logging.info(f"Render cache: {key[0]} x{count}, {frames} frames ({entry.nbytes // 1024} KB)")
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {"entries": len(self.entries), "bytes": self.size, "budget": self.budget,
+                "hits": self.hits, "misses": self.misses}
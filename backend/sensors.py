@@ -1,16 +1,27 @@
 """
 Sensor module for reading DHT11/DHT22 temperature and humidity.
+Readings are taken by a background SensorService that caches the last good value.
 """
 
-import Adafruit_DHT
 import logging
+import random
+import threading
+import time
+from collections import namedtuple
+from backend import clock, metrics
+from backend.supervisor import supervisor
 
-SENSOR_TYPES = {"DHT11": Adafruit_DHT.DHT11, "DHT22": Adafruit_DHT.DHT22}
+SENSOR_TYPES = ("DHT11", "DHT22")
 DHT_PIN = 4
 
+SensorReading = namedtuple("SensorReading", ["temperature", "humidity", "timestamp"])
+
+
 def read_dht(sensor_type):
-    sensor = SENSOR_TYPES.get(sensor_type, Adafruit_DHT.DHT11)
+    """Lectura bloqueante con reintentos (puede tardar varios segundos)."""
     try:
+        import Adafruit_DHT
+        sensor = {"DHT11": Adafruit_DHT.DHT11, "DHT22": Adafruit_DHT.DHT22}.get(sensor_type, Adafruit_DHT.DHT11)
         humidity, temperature = Adafruit_DHT.read_retry(sensor, DHT_PIN)
         if humidity is not None and temperature is not None:
             logging.info(f"Sensor read: Temp={temperature:.1f}°C, Hum={humidity:.1f}%")
@@ -21,3 +32,154 @@ def read_dht(sensor_type):
     except Exception as e:
         logging.error(f"Sensor error: {e}")
         return None, None
+
+
+class DHTSensor:
+    """Backend for a real DHT11/DHT22; one read attempt per call, retries are left to the service."""
+
+    def __init__(self, sensor_type="DHT11", pin=DHT_PIN):
+        import Adafruit_DHT
+        self._dht = Adafruit_DHT
+        self.sensor_type = sensor_type if sensor_type in SENSOR_TYPES else "DHT11"
+        self.sensor = Adafruit_DHT.DHT22 if self.sensor_type == "DHT22" else Adafruit_DHT.DHT11
+        self.pin = pin
+
+    def read(self):
+        """Devuelve (humidity, temperature) o (None, None) si la lectura falla."""
+        return self._dht.read(self.sensor, self.pin)
+
+
+class SimulatedSensor:
+    """Sensor backend for tests and machines without a DHT wired up."""
+
+    def __init__(self, temperature=22.0, humidity=45.0, jitter=0.0, delay=0.0, seed=None):
+        self.temperature = temperature
+        self.humidity = humidity
+        self.jitter = jitter
+        self.delay = delay
+        self.failures = 0
+        self.reads = 0
+        self.random = random.Random(seed)
+
+    def fail_next(self, count=1):
+        """Hace que las próximas `count` lecturas fallen."""
+        self.failures += count
+
+    def read(self):
+        self.reads += 1
+        if self.delay:
+            clock.sleep(self.delay)
+        if self.failures > 0:
+            self.failures -= 1
+            return None, None
+        humidity = self.humidity + self.random.uniform(-self.jitter, self.jitter)
+        temperature = self.temperature + self.random.uniform(-self.jitter, self.jitter)
+        return humidity, temperature
+
+
+def make_sensor(sensor_type, simulate=False):
+    """Crea el backend adecuado; devuelve None si la librería DHT no está disponible."""
+    if simulate:
+        return SimulatedSensor()
+    try:
+        return DHTSensor(sensor_type)
+    except ImportError as e:
+        logging.error(f"DHT sensor unavailable: {e}")
+        return None
+
+
+class SensorService:
+    """Polls a sensor backend on its own thread, with exponential backoff on failures.
+
+    Subscribers are called from the sensor thread with a SensorReading; GUI code
+    must marshal them to its own thread (e.g. through a Qt signal).
+    """
+
+    def __init__(self, backend=None, interval=2.0, max_backoff=60.0):
+        self.backend = backend
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+        self.last_reading = None
+        self.failures = 0
+        self.subscribers = []
+        self.running = False
+        self.task = None
+        self._wake = threading.Event()
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def set_backend(self, backend):
+        """Cambia el sensor y fuerza una lectura inmediata."""
+        with self.lock:
+            self.backend = backend
+            self.failures = 0
+        self._wake.set()
+
+    def get_reading(self):
+        """Última lectura válida en caché (o None), sin bloquear."""
+        with self.lock:
+            return self.last_reading
+
+    def next_delay(self):
+        if self.failures == 0:
+            return self.interval
+        return min(self.interval * (2 ** self.failures), self.max_backoff)
+
+    def poll_once(self):
+        """Lee el sensor una vez, actualiza la caché y devuelve la espera hasta la siguiente lectura."""
+        with self.lock:
+            backend = self.backend
+        if backend is None:
+            return self.max_backoff
+        try:
+            with metrics.sensor_read_seconds.time():
+                humidity, temperature = backend.read()
+        except Exception as e:
+            logging.error(f"Sensor error: {e}")
+            humidity, temperature = None, None
+
+        if humidity is None or temperature is None:
+            with self.lock:
+                self.failures += 1
+                delay = self.next_delay()
+            logging.warning(f"Failed to read sensor, retrying in {delay:.1f}s")
+            return delay
+
+        reading = SensorReading(temperature, humidity, time.time())
+        with self.lock:
+            self.last_reading = reading
+            self.failures = 0
+            subscribers = list(self.subscribers)
+        logging.debug(f"Sensor read: Temp={temperature:.1f}°C, Hum={humidity:.1f}%")
+        for callback in subscribers:
+            try:
+                callback(reading)
+            except Exception as e:
+                logging.error(f"Sensor subscriber error: {e}")
+        return self.interval
+
+    def _run(self, token):
+        while self.running and not token.cancelled:
+            delay = self.poll_once()
+            clock.wait(self._wake, delay)
+            self._wake.clear()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.task = supervisor.start("sensor-service", self._run, restart=True, on_cancel=self._wake.set)
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        if self.task:
+            supervisor.stop_task(self.task, timeout)  # Una lectura en curso del DHT puede tardar
+            self.task = None
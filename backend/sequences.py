@@ -1,35 +1,77 @@
 import time
 import json
 import logging
-from . import effects
+from . import clock, effects, metrics
+from .profiler import profiler
+from .tempo import tempo
 
 class SequenceManager:
     def __init__(self):
         self.running = False
         self.current_sequence = None
 
-    def run_sequence(self, dmx_sender, start_address, heads, mode_channels, sequence):
-        """Ejecuta una secuencia de pasos con efectos o datos DMX."""
+    def run_sequence(self, dmx_sender, start_address, heads, mode_channels, sequence, token=None, stack=None):
+        """Ejecuta una secuencia de pasos con efectos o datos DMX; con `token`, la cancelación corta la espera.
+        Un paso dura "duration" segundos o "beats" beats; los de beats terminan en la rejilla del reloj de tempo.
+        Con `stack` (EffectStack) los pasos de efecto son capas de la pila; sin ella, el EffectManager antiguo."""
+        wait = token.wait if token else clock.sleep
+        layer = None
         self.running = True
         self.current_sequence = sequence
+        planned = clock.now()  # Inicio previsto de cada paso según las duraciones acumuladas
+        beat = round(tempo.beat())  # Lo mismo en beats
         try:
             for step in sequence:
-                if not self.running:
+                if not self.running or (token and token.cancelled):
                     break
-                if "effect" in step:
+                metrics.sequence_drift_seconds.observe(max(0.0, clock.now() - planned))
+                if profiler.enabled:
+                    profiler.span("sequence step", time.perf_counter())
+                if "effect" in step or "dmx" in step:
+                    if "beats" in step:
+                        beat += step["beats"]
+                        planned = tempo.time_of(beat)
+                    else:
+                        planned += step.get("duration", 1)
+                        beat += step.get("duration", 1) * tempo.bpm / 60.0
+                if "effect" in step and stack is not None:
+                    layer = self.add_layer(stack, step["effect"])
+                    wait(self.step_time(step, planned))  # usa duración por defecto si no está
+                    if layer:
+                        stack.remove(layer.id)
+                        layer = None
+                elif "effect" in step:
                     effects.run_effect(step["effect"], dmx_sender, start_address, heads, mode_channels)
-                    time.sleep(step.get("duration", 1))  # usa duración por defecto si no está
+                    wait(self.step_time(step, planned))  # usa duración por defecto si no está
                     effects.stop_effect()
                 elif "dmx" in step:
                     for addr_str, value in step["dmx"].items():
                         addr = int(addr_str) - 1
                         dmx_sender.update_channel(addr, value)
-                    time.sleep(step.get("duration", 1))
+                    wait(self.step_time(step, planned))
                 logging.info(f"Sequence step executed: {step}")
         except Exception as e:
             logging.error(f"Sequence error: {e}")
         finally:
-            effects.stop_effect()  # Asegura que se detengan los efectos al finalizar
+            # Asegura que se detengan los efectos al finalizar
+            if stack is None:
+                effects.stop_effect()
+            elif layer:
+                stack.remove(layer.id)
+
+    def add_layer(self, stack, name):
+        """Capa del paso de efecto, a la velocidad y los beats del EffectManager; None si el efecto no existe."""
+        if name not in effects.LAYER_EFFECTS:
+            logging.error(f"Sequence: unknown effect {name}")
+            return None
+        manager = effects.effect_manager
+        return stack.add(effects.create_effect(name, speed=manager.speed, beats=manager.beats))
+
+    def step_time(self, step, planned):
+        """Segundos de espera del paso: su duración o, si va en beats, lo que falta hasta su beat final."""
+        if "beats" in step:
+            return max(0.0, planned - clock.now())
+        return step.get("duration", 1)
 
     def stop(self):
         """Detiene la ejecución de la secuencia."""
@@ -47,8 +89,8 @@ class SequenceManager:
 
 sequence_manager = SequenceManager()
 
-def run_sequence(dmx_sender, start_address, heads, mode_channels, sequence):
-    sequence_manager.run_sequence(dmx_sender, start_address, heads, mode_channels, sequence)
+def run_sequence(dmx_sender, start_address, heads, mode_channels, sequence, token=None, stack=None):
+    sequence_manager.run_sequence(dmx_sender, start_address, heads, mode_channels, sequence, token, stack)
 
 def stop_sequence():
     sequence_manager.stop()
@@ -0,0 +1,151 @@
+"""
+Single-file show format (SQLite).
+One table holds every item of a show (patch, fixture profiles, output and color
+settings, effect layers, expression effects, scenes, sequences and cue lists) as JSON, keyed by (kind, name).
+Opening a show only reads the table of contents; item data is loaded on demand
+and each save writes just the items that changed: every row stores a hash of its
+JSON, listed in the table of contents, so an unchanged item is skipped whether
+or not it has been loaded. The schema version is kept in PRAGMA user_version.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA_VERSION = 2
+KINDS = ("patch", "profile", "output", "color", "layers", "scene", "sequence", "cuelist", "effect")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    modified REAL NOT NULL,
+    PRIMARY KEY (kind, name)
+)
+"""
+
+
+def content_hash(data):
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+class ShowFile:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")  # Guardados incrementales sin reescribir el archivo
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            self.db.close()
+            raise ValueError(f"show {path} uses schema {version}, newer than supported {SCHEMA_VERSION}")
+        if version < SCHEMA_VERSION:
+            self.migrate(version)
+        self.toc = {}  # {(kind, name): (tamaño, modificado)}; solo el índice, sin datos
+        self.hashes = {}  # {(kind, name): hash del JSON guardado}
+        self._cache = {}
+        for kind, name, size, modified, digest in self.db.execute(
+                "SELECT kind, name, size, modified, hash FROM items"):
+            self.toc[(kind, name)] = (size, modified)
+            self.hashes[(kind, name)] = digest
+        logging.info(f"Show opened: {path} ({len(self.toc)} items)")
+
+    def migrate(self, version):
+        """Crea o actualiza el esquema desde `version` (0 = archivo nuevo)."""
+        with self.db:
+            if version < 1:
+                self.db.execute(SCHEMA)
+            if version < 2:
+                # Hash del contenido para saltar los elementos sin cambios sin leer sus datos
+                self.db.execute("ALTER TABLE items ADD COLUMN hash TEXT")
+                rows = self.db.execute("SELECT kind, name, data FROM items").fetchall()
+                self.db.executemany("UPDATE items SET hash = ? WHERE kind = ? AND name = ?",
+                                    [(content_hash(data), kind, name) for kind, name, data in rows])
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def names(self, kind):
+        return sorted(name for k, name in self.toc if k == kind)
+
+    def contents(self):
+        """Tabla de contenidos: {kind: [{"name", "size", "modified"}]}."""
+        result = {}
+        for (kind, name), (size, modified) in sorted(self.toc.items()):
+            result.setdefault(kind, []).append({"name": name, "size": size, "modified": modified})
+        return result
+
+    def __contains__(self, key):
+        return key in self.toc
+
+    def get(self, kind, name, default=None):
+        """Lee un elemento la primera vez que se pide."""
+        key = (kind, name)
+        if key not in self.toc:
+            return default
+        with self.lock:
+            if key not in self._cache:
+                row = self.db.execute("SELECT data FROM items WHERE kind = ? AND name = ?", key).fetchone()
+                self._cache[key] = json.loads(row[0])
+            return self._cache[key]
+
+    def put(self, kind, name, value):
+        """Guarda un elemento; solo se escribe si ha cambiado."""
+        if kind not in KINDS:
+            raise ValueError(f"unknown item kind: {kind}")
+        key = (kind, name)
+        data = json.dumps(value, sort_keys=True)
+        digest = content_hash(data)
+        with self.lock:
+            if self.hashes.get(key) == digest:
+                return False
+            modified = time.time()
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO items (kind, name, data, size, modified, hash) "
+                                "VALUES (?, ?, ?, ?, ?, ?)", (kind, name, data, len(data), modified, digest))
+            self._cache[key] = json.loads(data)
+            self.toc[key] = (len(data), modified)
+            self.hashes[key] = digest
+        return True
+
+    def delete(self, kind, name):
+        key = (kind, name)
+        with self.lock:
+            with self.db:
+                self.db.execute("DELETE FROM items WHERE kind = ? AND name = ?", key)
+            self._cache.pop(key, None)
+            self.hashes.pop(key, None)
+            return self.toc.pop(key, None) is not None
+
+    def import_presets(self, directory):
+        """Importa los JSON sueltos de presets/: listas de números como escenas, listas de pasos como secuencias
+        y objetos con "attributes" como efectos de expresiones."""
+        imported = []
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    data = json.load(f)
+            except Exception as e:
+                logging.error(f"Cannot import {filename}: {e}")
+                continue
+            if isinstance(data, dict) and "attributes" in data:
+                name = str(data.get("name") or filename[:-5])
+                self.put("effect", name, dict(data, name=name))
+                imported.append(("effect", name))
+                continue
+            if not isinstance(data, list):
+                continue
+            kind = "scene" if all(isinstance(v, int) for v in data) else "sequence"
+            self.put(kind, filename[:-5], data)
+            imported.append((kind, filename[:-5]))
+        return imported
+
+    def close(self):
+        with self.lock:
+            self.db.close()
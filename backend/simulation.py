@@ -0,0 +1,188 @@
+"""
+Faster-than-realtime simulation.
+Simulator runs a complete Engine on a VirtualClock (backend/clock.py) with the
+DMX output written to a CaptureSink in place of the UART. The clock jumps from
+one pending deadline to the next as soon as every supervised thread (send
+loop, effects, sequences, history, ...) is parked on it, so a 20-minute
+sequence renders in the time the CPU needs for its frames, and the same input
+always produces the same frames at the same timestamps:
+
+    with Simulator(fps=40) as sim:
+        sim.engine.run_sequence(sequences.load_sequence("presets/sequence.json"))
+        sim.run(1200)
+        assert sim.sink.at(10.0)[0] == 255
+
+The API, render workers, DMX input, the frame bus and the optional subsystems
+other than IR are disabled in the simulated engine. IR runs on a SimulatedGPIO,
+so set_ir() can break the beam at a given simulated time. From the command line:
+
+    python -m backend.simulation --sequence presets/sequence.json [--duration S] [--fps N] [--out capture.npz]
+"""
+
+import argparse
+import bisect
+import copy
+import logging
+import time
+import numpy as np
+from backend import clock, gpio, sequences
+from backend.config import load_config
+from backend.engine import Engine
+from backend.supervisor import supervisor
+from backend.tempo import tempo
+
+
+class CaptureSink:
+    """Puerto serie simulado: guarda cada frame transmitido con su instante en el reloj de render."""
+
+    def __init__(self, clock, channels=512):
+        self.clock = clock
+        self.channels = channels
+        self.times = []
+        self.frames = []  # bytes de los canales, sin start code
+        self.break_condition = False
+        self.baudrate = 250000
+
+    def write(self, data):
+        self.times.append(self.clock.now())
+        self.frames.append(bytes(data[1:]))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __len__(self):
+        return len(self.frames)
+
+    def index(self, t):
+        """Índice del último frame transmitido en el instante `t` o antes; -1 si no hay ninguno."""
+        return bisect.bisect_right(self.times, t + 1e-9) - 1
+
+    def frame(self, index):
+        data = np.zeros(self.channels, dtype=np.uint8)
+        frame = self.frames[index]
+        data[:len(frame)] = np.frombuffer(frame, dtype=np.uint8)[:self.channels]
+        return data
+
+    def at(self, t):
+        """Canales (0-based) en la salida en el instante `t`."""
+        index = self.index(t)
+        if index < 0:
+            raise ValueError(f"no frame transmitted at t={t}")
+        return self.frame(index)
+
+    def to_array(self):
+        """(frames, canales) uint8."""
+        return np.stack([self.frame(i) for i in range(len(self.frames))]) if self.frames \
+            else np.zeros((0, self.channels), dtype=np.uint8)
+
+    def channel(self, channel):
+        """Serie temporal (instantes, valores) del canal `channel` (1-based)."""
+        values = np.array([frame[channel - 1] if len(frame) >= channel else 0 for frame in self.frames],
+                          dtype=np.uint8)
+        return np.array(self.times), values
+
+    def save(self, path):
+        np.savez_compressed(path, times=np.array(self.times), frames=self.to_array())
+
+
+def simulation_config(config=None, fps=44.0):
+    """Copia de la configuración para simular: salida a la captura a `fps` y sin servicios externos."""
+    config = copy.deepcopy(config or load_config(None))
+    config["dmx"].update({"port": None, "break": "none", "refresh_hz": fps})
+    config["dmx_input"]["enabled"] = False
+    config["api"]["enabled"] = False
+    config["framebus"]["enabled"] = False
+    config["render_workers"]["processes"] = 0  # El render de los workers no espera al reloj simulado
+    config["subsystems"] = {name: name == "ir" for name in config["subsystems"]}
+    config["gpio"]["simulate"] = True
+    return config
+
+
+def sequence_duration(sequence, bpm=None):
+    """Duración nominal de una secuencia en segundos (los pasos en beats, al tempo `bpm`)."""
+    bpm = bpm or tempo.bpm
+    return sum(step["beats"] * 60.0 / bpm if "beats" in step else step.get("duration", 1)
+               for step in sequence if "effect" in step or "dmx" in step)
+
+
+class Simulator:
+    def __init__(self, config=None, fps=44.0, settle_timeout=1.0):
+        # En un mismo instante el frame se envía el último, así que at(t) ve el estado en t
+        self.clock = clock.VirtualClock(threads=self.threads, order=lambda thread: (thread.name == "dmx-send", thread.name))
+        self.settle_timeout = settle_timeout  # Tiempo real máximo de espera a que los hilos se paren
+        self.previous = clock.use(self.clock)
+        tempo.reset()
+        self.config = simulation_config(config, fps)
+        self.sink = CaptureSink(self.clock)
+        self.engine = Engine(self.config, serial_port=self.sink)
+
+    def threads(self):
+        with supervisor.lock:
+            return [task.thread for task in supervisor.tasks.values() if task.thread]
+
+    def start(self):
+        self.engine.start()
+        self.clock.settle(self.settle_timeout)
+        return self
+
+    def run(self, seconds):
+        """Avanza `seconds` segundos de tiempo simulado; devuelve la captura."""
+        return self.run_until(self.clock.now() + seconds)
+
+    def run_until(self, t):
+        self.clock.run_until(t, self.settle_timeout)
+        if self.clock.stalls:
+            logging.warning(f"Simulation: {self.clock.stalls} steps where some thread did not wait on the clock")
+        return self.sink
+
+    def set_ir(self, detected):
+        """Corta (True) o libera el haz del receptor IR simulado en el instante actual."""
+        from backend import ir
+        gpio.get_backend().set_input(ir.RECEIVER_PIN, 0 if detected else 1)
+        self.clock.settle(self.settle_timeout)
+
+    def stop(self):
+        self.engine.stop()
+        clock.use(self.previous)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a sequence or effect on a simulated clock")
+    parser.add_argument("--config", default=None, help="JSON config file")
+    parser.add_argument("--sequence", help="sequence JSON file")
+    parser.add_argument("--effect", help="effect to run")
+    parser.add_argument("--duration", type=float, help="simulated seconds (default: length of the sequence)")
+    parser.add_argument("--fps", type=float, default=44.0)
+    parser.add_argument("--out", help="save the capture (times and frames) to this .npz file")
+    args = parser.parse_args()
+
+    config = load_config(args.config) if args.config else None
+    sequence = sequences.load_sequence(args.sequence) if args.sequence else None
+    started = time.perf_counter()
+    with Simulator(config, args.fps) as sim:
+        if sequence:
+            sim.engine.run_sequence(sequence)
+        elif args.effect:
+            sim.engine.run_effect(args.effect)
+        duration = args.duration if args.duration is not None else \
+            (sequence_duration(sequence) + 1.0 if sequence else 10.0)
+        sink = sim.run(duration)
+    elapsed = time.perf_counter() - started
+    print(f"{len(sink)} frames, {duration:.1f} s simulated in {elapsed:.2f} s ({duration / elapsed:.0f}x realtime)")
+    if args.out:
+        sink.save(args.out)
+        print(f"Capture saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Lazy loader for hardware and optional subsystems.
+A subsystem is only imported when enabled in the configuration and when the
+library it needs is installed; otherwise load() returns None and the caller
+runs without it.
+"""
+
+import importlib
+import importlib.util
+import logging
+import time
+
+# name: (module, required library, config section holding the "simulate" flag)
+SUBSYSTEMS = {
+    "leds": ("backend.leds", "RPi.GPIO", "gpio"),
+    "ir": ("backend.ir", "RPi.GPIO", "gpio"),
+    "sensors": ("backend.sensors", "Adafruit_DHT", "sensors"),
+    "audio": ("backend.audio", "pyaudio", "audio"),
+    "osc": ("backend.osc", "pythonosc", "osc"),
+}
+
+load_times = {}
+
+
+def library_available(name):
+    """Comprueba si una librería está instalada sin importarla."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def load(name, config):
+    """Importa el módulo del subsistema o devuelve None si está deshabilitado o no disponible."""
+    if not config["subsystems"].get(name, False):
+        logging.info(f"Subsystem {name} disabled")
+        return None
+    module_name, library, section = SUBSYSTEMS[name]
+    simulated = config.get(section, {}).get("simulate", False)
+    if not simulated and not library_available(library):
+        logging.warning(f"Subsystem {name} unavailable: {library} not installed")
+        return None
+    start = time.perf_counter()
+    try:
+        module = importlib.import_module(module_name)
+    except Exception as e:
+        logging.error(f"Subsystem {name} failed to load: {e}")
+        return None
+    load_times[name] = time.perf_counter() - start
+    logging.info(f"Subsystem {name} loaded in {load_times[name] * 1000:.1f} ms")
+    return module
@@ -0,0 +1,140 @@
+"""
+Global musical clock.
+One TempoClock (the `tempo` singleton) maps the render clock (backend/clock.py,
+the same clock EffectStack and the send loop use) to a beat position from an
+anchor (time, beat) and the BPM, so every consumer derives its phase from the
+same line instead of accumulating its own sleeps:
+
+- layer effects with a `beats` parameter run one cycle every that many beats,
+  in phase with each other (backend/layers.py layer_time);
+- effect switches and sequence GOs can be quantized to the next beat or bar;
+- sequence steps can last a number of beats.
+
+The tempo is set directly, by tap tempo, nudged or resynced (API, OSC
+/tempo/*), or followed from the audio beat tracker.
+"""
+
+import logging
+import math
+import threading
+from backend import clock
+
+
+class TempoClock:
+    def __init__(self, bpm=120.0, beats_per_bar=4, clock=clock.now):
+        self.clock = clock
+        self.bpm = float(bpm)
+        self.beats_per_bar = beats_per_bar
+        self.anchor_time = clock()
+        self.anchor_beat = 0.0
+        self.taps = []
+        self.tap_timeout = 2.0  # Una pausa más larga empieza una nueva serie de taps
+        self.follow = 0.2  # Fracción del error de fase corregida en cada beat detectado por el audio
+        self.lock = threading.Lock()
+
+    def beat(self, now=None):
+        """Posición en beats (continua) en el instante `now` del reloj de render."""
+        now = self.clock() if now is None else now
+        return self.anchor_beat + (now - self.anchor_time) * self.bpm / 60.0
+
+    def time_of(self, beat):
+        """Instante del reloj de render en que se llega al beat `beat`."""
+        return self.anchor_time + (beat - self.anchor_beat) * 60.0 / self.bpm
+
+    def phase(self, beats=1, now=None):
+        """Fase 0-1 dentro de un ciclo de `beats` beats."""
+        return (self.beat(now) / beats) % 1.0
+
+    def quantum(self, quantize):
+        """Beats de la rejilla para "beat", "bar" o un número; 0 = sin cuantizar."""
+        if quantize in (None, 0, "none"):
+            return 0
+        if quantize == "bar":
+            return self.beats_per_bar
+        if quantize == "beat":
+            return 1
+        return float(quantize)
+
+    def next_time(self, quantize="beat", now=None):
+        """Instante del siguiente beat (o compás, o múltiplo de `quantize` beats) estrictamente posterior a `now`;
+        `now` si no se cuantiza."""
+        now = self.clock() if now is None else now
+        quantum = self.quantum(quantize)
+        if not quantum:
+            return now
+        beat = self.beat(now)
+        target = (math.floor(beat / quantum + 1e-6) + 1) * quantum
+        return self.time_of(target)
+
+    def wait(self, token, quantize="beat"):
+        """Espera (cancelable) hasta el siguiente punto de la rejilla; devuelve True si se canceló."""
+        return token.wait(max(0.0, self.next_time(quantize) - self.clock()))
+
+    def reset(self):
+        """Vuelve al beat 0 en el instante actual (p. ej. tras cambiar de reloj)."""
+        with self.lock:
+            self.anchor_time = self.clock()
+            self.anchor_beat = 0.0
+            self.taps = []
+
+    def _reanchor(self, now):
+        self.anchor_beat = self.beat(now)
+        self.anchor_time = now
+
+    def set_bpm(self, bpm):
+        """Cambia el tempo sin saltos de fase."""
+        if not 20 <= bpm <= 400:
+            raise ValueError(f"bpm out of range: {bpm}")
+        with self.lock:
+            self._reanchor(self.clock())
+            self.bpm = float(bpm)
+        logging.info(f"Tempo: {self.bpm:.1f} BPM")
+
+    def tap(self, now=None):
+        """Tap tempo: el BPM sale de la mediana de los últimos intervalos y el tap cae en un beat."""
+        now = self.clock() if now is None else now
+        with self.lock:
+            if self.taps and now - self.taps[-1] > self.tap_timeout:
+                self.taps = []
+            self.taps = (self.taps + [now])[-8:]
+            if len(self.taps) >= 2:
+                intervals = sorted(b - a for a, b in zip(self.taps, self.taps[1:]))
+                middle = len(intervals) // 2
+                median = intervals[middle] if len(intervals) % 2 else (intervals[middle - 1] + intervals[middle]) / 2
+                self._reanchor(now)
+                self.bpm = min(400.0, max(20.0, 60.0 / median))
+            self.anchor_beat = round(self.beat(now))
+            self.anchor_time = now
+        return self.bpm
+
+    def nudge(self, seconds):
+        """Adelanta (positivo) o retrasa la fase `seconds` segundos sin cambiar el tempo."""
+        with self.lock:
+            self.anchor_time -= seconds
+
+    def resync(self, now=None):
+        """El instante actual pasa a ser el primer beat de un compás."""
+        now = self.clock() if now is None else now
+        with self.lock:
+            beat = self.beat(now)
+            self.anchor_beat = round(beat / self.beats_per_bar) * self.beats_per_bar
+            self.anchor_time = now
+
+    def on_beat(self, now=None):
+        """Beat detectado (p. ej. por el audio): corrige una fracción del error de fase hacia el beat más cercano."""
+        now = self.clock() if now is None else now
+        with self.lock:
+            beat = self.beat(now)
+            error = beat - round(beat)
+            self._reanchor(now)
+            self.anchor_beat -= error * self.follow
+
+    def status(self):
+        now = self.clock()
+        beat = self.beat(now)
+        return {"bpm": self.bpm, "beat": beat, "bar": int(beat // self.beats_per_bar) + 1,
+                "beat_in_bar": int(beat % self.beats_per_bar) + 1, "beats_per_bar": self.beats_per_bar}
+
+
+# Reloj musical único del motor (efectos, secuencias, OSC y audio)
+tempo = TempoClock()
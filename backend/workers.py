@@ -0,0 +1,205 @@
+"""
+Multi-process effect rendering.
+Layers are spread over a pool of worker processes, so heavy looks use every
+core instead of competing for the GIL with send_loop, the API and the GUI.
+Each worker renders its layers into a multiprocessing.shared_memory buffer;
+the main process only applies the color pipeline, blends and transmits.
+
+Per frame the composer collects the results requested on the previous frame
+and immediately requests the next one (time predicted from the frame interval),
+so workers render while the main process transmits. All workers share one short
+deadline per frame (`timeout`), so a slow worker adds at most that to the
+compose: its layers are rendered in-process instead. Requests and replies carry
+the frame number, and a reply that arrives after its frame has been sent is
+discarded (the worker just gets the next request).
+"""
+
+import json
+import logging
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait as wait_connections
+import numpy as np
+
+CAPACITY = 65536  # Valores float32 por worker (atributos x fixtures de todas sus capas)
+
+
+def worker_main(conn, shm_name, cache_budget_mb):
+    """Bucle del proceso worker: ("layers", specs) cambia sus capas, ("fps", fps) la frecuencia de su caché,
+    ("frame", seq, t, beat) renderiza un frame."""
+    from backend.layers import layer_time
+    from backend.render_cache import RenderCache
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buffer = np.ndarray((CAPACITY,), dtype=np.float32, buffer=shm.buf)
+    cache = RenderCache(cache_budget_mb) if cache_budget_mb else None
+    layers = []
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == "stop":
+                break
+            if message[0] == "layers":
+                layers = message[1]
+                continue
+            if message[0] == "fps":
+                if cache:
+                    cache.set_fps(message[1])
+                continue
+            _, seq, t, beat = message
+            failed = []
+            for layer_id, effect, started, count, offset in layers:
+                t_layer = layer_time(effect, started, t, beat)
+                try:
+                    values = cache.render(effect, t_layer, count) if cache else effect.render(t_layer, count)
+                    for i, attribute in enumerate(effect.attributes):
+                        buffer[offset + i * count:offset + (i + 1) * count] = values[attribute]
+                except Exception as e:
+                    failed.append((layer_id, str(e)))
+            conn.send(("done", seq, failed))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del buffer
+        shm.close()
+
+
+class Worker:
+    def __init__(self, context, index, cache_budget_mb):
+        self.index = index
+        self.shm = shared_memory.SharedMemory(create=True, size=CAPACITY * 4)
+        self.buffer = np.ndarray((CAPACITY,), dtype=np.float32, buffer=self.shm.buf)
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child, self.shm.name, cache_budget_mb),
+                                       name=f"render-{index}", daemon=True)
+        self.layers = []  # (layer, count, offset)
+        self.pending = None  # Secuencia del frame pedido y aún no recogido
+
+    def stop(self, timeout=1.0):
+        try:
+            self.conn.send(("stop",))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        del self.buffer
+        self.shm.close()
+        self.shm.unlink()
+
+
+class RenderPool:
+    def __init__(self, patch, processes=2, cache_budget_mb=0, timeout=0.005):
+        self.patch = patch
+        self.processes = processes
+        self.cache_budget_mb = cache_budget_mb
+        self.timeout = timeout  # Espera máxima por los resultados de un frame, común a todos los workers
+        self.workers = []
+        self.signature = None
+        self.seq = 0
+        self.last_now = None
+        self.late = 0  # Respuestas que no llegaron a tiempo para su frame
+        self.stale = 0  # Respuestas llegadas después de su frame y descartadas
+        self.fps = None  # Frecuencia de salida para las cachés de los workers
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")  # Sin fork: el proceso principal ya tiene hilos
+        self.workers = [Worker(context, i, self.cache_budget_mb) for i in range(self.processes)]
+        for worker in self.workers:
+            worker.process.start()
+        if self.fps:
+            self.set_fps(self.fps)
+        logging.info(f"Render pool started: {self.processes} processes")
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+        self.signature = None
+
+    def set_fps(self, fps):
+        self.fps = fps
+        for worker in self.workers:
+            worker.conn.send(("fps", fps))
+
+    def sync(self, layers):
+        """Reparte las capas entre los workers cuando cambian (capas, parámetros o patch)."""
+        signature = tuple((layer.id, layer.effect.name, json.dumps(layer.effect.params(), sort_keys=True),
+                           layer.group, layer.failed) for layer in layers) + (self.patch.version,)
+        if signature == self.signature:
+            return
+        self.signature = signature
+        for worker in self.workers:
+            worker.layers = []
+        sizes = [0] * len(self.workers)
+        for layer in layers:
+            if layer.failed or layer.effect.live:
+                continue
+            count = len(self.patch.fixtures(layer.group))
+            size = count * len(layer.effect.attributes)
+            i = sizes.index(min(sizes))  # Al worker con menos valores
+            if sizes[i] + size > CAPACITY:
+                continue  # Sin sitio: se renderiza en el proceso principal
+            self.workers[i].layers.append((layer, count, sizes[i]))
+            sizes[i] += size
+        for worker in self.workers:
+            specs = [(layer.id, layer.effect, layer.started, count, offset) for layer, count, offset in worker.layers]
+            worker.conn.send(("layers", specs))
+            worker.pending = None
+
+    def collect(self, expected):
+        """Recoge las respuestas pendientes con un único plazo para todos los workers;
+        devuelve los workers que han entregado el frame `expected`."""
+        deadline = time.perf_counter() + self.timeout
+        ready = []
+        while True:
+            waiting = [worker for worker in self.workers if worker.pending is not None]
+            # Solo se espera por el frame actual; las respuestas atrasadas se recogen si ya están
+            timeout = max(0.0, deadline - time.perf_counter()) \
+                if any(worker.pending == expected for worker in waiting) else 0.0
+            connections = wait_connections([worker.conn for worker in waiting], timeout) if waiting else []
+            if not connections:
+                return ready
+            for worker in waiting:
+                if worker.conn not in connections:
+                    continue
+                _, seq, failed = worker.conn.recv()
+                if seq != worker.pending:
+                    continue  # Respuesta a un pedido anterior a un cambio de capas
+                worker.pending = None
+                self.disable_failed(worker, failed)
+                if seq == expected:
+                    ready.append(worker)
+                else:
+                    self.stale += 1  # Sus valores son de un frame ya enviado
+
+    def disable_failed(self, worker, failed):
+        for layer_id, error in failed:
+            for layer, _, _ in worker.layers:
+                if layer.id == layer_id:
+                    layer.failed = True
+                    logging.error(f"Layer {layer.id} ({layer.effect.name}) disabled: {error}")
+
+    def render(self, layers, now, tempo=None):
+        """Devuelve {layer_id: valores} del frame pedido en la llamada anterior y pide el siguiente."""
+        self.sync(layers)
+        results = {}
+        ready = self.collect(self.seq)
+        # Los que siguen con el frame actual pendiente no llegaron: sus capas se renderizan en el proceso principal
+        self.late += sum(1 for worker in self.workers if worker.pending == self.seq)
+        for worker in ready:
+            for layer, count, offset in worker.layers:
+                if not layer.failed:
+                    results[layer.id] = {attribute: worker.buffer[offset + i * count:offset + (i + 1) * count].copy()
+                                         for i, attribute in enumerate(layer.effect.attributes)}
+        interval = now - self.last_now if self.last_now is not None else 0.0
+        self.last_now = now
+        self.seq += 1
+        predicted = now + interval
+        beat = tempo.beat(predicted) if tempo else None
+        for worker in self.workers:
+            if worker.layers and worker.pending is None:
+                worker.conn.send(("frame", self.seq, predicted, beat))
+                worker.pending = self.seq
+        return results
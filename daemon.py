@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Headless DMX engine daemon.
+Runs DMX output, effects, sequences, OSC, sensors and IR without Qt, for
+unattended rigs. The GUI (main.py) is optional.
+"""
+import time
+_T0 = time.perf_counter()  # Reference for the startup report
+import argparse
+import logging
+import signal
+import threading
+from backend import config, engine, sequences
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless DMX engine")
+    parser.add_argument("--config", default=config.CONFIG_PATH, help="JSON config file")
+    parser.add_argument("--effect", help="effect to start (overrides config)")
+    parser.add_argument("--sequence", help="sequence JSON file to run (overrides config)")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        filename='logs/dmx_controller.log',
+        level=getattr(logging, args.log_level.upper(), logging.INFO),
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    cfg = config.load_config(args.config)
+    eng = engine.Engine(cfg)
+    eng.start()
+
+    sequence_path = args.sequence or cfg["daemon"]["sequence"]
+    effect = args.effect or cfg["daemon"]["effect"]
+    if sequence_path:
+        eng.run_sequence(sequences.load_sequence(sequence_path))
+    elif effect:
+        eng.run_effect(effect)
+
+    eng.dmx.first_frame.wait(1.0)
+    logging.info(eng.startup_report(_T0))
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    while not stop.wait(1.0):
+        pass
+    eng.stop()
+
+
+if __name__ == "__main__":
+    main()
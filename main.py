@@ -1,15 +1,17 @@
 #!/usr/bin/env python3
 """
 Main script for the DMX Controller Project.
-Coordinates the GUI, DMX communication, effects, sensors, scenes, LEDs, IR, audio, OSC, and sequences.
+PyQt5 GUI for the DMX engine (backend/engine.py); use daemon.py to run without a display.
 """
-import sys
-import threading
 import time
+_T0 = time.perf_counter()  # Reference for the startup report
+import json
+import sys
 import logging
-from PyQt5.QtWidgets import QApplication, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout, QLabel, QSlider, QPushButton, QComboBox, QSpinBox, QTextEdit, QFileDialog
-from PyQt5.QtCore import Qt, QTimer
-from backend import dmx, effects, sensors, scenes, leds, ir, audio, osc, sequences
+from PyQt5.QtWidgets import QApplication, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout, QLabel, QSlider, QPushButton, QComboBox, QSpinBox, QTextEdit, QFileDialog, QShortcut
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QKeySequence
+from backend import engine
 
 # Configure logging
 logging.basicConfig(
@@ -18,25 +20,29 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+class EngineEvents(QObject):
+    """Marshals engine events (logs, sensor readings, IR edges...) from worker threads to the GUI thread."""
+    event = pyqtSignal(str, object)
+
 class DMXControllerApp(QWidget):
-    def __init__(self):
+    """GUI client of the DMX engine; all orchestration lives in backend.engine."""
+
+    def __init__(self, engine_instance):
         super().__init__()
         self.setWindowTitle("DMX Controller Ultimate")
-        self.dmx = dmx.DMXSender()  # Initialize DMX communication
-        self.start_address = 1
-        self.mode_channels = 9
-        self.heads = 2
-        self.effect_thread = None
-        self.sequence_thread = None
-        self.running = True
-        self.current_sequence = None
+        self.engine = engine_instance
+        self.config = self.engine.config
+        self.engine_events = EngineEvents()
+        self.engine_events.event.connect(self.on_engine_event)
+        self.forward_event = self.engine_events.event.emit
+        self.engine.subscribe(self.forward_event)
         self.init_ui()
-        self.init_timers()
-        self.start_threads()
         logging.info("Application initialized")
 
     def init_ui(self):
         layout = QVBoxLayout()
+        self.log_view = QTextEdit()  # Created first: building the tabs already logs
+        self.log_view.setReadOnly(True)
         self.tabs = QTabWidget()
         self.tabs.addTab(self.manual_tab(), "Manual")
         self.tabs.addTab(self.color_tab(), "Colors")
@@ -47,8 +53,6 @@ class DMXControllerApp(QWidget):
         layout.addWidget(self.tabs)
 
         # Log panel
-        self.log_view = QTextEdit()
-        self.log_view.setReadOnly(True)
         layout.addWidget(QLabel("Logs:"))
         layout.addWidget(self.log_view)
         self.setLayout(layout)
@@ -63,18 +67,21 @@ class DMXControllerApp(QWidget):
         h_conf.addWidget(QLabel("Mode:"))
         self.mode_combo = QComboBox()
         self.mode_combo.addItems(["9CH", "14CH"])
+        self.mode_combo.setCurrentIndex(0 if self.engine.mode_channels == 9 else 1)
         self.mode_combo.currentIndexChanged.connect(self.change_mode)
         h_conf.addWidget(self.mode_combo)
 
         h_conf.addWidget(QLabel("Start Address:"))
         self.addr_spin = QSpinBox()
         self.addr_spin.setRange(1, 512)
+        self.addr_spin.setValue(self.engine.start_address)
         self.addr_spin.valueChanged.connect(self.change_address)
         h_conf.addWidget(self.addr_spin)
 
         h_conf.addWidget(QLabel("Heads:"))
         self.heads_spin = QSpinBox()
         self.heads_spin.setRange(1, 10)
+        self.heads_spin.setValue(self.engine.heads)
         self.heads_spin.valueChanged.connect(self.change_heads)
         h_conf.addWidget(self.heads_spin)
         layout.addLayout(h_conf)
@@ -89,6 +96,13 @@ class DMXControllerApp(QWidget):
         btn_blackout = QPushButton("Blackout")
         btn_blackout.clicked.connect(self.blackout)
         layout.addWidget(btn_blackout)
+        h_history = QHBoxLayout()
+        for text, keys, slot in (("Undo", "Ctrl+Z", self.undo), ("Redo", "Ctrl+Shift+Z", self.redo)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            QShortcut(QKeySequence(keys), self, activated=slot)
+            h_history.addWidget(button)
+        layout.addLayout(h_history)
 
         tab.setLayout(layout)
         return tab
@@ -105,19 +119,37 @@ class DMXControllerApp(QWidget):
     def effects_tab(self):
         tab = QWidget()
         layout = QVBoxLayout()
+        self.effect_buttons = QVBoxLayout()
         for effect in ["ColorChase", "Strobe", "Rainbow", "GoboPattern", "AudioReactivity"]:
             btn = QPushButton(f"Start {effect}")
             btn.clicked.connect(lambda _, e=effect: self.run_effect(e))
-            layout.addWidget(btn)
+            self.effect_buttons.addWidget(btn)
+        layout.addLayout(self.effect_buttons)
         btn_stop = QPushButton("Stop Effect")
         btn_stop.clicked.connect(self.stop_effect)
         layout.addWidget(btn_stop)
+        btn_define = QPushButton("Load Effect Definition")
+        btn_define.clicked.connect(self.load_effect_definition)
+        layout.addWidget(btn_define)
+        btn_pixel_map = QPushButton("Pixel Map Media")
+        btn_pixel_map.clicked.connect(self.add_pixel_map)
+        layout.addWidget(btn_pixel_map)
         self.speed_slider = QSlider(Qt.Horizontal)
         self.speed_slider.setRange(1, 100)
         self.speed_slider.setValue(100)
         self.speed_slider.valueChanged.connect(self.update_effect_speed)
         layout.addWidget(QLabel("Effect Speed"))
         layout.addWidget(self.speed_slider)
+        tempo_row = QHBoxLayout()
+        btn_tap = QPushButton("Tap Tempo")
+        btn_tap.clicked.connect(self.tap_tempo)
+        tempo_row.addWidget(btn_tap)
+        btn_resync = QPushButton("Resync")
+        btn_resync.clicked.connect(self.resync_tempo)
+        tempo_row.addWidget(btn_resync)
+        self.tempo_label = QLabel(f"{self.engine.tempo.bpm:.1f} BPM")
+        tempo_row.addWidget(self.tempo_label)
+        layout.addLayout(tempo_row)
         tab.setLayout(layout)
         return tab
 
@@ -128,8 +160,14 @@ class DMXControllerApp(QWidget):
         btn_save.clicked.connect(self.save_scene)
         btn_load = QPushButton("Load Scene")
         btn_load.clicked.connect(self.load_scene)
+        btn_open_show = QPushButton("Open Show")
+        btn_open_show.clicked.connect(self.open_show)
+        btn_save_show = QPushButton("Save Show")
+        btn_save_show.clicked.connect(self.save_show)
         layout.addWidget(btn_save)
         layout.addWidget(btn_load)
+        layout.addWidget(btn_open_show)
+        layout.addWidget(btn_save_show)
         tab.setLayout(layout)
         return tab
 
@@ -140,9 +178,11 @@ class DMXControllerApp(QWidget):
         h_s.addWidget(QLabel("Sensor:"))
         self.sensor_combo = QComboBox()
         self.sensor_combo.addItems(["DHT11", "DHT22"])
+        self.sensor_combo.setCurrentText(self.config["sensors"]["type"])
+        self.sensor_combo.currentTextChanged.connect(self.change_sensor)
         h_s.addWidget(self.sensor_combo)
         layout.addLayout(h_s)
-        self.sensor_label = QLabel("Temp: --°C  Hum: --%")
+        self.sensor_label = QLabel("Temp: --°C  Hum: --%" if self.engine.sensor_service else "Sensor unavailable")
         layout.addWidget(self.sensor_label)
         tab.setLayout(layout)
         return tab
@@ -159,32 +199,27 @@ class DMXControllerApp(QWidget):
         layout.addWidget(btn_load)
         layout.addWidget(btn_run)
         layout.addWidget(btn_stop)
+        cue_row = QHBoxLayout()
+        for text, slot in (("Record Cue", self.record_cue), ("GO", self.cue_go), ("BACK", self.cue_back)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            cue_row.addWidget(button)
+        layout.addLayout(cue_row)
+        self.cue_label = QLabel("Cue: -")
+        layout.addWidget(self.cue_label)
         tab.setLayout(layout)
         return tab
 
-    def init_timers(self):
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_sensor)
-        self.timer.start(1000)
-
-    def start_threads(self):
-        self.dmx_thread = threading.Thread(target=self.dmx.send_loop, daemon=True)
-        self.dmx_thread.start()
-        self.sensor_thread = threading.Thread(target=self.read_sensors, daemon=True)
-        self.sensor_thread.start()
-        self.ir_thread = threading.Thread(target=self.monitor_ir, daemon=True)
-        self.ir_thread.start()
-        self.osc_thread = threading.Thread(target=osc.start_osc_server, args=(self.dmx,), daemon=True)
-        self.osc_thread.start()
-        logging.info("Threads started: DMX, Sensor, IR, OSC")
+    def report_startup(self):
+        self.log(self.engine.startup_report(_T0))
 
     def create_controls(self):
         # Clear existing sliders
         for i in reversed(range(self.slider_layout.count())):
             self.slider_layout.itemAt(i).widget().deleteLater()
         self.sliders = {}
-        for head in range(self.heads):
-            for ch in range(self.mode_channels):
+        for head in range(self.engine.heads):
+            for ch in range(self.engine.mode_channels):
                 h_layout = QHBoxLayout()
                 lbl = QLabel(f"H{head+1}-CH{ch+1}")
                 slider = QSlider(Qt.Horizontal)
@@ -194,158 +229,172 @@ class DMXControllerApp(QWidget):
                 h_layout.addWidget(slider)
                 self.sliders[(head, ch)] = slider
                 self.slider_layout.addLayout(h_layout)
-        self.log(f"Controls created: {self.heads} heads x {self.mode_channels} channels")
+        self.log(f"Controls created: {self.engine.heads} heads x {self.engine.mode_channels} channels")
 
     def change_mode(self, index):
-        self.mode_channels = 9 if index == 0 else 14
+        self.engine.set_patch(mode_channels=9 if index == 0 else 14)
         self.create_controls()
-        self.log(f"Changed to {self.mode_channels}CH mode")
+        self.log(f"Changed to {self.engine.mode_channels}CH mode")
 
     def change_address(self, value):
-        self.start_address = value
+        self.engine.set_patch(start_address=value)
         self.log(f"Start address set to d{str(value).zfill(3)}")
 
     def change_heads(self, value):
-        self.heads = value
+        self.engine.set_patch(heads=value)
         self.create_controls()
-        self.log(f"Number of heads set to {self.heads}")
+        self.log(f"Number of heads set to {self.engine.heads}")
 
     def update_dmx(self, head, channel, value):
-        addr = self.start_address - 1 + head * self.mode_channels + channel
-        self.dmx.update_channel(addr, value)
+        addr = self.engine.head_address(head, channel)
+        self.engine.set_channel(addr, value)
         self.log(f"DMX channel {addr+1} set to {value}")
 
+    def undo(self):
+        self.engine.undo()
+
+    def redo(self):
+        self.engine.redo()
+
     def blackout(self):
-        for head in range(self.heads):
-            for ch in range(self.mode_channels):
-                addr = self.start_address - 1 + head * self.mode_channels + ch
-                self.dmx.update_channel(addr, 0)
-        self.log("Blackout activated")
+        self.engine.blackout()
 
     def pick_color(self):
-        from PyQt5.QtGui import QColor
         from PyQt5.QtWidgets import QColorDialog
         color = QColorDialog.getColor()
         if color.isValid():
-            for head in range(self.heads):
-                base = self.start_address - 1 + head * self.mode_channels
-                r_idx = base + (3 if self.mode_channels == 9 else 6)
-                g_idx = r_idx + 1
-                b_idx = r_idx + 2
-                self.dmx.update_channel(r_idx, color.red())
-                self.dmx.update_channel(g_idx, color.green())
-                self.dmx.update_channel(b_idx, color.blue())
+            self.engine.set_color(color.red(), color.green(), color.blue())
             self.log(f"Color applied: {color.name()}")
 
     def save_scene(self):
         path, _ = QFileDialog.getSaveFileName(self, "Save Scene", filter="JSON Files (*.json)")
         if path:
-            scenes.save_scene(self.dmx.dmx_data, path)
-            self.log(f"Scene saved: {path}")
+            self.engine.save_scene(path)
 
     def load_scene(self):
         path, _ = QFileDialog.getOpenFileName(self, "Load Scene", filter="JSON Files (*.json)")
         if path:
-            data = scenes.load_scene(path)
-            for i, value in enumerate(data):
-                self.dmx.update_channel(i, value)
+            self.engine.load_scene(path)
+            self.create_controls()
+
+    def open_show(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Open Show", filter="Show Files (*.show)",
+                                              options=QFileDialog.DontConfirmOverwrite)
+        if path:
+            self.engine.open_show(path)
+            for widget, value in ((self.mode_combo, 0 if self.engine.mode_channels == 9 else 1),
+                                  (self.addr_spin, self.engine.start_address), (self.heads_spin, self.engine.heads)):
+                widget.blockSignals(True)
+                widget.setCurrentIndex(value) if widget is self.mode_combo else widget.setValue(value)
+                widget.blockSignals(False)
             self.create_controls()
-            self.log(f"Scene loaded: {path}")
+
+    def save_show(self):
+        if not self.engine.show:
+            self.open_show()
+        if self.engine.show:
+            self.engine.save_show()
 
     def run_effect(self, name):
-        if self.effect_thread and self.effect_thread.is_alive():
-            self.log("Another effect is running")
-            return
-        if name == "AudioReactivity":
-            self.effect_thread = threading.Thread(
-                target=lambda: audio.run_audio_reactivity(
-                    self.dmx, self.start_address, self.heads, self.mode_channels
-                ),
-                daemon=True
-            )
-        else:
-            self.effect_thread = threading.Thread(
-                target=lambda: effects.run_effect(name, self.dmx, self.start_address, self.heads, self.mode_channels),
-                daemon=True
-            )
-        self.effect_thread.start()
-        self.log(f"Effect {name} started")
-        leds.set_led_color(0, 0, 1)  # Blue LED for effect
+        self.engine.run_effect(name)
 
     def stop_effect(self):
-        effects.stop_effect()
-        audio.stop_audio_reactivity()
-        self.effect_thread = None
-        self.log("Effect stopped")
-        leds.set_led_color(0, 1, 0)  # Green LED for idle
+        self.engine.stop_effect()
+
+    def load_effect_definition(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load Effect Definition", filter="JSON Files (*.json)")
+        if not path:
+            return
+        try:
+            with open(path) as f:
+                cls = self.engine.define_effect(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.log(f"Invalid effect definition: {e}")
+            return
+        btn = QPushButton(f"Start {cls.name}")
+        btn.clicked.connect(lambda _, e=cls.name: self.run_effect(e))
+        self.effect_buttons.addWidget(btn)
+
+    def add_pixel_map(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Pixel Map Media", filter="Media (*.png *.jpg *.gif *.npy)")
+        if not path:
+            return
+        try:
+            self.engine.add_pixel_map(path)
+        except (KeyError, ValueError) as e:
+            self.log(f"Cannot map {path}: {e}")
 
     def update_effect_speed(self, value):
-        effects.effect_manager.set_speed(value)
+        self.engine.set_effect_speed(value)
         self.log(f"Effect speed set to {value}%")
 
+    def tap_tempo(self):
+        self.engine.tap_tempo()
+
+    def resync_tempo(self):
+        self.engine.resync_tempo()
+
     def load_sequence(self):
         path, _ = QFileDialog.getOpenFileName(self, "Load Sequence", filter="JSON Files (*.json)")
         if path:
-            self.current_sequence = sequences.load_sequence(path)
-            self.log(f"Sequence loaded: {path}")
+            self.engine.load_sequence(path)
 
     def run_sequence(self):
-        if hasattr(self, 'current_sequence') and self.current_sequence:
-            if self.sequence_thread and self.sequence_thread.is_alive():
-                self.log("Another sequence is running")
-                return
-            self.sequence_thread = threading.Thread(
-                target=lambda: sequences.run_sequence(
-                    self.dmx, self.start_address, self.heads, self.mode_channels, self.current_sequence
-                ),
-                daemon=True
-            )
-            self.sequence_thread.start()
-            self.log("Sequence started")
-            leds.set_led_color(0, 0, 1)  # Blue LED for sequence
-        else:
-            self.log("No sequence loaded")
+        self.engine.run_sequence()
+
+    def record_cue(self):
+        numbers = self.engine.cue_list.numbers
+        self.engine.record_cue(int(numbers[-1]) + 1 if numbers else 1)
+
+    def cue_go(self):
+        try:
+            self.engine.cue_go()
+        except ValueError as e:
+            self.log(str(e))
+
+    def cue_back(self):
+        try:
+            self.engine.cue_back()
+        except ValueError as e:
+            self.log(str(e))
 
     def stop_sequence(self):
-        sequences.stop_sequence()
-        self.sequence_thread = None
-        self.log("Sequence stopped")
-        leds.set_led_color(0, 1, 0)  # Green LED for idle
-
-    def read_sensors(self):
-        while self.running:
-            humidity, temperature = sensors.read_dht(self.sensor_combo.currentText())
-            if humidity is not None and temperature is not None:
-                self.sensor_label.setText(f"Temp: {temperature:.1f}°C  Hum: {humidity:.1f}%")
-            time.sleep(1)
-
-    def monitor_ir(self):
-        while self.running:
-            if ir.is_ir_detected():
-                self.run_effect("ColorChase")
-                leds.set_led_color(0, 0, 1)  # Blue LED when IR detected
-            else:
-                leds.set_led_color(0, 1, 0)  # Green LED when idle
-            time.sleep(0.1)
-
-    def update_sensor(self):
-        pass  # Handled by sensor thread
+        self.engine.stop_sequence()
+
+    def change_sensor(self, sensor_type):
+        self.engine.set_sensor_type(sensor_type)
+
+    def on_engine_event(self, event, data):
+        # Runs on the GUI thread (queued signal from the engine)
+        if event == "log":
+            self.log_view.append(f"{time.strftime('%H:%M:%S')} - {data}")
+        elif event == "sensor":
+            self.sensor_label.setText(f"Temp: {data.temperature:.1f}°C  Hum: {data.humidity:.1f}%")
+        elif event == "cue":
+            cue = f"{data['cue']:g} {data['label']}" if data["cue"] is not None else "-"
+            self.cue_label.setText(f"Cue: {cue} ({data['count']} cues)")
+        elif event == "tempo":
+            self.tempo_label.setText(f"{data['bpm']:.1f} BPM")
+        elif event == "dmx_input":
+            state = f"{data['slots']} channels" if data["signal"] else "signal lost"
+            self.log_view.append(f"{time.strftime('%H:%M:%S')} - DMX input: {state}")
 
     def log(self, msg):
         self.log_view.append(f"{time.strftime('%H:%M:%S')} - {msg}")
         logging.info(msg)
 
     def closeEvent(self, event):
-        self.running = False
-        self.dmx.stop()
-        osc.stop_osc_server()
-        sequences.stop_sequence()
-        leds.cleanup()
+        self.engine.unsubscribe(self.forward_event)
         event.accept()
 
 if __name__ == "__main__":
+    eng = engine.Engine()
+    eng.start()  # DMX output goes out before PyQt builds the window
     app = QApplication(sys.argv)
-    controller = DMXControllerApp()
+    controller = DMXControllerApp(eng)
     controller.resize(1000, 700)
     controller.show()
-    sys.exit(app.exec_())
+    QTimer.singleShot(0, controller.report_startup)
+    exit_code = app.exec_()
+    eng.stop()
+    sys.exit(exit_code)
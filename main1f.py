@@ -3,15 +3,19 @@
 Main script for the DMX Controller Project.
 Coordinates GUI, DMX communication, effects, sensors, scenes, LEDs, IR, audio, OSC, and sequences.
 Now integrates head objects (MH110Head, StageWashHead).
+Optional subsystems (sensors, LEDs, IR, audio, OSC) are loaded through
+backend/subsystems.py from backend/config.py, so a missing library only
+disables that feature.
 """
 import sys
-import threading
 import time
 import logging
 from PyQt5.QtWidgets import (QApplication, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QSlider, QPushButton, QComboBox, QSpinBox, QTextEdit, QFileDialog)
-from PyQt5.QtCore import Qt, QTimer
-from backend import dmx, effects, sensors, scenes, leds, ir, audio, osc, sequences
+from PyQt5.QtCore import Qt, QObject, pyqtSignal
+from backend import dmx, effects, gpio, scenes, sequences, subsystems
+from backend.config import load_config
+from backend.supervisor import supervisor
 from backend.heads.mh110_head import MH110Head
 from backend.heads.stagewash_head import StageWashHead
 
@@ -22,24 +26,46 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+class HardwareEvents(QObject):
+    """Marshals sensor readings and IR edges from worker threads to the GUI thread."""
+    sensor_reading = pyqtSignal(object)
+    ir_changed = pyqtSignal(bool)
+
 class DMXControllerApp(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("DMX Controller Ultimate")
+        self.config = load_config()
+        self.load_subsystems()
         self.dmx = dmx.DMXSender()
         self.start_address = 1
         self.mode_channels = 14  # Default to StageWashHead
         self.head_objects = []
-        self.effect_thread = None
-        self.sequence_thread = None
         self.running = True
         self.current_sequence = None
+        self.sensor_service = None
+        if self.sensors:
+            self.sensor_service = self.sensors.SensorService(interval=self.config["sensors"]["interval"])
+        self.hw_events = HardwareEvents()
+        self.hw_events.sensor_reading.connect(self.show_sensor_reading)
+        self.hw_events.ir_changed.connect(self.on_ir_change)
+        if self.sensor_service:
+            self.sensor_service.subscribe(self.hw_events.sensor_reading.emit)
         self.init_ui()
         self.init_heads()
-        self.init_timers()
         self.start_threads()
         logging.info("Application initialized")
 
+    def load_subsystems(self):
+        """Importa solo los subsistemas opcionales habilitados en la configuración; sin su librería quedan en None."""
+        if self.config["gpio"]["simulate"]:
+            gpio.set_backend(gpio.SimulatedGPIO())
+        self.leds = subsystems.load("leds", self.config)
+        self.ir = subsystems.load("ir", self.config)
+        self.sensors = subsystems.load("sensors", self.config)
+        self.audio = subsystems.load("audio", self.config)
+        self.osc = subsystems.load("osc", self.config)
+
     def init_ui(self):
         layout = QVBoxLayout()
         self.tabs = QTabWidget()
@@ -125,9 +151,11 @@ class DMXControllerApp(QWidget):
         layout = QVBoxLayout()
         self.sensor_combo = QComboBox()
         self.sensor_combo.addItems(["DHT11", "DHT22"])
+        self.sensor_combo.setCurrentText(self.config["sensors"]["type"])
+        self.sensor_combo.currentTextChanged.connect(self.change_sensor)
         layout.addWidget(QLabel("Sensor:"))
         layout.addWidget(self.sensor_combo)
-        self.sensor_label = QLabel("Temp: -- °C  Hum: -- %")
+        self.sensor_label = QLabel("Temp: -- °C  Hum: -- %" if self.sensor_service else "Sensor unavailable")
         layout.addWidget(self.sensor_label)
         tab.setLayout(layout)
         return tab
@@ -147,16 +175,19 @@ class DMXControllerApp(QWidget):
         tab.setLayout(layout)
         return tab
 
-    def init_timers(self):
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_sensor)
-        self.timer.start(1000)
-
     def start_threads(self):
-        threading.Thread(target=self.dmx.send_loop, daemon=True).start()
-        threading.Thread(target=self.read_sensors, daemon=True).start()
-        threading.Thread(target=self.monitor_ir, daemon=True).start()
-        threading.Thread(target=osc.start_osc_server, args=(self.dmx,), daemon=True).start()
+        self.dmx.start()  # Marca running=True antes de arrancar send_loop en el supervisor
+        if self.sensor_service:
+            self.change_sensor(self.sensor_combo.currentText())
+            self.sensor_service.start()
+        if self.ir:
+            self.ir.on_ir_change(self.hw_events.ir_changed.emit)
+        if self.osc:
+            try:
+                self.osc.start_osc_server(self.dmx, self.config["osc"]["ip"], self.config["osc"]["port"])
+            except Exception as e:
+                # Con el puerto ocupado la GUI arranca sin OSC
+                logging.error(f"OSC server failed to start: {e}")
 
     def update_dmx(self, head_index, channel, value):
         addr = self.start_address - 1 + head_index * self.mode_channels + channel
@@ -179,25 +210,30 @@ class DMXControllerApp(QWidget):
             self.log(f"Color applied: {color.name()}")
 
     def run_effect(self, name):
+        # Ambos arrancan su propio hilo supervisado y sustituyen al efecto anterior
         if name == "AudioReactivity":
-            self.effect_thread = threading.Thread(
-                target=audio.run_audio_reactivity,
-                args=(self.dmx, self.start_address, len(self.head_objects), self.mode_channels),
-                daemon=True)
+            if not self.audio:
+                self.log("Audio reactivity unavailable")
+                return
+            effects.stop_effect()
+            self.audio.run_audio_reactivity(self.dmx, self.start_address, len(self.head_objects), self.mode_channels)
         else:
-            self.effect_thread = threading.Thread(
-                target=effects.run_effect,
-                args=(name, self.dmx, self.start_address, len(self.head_objects), self.mode_channels),
-                daemon=True)
-        self.effect_thread.start()
+            if self.audio:
+                self.audio.stop_audio_reactivity()
+            effects.run_effect(name, self.dmx, self.start_address, len(self.head_objects), self.mode_channels)
         self.log(f"Effect {name} started")
-        leds.set_led_color(0, 0, 1)
+        self.set_status_led(0, 0, 1)
 
     def stop_effect(self):
         effects.stop_effect()
-        audio.stop_audio_reactivity()
+        if self.audio:
+            self.audio.stop_audio_reactivity()
         self.log("Effect stopped")
-        leds.set_led_color(0, 1, 0)
+        self.set_status_led(0, 1, 0)
+
+    def set_status_led(self, red, green, blue):
+        if self.leds:
+            self.leds.set_led_color(red, green, blue)
 
     def save_scene(self):
         path, _ = QFileDialog.getSaveFileName(self, "Save Scene", filter="JSON Files (*.json)")
@@ -221,35 +257,31 @@ class DMXControllerApp(QWidget):
 
     def run_sequence(self):
         if self.current_sequence:
-            self.sequence_thread = threading.Thread(
-                target=sequences.run_sequence,
-                args=(self.dmx, self.start_address, len(self.head_objects), self.mode_channels, self.current_sequence),
-                daemon=True)
-            self.sequence_thread.start()
+            supervisor.start("sequence", self._sequence_task, args=(self.current_sequence,))
             self.log("Sequence started")
 
+    def _sequence_task(self, token, sequence):
+        sequences.run_sequence(self.dmx, self.start_address, len(self.head_objects), self.mode_channels, sequence, token)
+
     def stop_sequence(self):
         sequences.stop_sequence()
+        supervisor.stop("sequence")
         self.log("Sequence stopped")
 
-    def read_sensors(self):
-        while self.running:
-            humidity, temperature = sensors.read_dht(self.sensor_combo.currentText())
-            if humidity is not None and temperature is not None:
-                self.sensor_label.setText(f"Temp: {temperature:.1f}°C  Hum: {humidity:.1f}%")
-            time.sleep(1)
+    def change_sensor(self, sensor_type):
+        if self.sensor_service:
+            self.sensor_service.set_backend(self.sensors.make_sensor(sensor_type, self.config["sensors"]["simulate"]))
 
-    def monitor_ir(self):
-        while self.running:
-            if ir.is_ir_detected():
-                self.run_effect("ColorChase")
-                leds.set_led_color(0, 0, 1)
-            else:
-                leds.set_led_color(0, 1, 0)
-            time.sleep(0.1)
+    def show_sensor_reading(self, reading):
+        # Runs on the GUI thread (queued signal from the sensor service)
+        self.sensor_label.setText(f"Temp: {reading.temperature:.1f}°C  Hum: {reading.humidity:.1f}%")
 
-    def update_sensor(self):
-        pass
+    def on_ir_change(self, detected):
+        if detected:
+            self.run_effect("ColorChase")
+            self.set_status_led(0, 0, 1)
+        else:
+            self.set_status_led(0, 1, 0)
 
     def log(self, msg):
         self.log_view.append(f"{time.strftime('%H:%M:%S')} - {msg}")
@@ -257,10 +289,15 @@ class DMXControllerApp(QWidget):
 
     def closeEvent(self, event):
         self.running = False
+        if self.sensor_service:
+            self.sensor_service.stop()
         self.dmx.stop()
-        osc.stop_osc_server()
+        if self.osc:
+            self.osc.stop_osc_server()
         sequences.stop_sequence()
-        leds.cleanup()
+        supervisor.stop_all()
+        if self.leds:
+            self.leds.cleanup()
         event.accept()
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+import http.client
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import pytest
+from backend import api
+from backend.config import load_config
+from backend.engine import Engine
+
+
+class NullPort:
+    break_condition = False
+    baudrate = 250000
+
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def server(tmp_path):
+    config = load_config(None)
+    config["dmx"].update({"port": None, "break": "none"})
+    config["subsystems"] = dict.fromkeys(config["subsystems"], False)
+    engine = Engine(config, serial_port=NullPort())
+    engine.start()
+    server = api.APIServer(engine, port=free_port(), presets_dir=str(tmp_path))
+    server.start()
+    yield server
+    server.stop()
+    engine.stop()
+
+
+def request(server, method, path, body=None, raw=None):
+    conn = http.client.HTTPConnection(server.host, server.port, timeout=5)
+    conn.request(method, path, raw if raw is not None else (json.dumps(body) if body is not None else None))
+    response = conn.getresponse()
+    status, data = response.status, response.read()
+    conn.close()
+    return status, json.loads(data) if data.startswith(b"{") else data
+
+
+def websocket(server):
+    sock = socket.create_connection((server.host, server.port), timeout=5)
+    sock.sendall(b"GET /ws/frames HTTP/1.1\r\nHost: x\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                 b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n")
+    response = b""
+    while b"\r\n\r\n" not in response:
+        response += sock.recv(1)
+    assert response.startswith(b"HTTP/1.1 101")
+    return sock
+
+
+def read_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        assert chunk, "connection closed"
+        data += chunk
+    return data
+
+
+def read_close_code(sock):
+    """Salta los frames de salida hasta el cierre y devuelve su código."""
+    while True:
+        b1, b2 = read_exactly(sock, 2)
+        length = b2 & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", read_exactly(sock, 2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", read_exactly(sock, 8))[0]
+        payload = read_exactly(sock, length)
+        if b1 & 0x0F == 0x8:
+            return struct.unpack("!H", payload[:2])[0]
+
+
+def test_routing(server):
+    status, tempo = request(server, "GET", "/api/tempo")
+    assert status == 200 and tempo["bpm"] == 120
+    assert request(server, "POST", "/api/tempo", {"bpm": 128})[0] == 200
+    assert request(server, "GET", "/api/tempo")[1]["bpm"] == 128
+    assert request(server, "GET", "/api/nothing")[0] == 404
+    assert request(server, "GET", "/api/channels")[0] == 405
+    assert request(server, "POST", "/api/tempo", raw="[1, 2]")[0] == 400
+    assert request(server, "POST", "/api/tempo", raw="{bad json")[0] == 400
+
+
+def test_request_body_limit(server):
+    # Solo la cabecera: el servidor responde sin leer el cuerpo
+    with socket.create_connection((server.host, server.port), timeout=5) as sock:
+        sock.sendall(f"POST /api/channels HTTP/1.1\r\nHost: x\r\nContent-Length: {api.MAX_BODY + 1}\r\n\r\n"
+                     .encode())
+        response = b""
+        while chunk := sock.recv(4096):
+            response += chunk
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 413") and "larger" in json.loads(body)["error"]
+
+
+def test_unmasked_websocket_frame_is_rejected(server):
+    sock = websocket(server)
+    with sock:
+        sock.sendall(bytes([0x81, 2]) + b"{}")
+        assert read_close_code(sock) == 1002
+
+
+def test_oversized_websocket_frame_is_rejected(server):
+    sock = websocket(server)
+    with sock:
+        # Solo la cabecera: el servidor corta antes de leer el payload
+        sock.sendall(bytes([0x81, 0x80 | 127]) + struct.pack("!Q", api.MAX_WS_PAYLOAD + 1) + b"mask")
+        assert read_close_code(sock) == 1009
+
+
+@pytest.mark.parametrize("name", ["../config", "/etc/passwd", "sub/scene", ".hidden", ""])
+def test_preset_names_cannot_leave_the_presets_dir(server, name):
+    status, payload = request(server, "POST", "/api/scenes/save", {"name": name})
+    assert status == 400 and "invalid name" in payload["error"]
+    assert request(server, "POST", "/api/layers/pixelmap", {"source": name})[0] == 400
+
+
+def test_presets_are_saved_in_the_presets_dir(server, tmp_path):
+    assert request(server, "POST", "/api/scenes/save", {"name": "look"})[0] == 200
+    assert os.path.exists(tmp_path / "look.json")
+    assert request(server, "POST", "/api/scenes/recall", {"name": "look"})[0] == 200
+
+
+def test_slow_handler_does_not_block_other_clients(server):
+    server.routes[("POST", "/api/slow")] = lambda body: time.sleep(1.0) or {}
+    slow = threading.Thread(target=request, args=(server, "POST", "/api/slow", {}))
+    slow.start()
+    time.sleep(0.1)
+    started = time.perf_counter()
+    assert request(server, "GET", "/api/tempo")[0] == 200
+    assert time.perf_counter() - started < 0.5
+    slow.join()
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from backend import color
+
+
+def test_zero_white_component_does_not_limit_extraction():
+    rgb = np.array([[1.0, 1.0, 0.2], [0.5, 0.5, 0.0]], dtype=np.float32)
+    remaining, w = color.extract_white(rgb, (1.0, 1.0, 0.0))  # LED blanco sin aporte al azul
+    assert np.isfinite(remaining).all() and np.isfinite(w).all()
+    assert np.allclose(w, [1.0, 0.5])
+    assert np.allclose(remaining, [[0.0, 0.0, 0.2], [0.0, 0.0, 0.0]])
+
+
+def test_pipeline_with_zero_white_component_converts():
+    pipeline = color.ColorPipeline(heads=2)
+    pipeline.set_calibration(1, white=[1, 1, 0])
+    values = {name: np.full(2, 255.0, dtype=np.float32) for name in ("red", "green", "blue")}
+    result = pipeline.convert(values, np.arange(2), has_white=True)
+    assert all(np.isfinite(result[name]).all() for name in ("red", "green", "blue", "white"))
+    assert result["white"][1] == 255 and result["blue"][1] == 255
+
+
+@pytest.mark.parametrize("white", [[0, 0, 0], [1, -1, 1], [1, float("nan"), 1], [1, 1]])
+def test_invalid_white_calibration_is_rejected(white):
+    pipeline = color.ColorPipeline(heads=1)
+    with pytest.raises(ValueError):
+        pipeline.set_calibration(0, white=white)
+    assert (pipeline.whites[0] == 1).all()
@@ -0,0 +1,77 @@
+import time
+from backend import ir
+from backend.gpio import SimulatedGPIO
+from backend.leds import LED_PINS, StatusLED
+
+
+def wait_for(condition, timeout=5.0):
+    limit = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < limit, "timed out"
+        time.sleep(0.005)
+
+
+def make_receiver(debounce=0.02):
+    backend = SimulatedGPIO()
+    receiver = ir.IRInput(backend, debounce=debounce)
+    events = []
+    receiver.add_callback(events.append)
+    receiver.start()
+    return backend, receiver, events
+
+
+def test_ir_edges_call_back_once_per_change():
+    backend, receiver, events = make_receiver()
+    try:
+        assert backend.modes[ir.RECEIVER_PIN] == "in" and not receiver.is_detected()
+        backend.set_input(ir.RECEIVER_PIN, 0)  # Haz interrumpido (activo en bajo)
+        wait_for(lambda: events == [True])
+        assert receiver.is_detected()
+        backend.set_input(ir.RECEIVER_PIN, 1)
+        wait_for(lambda: events == [True, False])
+        assert not receiver.is_detected()
+    finally:
+        receiver.stop()
+
+
+def test_ir_debounce_settles_bounces_into_one_change():
+    backend, receiver, events = make_receiver(debounce=0.05)
+    try:
+        for level in (0, 1, 0, 1, 0):  # Rebotes dentro del tiempo de debounce
+            backend.set_input(ir.RECEIVER_PIN, level)
+        assert events == []  # Nada hasta que la línea se estabiliza
+        wait_for(lambda: events == [True])
+        # Un rebote que vuelve al nivel de partida no produce cambio
+        backend.set_input(ir.RECEIVER_PIN, 1)
+        backend.set_input(ir.RECEIVER_PIN, 0)
+        wait_for(lambda: receiver._settle_task is None)
+        assert events == [True]
+    finally:
+        receiver.stop()
+
+
+def test_ir_without_debounce_and_after_stop():
+    backend, receiver, events = make_receiver(debounce=0)
+    backend.set_input(ir.RECEIVER_PIN, 0)
+    assert events == [True]  # Sin debounce, en el mismo flanco
+    receiver.stop()
+    assert ir.RECEIVER_PIN not in backend.callbacks
+    backend.set_input(ir.RECEIVER_PIN, 1)
+    assert events == [True]
+
+
+def test_status_led_only_writes_changed_pins():
+    backend = SimulatedGPIO()
+    led = StatusLED(backend)
+    assert backend.modes == {}  # Los pines se configuran con el primer color
+    assert led.set_color(0, 1, 0)
+    assert all(backend.modes[pin] == "out" for pin in LED_PINS)
+    assert backend.writes == [(LED_PINS[1], 1)]
+    assert not led.set_color(0, 1, 0)  # Mismo color: sin escribir en GPIO
+    assert led.set_color(0, 0, 1)
+    assert backend.writes == [(LED_PINS[1], 1), (LED_PINS[1], 0), (LED_PINS[2], 1)]
+    assert [backend.input(pin) for pin in LED_PINS] == [0, 0, 1]
+    led.cleanup()
+    assert backend.modes == {} and led.state is None
+    assert led.set_color(0, 0, 1)  # Tras cleanup se vuelve a configurar y escribir
+    assert backend.writes[-1] == (LED_PINS[2], 1)
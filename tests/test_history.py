@@ -0,0 +1,26 @@
+from backend.simulation import Simulator
+
+SEQUENCE = [
+    {"dmx": {"1": 255, "2": 30}, "duration": 1.0},
+    {"effect": "ColorChase", "duration": 2.0},
+    {"dmx": {"1": 0}, "duration": 0.0},  # Última escritura justo al terminar la secuencia
+]
+
+
+def test_undo_after_a_sequence_reverts_the_user_edit():
+    with Simulator(fps=40) as sim:
+        engine = sim.engine
+        engine.set_channel(20, 100)
+        sim.run(1.0)
+        assert engine.history.status()["undo"] == 1
+
+        engine.run_sequence(SEQUENCE, quantize="none")
+        sim.run(4.0)
+        # Las escrituras de la secuencia no son pasos de deshacer
+        assert engine.history.status() == dict(engine.history.status(), undo=1, redo=0, pending=False)
+
+        engine.undo()
+        data = engine.dmx.dmx_data
+        assert data[20] == 0  # Se deshace la edición del usuario
+        assert (data[0], data[1]) == (0, 30)  # y no lo que escribió la secuencia
+        assert engine.history.status()["undo"] == 0
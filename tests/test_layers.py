@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from backend import color, layers
+from backend.effects import Effect
+from backend.expressions import effect_class
+from backend.patch import Patch
+
+
+class NaNEffect(Effect):
+    name = "NaNTest"
+    attributes = ("red", "green", "blue")
+
+    def render(self, t, count):
+        nan = np.full(count, np.nan, dtype=np.float32)
+        return {"red": nan, "green": nan, "blue": nan}
+
+
+def make_stack(patch):
+    now = [10.0]
+    stack = layers.EffectStack(patch, clock=lambda: now[0], color=color.ColorPipeline(patch.heads, "gamma"))
+    return stack, now
+
+
+def test_non_finite_expressions_are_rejected_at_definition():
+    with pytest.raises(ValueError, match="not finite"):
+        effect_class({"name": "Bad", "attributes": {"red": "255*sqrt(t-5)"}})
+
+
+def test_non_finite_expression_values_render_as_zero():
+    patch = Patch(heads=2)
+    stack, now = make_stack(patch)
+    # Finita en la evaluación de prueba (t = 0.5), NaN a partir de t = 1
+    layer = stack.add(effect_class({"name": "Late", "attributes": {"red": "255*sqrt(1-t)", "green": "255",
+                                                                   "blue": "0"}})())
+    now[0] += 2.0
+    frame = stack.compose(bytes(512))
+    assert not layer.failed
+    red, green = patch.channels("red", "all"), patch.channels("green", "all")
+    assert all(frame[i] == 0 for i in red) and all(frame[i] == 255 for i in green)
+
+
+def test_failing_conversion_disables_only_its_layer():
+    patch = Patch(heads=2)
+    stack, now = make_stack(patch)
+    good = stack.add(effect_class({"name": "Green", "attributes": {"red": "0", "green": "255", "blue": "0"}})(),
+                     priority=0)
+    bad = stack.add(NaNEffect(), priority=1)
+    frame = stack.compose(bytes(512))
+    assert bad.failed and not good.failed
+    assert all(frame[i] == 255 for i in patch.channels("green", "all"))
+    assert stack.compose(bytes(512)) == frame
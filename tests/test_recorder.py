@@ -0,0 +1,62 @@
+import time
+from backend import dmx, recorder
+from backend.output import OutputProcessor
+from backend.patch import Patch
+
+
+class CapturePort:
+    def __init__(self):
+        self.break_condition = False
+        self.baudrate = 250000
+        self.packets = []
+
+    def write(self, data):
+        self.packets.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def wait_for(condition, timeout=5.0):
+    limit = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < limit, "timed out"
+        time.sleep(0.01)
+
+
+def test_playback_sends_recorded_output_unchanged(tmp_path):
+    patch = Patch(heads=2)
+    port = CapturePort()
+    sender = dmx.DMXSender(serial_port=port, break_mode="none")
+    sender.set_refresh_rate(200)
+    # Etapa de salida que no es la identidad: pan invertido y grand master a la mitad
+    sender.output = OutputProcessor(patch, grand_master=0.5, invert={"all": ["pan"]}).process
+    sender.update_channels([(0, 10), (2, 200), (9, 40), (11, 100)])  # pan y dimmer de las dos cabezas
+    sender.start()
+    try:
+        wait_for(lambda: len(port.packets) > 2)
+        live = port.packets[-1]
+        assert live[1] == 245 and live[3] == 100  # El live ya lleva la inversión y el master
+        path = str(tmp_path / "show.dmxr")
+        rec = recorder.Recorder(path)
+        rec.start(sender)
+        wait_for(lambda: rec.frames >= 20)
+        rec.stop()
+
+        sender.update_channels([(0, 0), (2, 0), (9, 0), (11, 0)])  # El programador cambia tras grabar
+        wait_for(lambda: port.packets[-1] != live)
+        current = port.packets[-1]
+        assert current[1] == 255 and current[3] == 0
+        player = recorder.Player(path)
+        start = len(port.packets)
+        player.play(sender)
+        wait_for(lambda: not player.running)
+        played = port.packets[start:]
+        player.close()
+        # Se transmite exactamente lo grabado, sin volver a pasar por las capas ni la etapa de salida
+        assert live in played
+        assert set(played) <= {live, current}
+        wait_for(lambda: port.packets[-1] == current)  # Al terminar vuelve la salida en vivo
+    finally:
+        sender.stop()
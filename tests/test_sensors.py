@@ -0,0 +1,67 @@
+import time
+from backend.sensors import SensorService, SimulatedSensor
+
+
+def wait_for(condition, timeout=5.0):
+    limit = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < limit, "timed out"
+        time.sleep(0.01)
+
+
+def test_failures_back_off_and_keep_the_cached_reading():
+    sensor = SimulatedSensor(temperature=21.5, humidity=40.0)
+    service = SensorService(sensor, interval=2.0, max_backoff=10.0)
+    assert service.get_reading() is None
+
+    before = time.time()
+    assert service.poll_once() == 2.0
+    after = time.time()
+    reading = service.get_reading()
+    assert (reading.temperature, reading.humidity) == (21.5, 40.0)
+    assert before <= reading.timestamp <= after
+
+    # Cada fallo dobla la espera hasta max_backoff; la caché conserva la última lectura válida
+    sensor.fail_next(3)
+    assert [service.poll_once() for _ in range(3)] == [4.0, 8.0, 10.0]
+    assert service.failures == 3
+    assert service.get_reading() is reading
+
+    # La primera lectura buena vuelve al intervalo normal y renueva la caché
+    sensor.temperature = 23.0
+    assert service.poll_once() == 2.0
+    assert service.failures == 0
+    assert service.get_reading().temperature == 23.0
+    assert service.get_reading().timestamp >= reading.timestamp
+    assert sensor.reads == 5
+
+
+def test_backend_errors_count_as_failures():
+    class BrokenSensor:
+        def read(self):
+            raise OSError("checksum error")
+
+    service = SensorService(BrokenSensor(), interval=1.0)
+    assert service.poll_once() == 2.0
+    assert service.get_reading() is None
+    service.set_backend(SimulatedSensor())
+    assert service.failures == 0
+    assert service.poll_once() == 1.0
+
+
+def test_service_thread_publishes_readings_after_a_failure():
+    sensor = SimulatedSensor(temperature=19.0, humidity=55.0)
+    sensor.fail_next()
+    service = SensorService(sensor, interval=0.02)
+    readings = []
+    service.subscribe(readings.append)
+    service.start()
+    try:
+        wait_for(lambda: len(readings) >= 2)
+    finally:
+        service.stop()
+    # La lectura fallida no se publica: los suscriptores solo reciben lecturas válidas
+    assert sensor.reads >= 3
+    assert all((r.temperature, r.humidity) == (19.0, 55.0) for r in readings)
+    assert readings[0].timestamp <= readings[1].timestamp
+    assert service.get_reading() == readings[-1]
@@ -0,0 +1,31 @@
+from backend.simulation import Simulator
+
+SEQUENCE = [
+    {"effect": "Rainbow", "duration": 2.0},
+    {"dmx": {"1": 10}, "duration": 1.0},
+]
+
+
+def layer_names(sim):
+    return [layer.effect.name for layer in sim.engine.stack.layers]
+
+
+def test_sequence_effect_step_is_a_layer_independent_of_the_main_effect():
+    with Simulator(fps=40) as sim:
+        programmer = bytes(sim.engine.dmx.dmx_data)
+        sim.engine.run_sequence(SEQUENCE, quantize="none")
+        sim.run(0.5)
+        assert layer_names(sim) == ["Rainbow"]
+        assert bytes(sim.engine.dmx.dmx_data) == programmer  # El paso de efecto no escribe el programador
+
+        # Arrancar y parar el efecto principal no toca la capa de la secuencia
+        sim.engine.run_effect("Strobe", quantize="none")
+        sim.run(0.5)
+        assert sorted(layer_names(sim)) == ["Rainbow", "Strobe"]
+        sim.engine.stop_effect()
+        sim.run(0.5)
+        assert layer_names(sim) == ["Rainbow"]
+
+        sim.run(1.0)  # Fin del paso de efecto
+        assert layer_names(sim) == []
+        assert sim.engine.dmx.dmx_data[0] == 10
@@ -0,0 +1,47 @@
+import json
+import sqlite3
+from backend import showfile
+from backend.showfile import ShowFile
+
+
+def test_unchanged_items_are_skipped_without_loading_them(tmp_path):
+    path = str(tmp_path / "show.db")
+    show = ShowFile(path)
+    assert show.put("scene", "look", [0, 255, 10])
+    assert show.put("patch", "patch", {"heads": 2, "start_address": 1})
+    show.close()
+
+    show = ShowFile(path)
+    modified = show.toc[("scene", "look")][1]
+    assert show._cache == {}
+    assert not show.put("scene", "look", [0, 255, 10])  # Nunca se ha leído con get()
+    assert not show.put("patch", "patch", {"start_address": 1, "heads": 2})
+    assert show._cache == {} and show.toc[("scene", "look")][1] == modified
+    assert show.put("scene", "look", [0, 255, 11])
+    show.close()
+    assert ShowFile(path).get("scene", "look") == [0, 255, 11]
+
+
+def test_values_changed_in_place_are_saved(tmp_path):
+    show = ShowFile(str(tmp_path / "show.db"))
+    show.put("sequence", "intro", [{"dmx": {"1": 255}, "duration": 1}])
+    steps = show.get("sequence", "intro")
+    steps[0]["duration"] = 2  # Modifica el objeto de la caché
+    assert show.put("sequence", "intro", steps)
+
+
+def test_version_1_shows_are_migrated(tmp_path):
+    path = str(tmp_path / "old.db")
+    db = sqlite3.connect(path)
+    db.execute(showfile.SCHEMA)
+    data = json.dumps([1, 2, 3], sort_keys=True)
+    db.execute("INSERT INTO items VALUES ('scene', 'old', ?, ?, 0)", (data, len(data)))
+    db.execute("PRAGMA user_version = 1")
+    db.commit()
+    db.close()
+
+    show = ShowFile(path)
+    assert show.db.execute("PRAGMA user_version").fetchone()[0] == showfile.SCHEMA_VERSION
+    assert show.hashes[("scene", "old")] == showfile.content_hash(data)
+    assert not show.put("scene", "old", [1, 2, 3])
+    assert show.get("scene", "old") == [1, 2, 3]
@@ -0,0 +1,32 @@
+import numpy as np
+from backend.simulation import Simulator
+
+SEQUENCE = [
+    {"dmx": {"1": 255, "2": 127}, "duration": 1.0},
+    {"effect": "ColorChase", "duration": 2.0},
+    {"dmx": {"1": 0}, "duration": 1.0},
+]
+
+
+def simulate():
+    with Simulator(fps=40) as sim:
+        sim.engine.run_sequence(SEQUENCE)
+        sim.run(4.5)
+        before = sim.engine.current_effect
+        sim.set_ir(True)  # Haz cortado a t = 4.5: tras el debounce arranca ColorChase como capa
+        sim.run(1.5)
+        after = sim.engine.current_effect
+        return np.array(sim.sink.times), sim.sink.to_array(), sim.sink.at(0.5), before, after
+
+
+def test_simulation_is_deterministic():
+    times, frames, at_half, before, after = simulate()
+    times2, frames2, _, _, _ = simulate()
+    assert len(times) == 240  # Un frame cada 25 ms en [0, 6) s
+    assert np.array_equal(times, times2)
+    assert np.array_equal(frames, frames2)
+    assert at_half[0] == 255 and at_half[1] == 127
+    assert before is None and after == "ColorChase"
+    # Salida fija al acabar la secuencia; tras el debounce del IR (50 ms) la anima ColorChase
+    assert len({frame.tobytes() for frame in frames[(times >= 4.0) & (times < 4.5)]}) == 1
+    assert len({frame.tobytes() for frame in frames[times >= 4.6]}) > 1
@@ -0,0 +1,64 @@
+import multiprocessing
+import time
+import numpy as np
+from backend import layers
+from backend.effects import Effect
+from backend.patch import Patch
+from backend.workers import RenderPool
+
+FPS = 44.0
+
+
+class FrameEffect(Effect):
+    """Escribe el número de frame (t * FPS) para poder comprobar de qué instante son los valores."""
+    name = "FrameTest"
+    attributes = ("pan",)
+    delay = 0.0
+
+    def render(self, t, count):
+        if self.delay and multiprocessing.parent_process() is not None:
+            time.sleep(self.delay)  # Lento solo en el worker
+        return {self.attributes[0]: np.full(count, np.rint(t * FPS) % 256, dtype=np.float32)}
+
+
+class SlowFrameEffect(FrameEffect):
+    name = "SlowFrameTest"
+    attributes = ("dimmer",)
+    delay = 0.05  # Más de dos frames
+
+
+def test_slow_worker_does_not_stall_compose():
+    patch = Patch(heads=2)
+    now = [0.0]
+    pool = RenderPool(patch, processes=2)
+    stack = layers.EffectStack(patch, clock=lambda: now[0], pool=pool)
+    stack.add(FrameEffect())
+    stack.add(SlowFrameEffect())
+    delivered = []
+    render = pool.render
+
+    def recording_render(*args, **kwargs):
+        results = render(*args, **kwargs)
+        delivered.append(set(results))
+        return results
+
+    pool.render = recording_render
+    pool.start()
+    try:
+        pan, dimmer = patch.channels("pan", "all"), patch.channels("dimmer", "all")
+        durations = []
+        for frame in range(400):
+            now[0] = frame / FPS
+            started = time.perf_counter()
+            data = stack.compose(bytes(512))
+            durations.append(time.perf_counter() - started)
+            # Todos los valores son del frame actual, vengan del worker o del render en el proceso principal
+            assert all(data[i] == frame % 256 for i in pan) and all(data[i] == frame % 256 for i in dimmer)
+            time.sleep(1 / FPS)
+            if frame > 100 and pool.stale > 2:
+                break
+    finally:
+        pool.stop()
+    assert pool.stale > 2 and pool.late > 0
+    assert any(delivered[-20:]), "the fast worker never delivered"
+    assert max(durations[-20:]) < 1 / FPS